@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compare the compiled glossary engine with the original per-entry loop.
+
+Usage:
+  python benchmarks/bench_glossary.py [--entries 2000] [--chars 1800] [--glossary PATH]
+
+Without ``--glossary`` a synthetic EN2EN glossary is generated. Both
+implementations are run on the same text and their outputs are compared.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+from glossary_engine import (  # noqa: E402
+    CompiledGlossary,
+    adapt_glossary_case,
+    load_glossary,
+)
+
+
+def legacy_apply(text, glossary):
+    """The per-entry replacement loop used before the compiled engine."""
+    out = text
+    for source, target in glossary:
+        if re.search(r"\s", source):
+            pattern = re.compile(re.escape(source), flags=re.IGNORECASE)
+            out = pattern.sub(
+                lambda match: adapt_glossary_case(source, target, match.group(0)),
+                out,
+            )
+        else:
+            pattern = re.compile(
+                rf"\b(?P<core>{re.escape(source)})(?P<suf>s|'s|’s)?\b",
+                flags=re.IGNORECASE,
+            )
+            out = pattern.sub(
+                lambda match: (
+                    adapt_glossary_case(source, target, match.group("core"))
+                    + (match.group("suf") or "")
+                ),
+                out,
+            )
+    return out
+
+
+def synthetic_glossary(count, rng):
+    """Distinct sources whose targets never contain another source."""
+    entries = []
+    seen = set()
+    while len(entries) < count:
+        words = rng.randint(1, 3)
+        source = " ".join(
+            "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+            for _ in range(words)
+        )
+        if source in seen:
+            continue
+        seen.add(source)
+        target = "Z" + source.title().replace(" ", "") + "9"
+        entries.append((source, target))
+    return entries
+
+
+def synthetic_text(entries, chars, rng):
+    filler = ["the", "hero", "said", "that", "we", "must", "go", "north", "now"]
+    words = []
+    while sum(len(word) + 1 for word in words) < chars:
+        if rng.random() < 0.15:
+            source = rng.choice(entries)[0]
+            words.append(rng.choice([source, source.title(), source.upper()]))
+        else:
+            words.append(rng.choice(filler))
+        if rng.random() < 0.1:
+            words[-1] += "."
+    return " ".join(words)[:chars]
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--chars", type=int, default=1800)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--glossary", default="")
+    args = parser.parse_args()
+
+    rng = random.Random(815)
+    entries = (
+        load_glossary(args.glossary)
+        if args.glossary
+        else synthetic_glossary(args.entries, rng)
+    )
+    text = synthetic_text(entries, args.chars, rng)
+
+    compile_seconds, compiled = timed(lambda: CompiledGlossary(entries), 1)
+    legacy_seconds, legacy_out = timed(lambda: legacy_apply(text, entries), args.repeat)
+    engine_seconds, engine_out = timed(lambda: compiled.apply(text), args.repeat)
+
+    print(f"glossary entries : {len(entries)}")
+    print(f"text characters  : {len(text)}")
+    print(f"legacy per call  : {legacy_seconds * 1000:9.3f} ms")
+    print(f"engine compile   : {compile_seconds * 1000:9.3f} ms (once per file version)")
+    print(f"engine per call  : {engine_seconds * 1000:9.3f} ms")
+    if engine_seconds:
+        print(f"speed-up         : {legacy_seconds / engine_seconds:9.1f}x")
+    print(f"outputs identical: {legacy_out == engine_out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
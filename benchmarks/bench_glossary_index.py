@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compare glossary selection by source index with the per-entry filter.
+
+Usage:
+  python benchmarks/bench_glossary_index.py [--entries 5000] [--transcripts 200] [--glossary PATH]
+
+Without ``--glossary`` a synthetic JP2EN glossary of katakana names and kanji
+terms is generated. Each transcript contains a few of its sources. Both
+selections must return the same entries. The report shows the time per
+transcript and the estimated glossary prompt tokens with all entries and
+with only the selected ones.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+from glossary_engine import (  # noqa: E402
+    GlossarySourceIndex,
+    estimate_tokens,
+    jp_glossary_match_key,
+    load_glossary,
+)
+
+KATAKANA = "アイウエオカキクケコサシスセソタチツテトナニヌネノハヒフヘホマミムメモヤユヨラリルレロワン"
+KANJI = "剣盾村城森山川海空火水風土光闇王姫騎士魔法竜石塔門橋港町国神聖鬼"
+FILLER = "はがのをにへとでもからまでよねぞ。、！？…「」"
+
+
+def legacy_filter(entries, transcript):
+    """The per-entry substring filter used before the index."""
+    transcript_key = jp_glossary_match_key(transcript)
+    return [
+        (source, target)
+        for source, target in entries
+        if jp_glossary_match_key(source)
+        and jp_glossary_match_key(source) in transcript_key
+    ]
+
+
+def prompt_lines(entries):
+    """The glossary lines added to the system prompt, one per entry."""
+    return "\n".join(f"- {source} → {target}" for source, target in entries)
+
+
+def synthetic_glossary(count, rng):
+    entries, seen = [], set()
+    while len(entries) < count:
+        if rng.random() < 0.6:
+            source = "".join(rng.choices(KATAKANA, k=rng.randint(3, 6)))
+        else:
+            source = "".join(rng.choices(KANJI, k=rng.randint(2, 4)))
+        if source in seen:
+            continue
+        seen.add(source)
+        entries.append((source, f"Term{len(entries)}"))
+    return entries
+
+
+def synthetic_transcript(entries, rng):
+    pieces = []
+    for source, _target in rng.sample(entries, 3):
+        pieces.append("".join(rng.choices(FILLER + KANJI, k=rng.randint(8, 20))))
+        pieces.append(source)
+    pieces.append("".join(rng.choices(FILLER, k=10)))
+    return "".join(pieces)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--transcripts", type=int, default=200)
+    parser.add_argument("--glossary", type=Path)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    entries = load_glossary(args.glossary) if args.glossary else synthetic_glossary(args.entries, rng)
+    if len(entries) < 3:
+        print("Need at least three glossary entries.", file=sys.stderr)
+        return 1
+    transcripts = [synthetic_transcript(entries, rng) for _ in range(args.transcripts)]
+
+    started = time.perf_counter()
+    index = GlossarySourceIndex(entries)
+    build = time.perf_counter() - started
+
+    legacy_times, index_times, selected = [], [], []
+    for transcript in transcripts:
+        started = time.perf_counter()
+        expected = legacy_filter(entries, transcript)
+        legacy_times.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        chosen = index.select(transcript)
+        index_times.append(time.perf_counter() - started)
+        if chosen != expected:
+            print(f"Selections differ for {transcript!r}", file=sys.stderr)
+            return 1
+        selected.append(chosen)
+
+    full_tokens = estimate_tokens(prompt_lines(entries))
+    sent_tokens = statistics.mean(estimate_tokens(prompt_lines(chosen)) for chosen in selected)
+    print(f"{len(entries)} entries, {len(transcripts)} transcripts, index built in {build * 1000:.1f} ms")
+    print(f"per-entry filter: {statistics.mean(legacy_times) * 1000:8.3f} ms per transcript")
+    print(f"source index    : {statistics.mean(index_times) * 1000:8.3f} ms per transcript")
+    print(f"entries sent    : {statistics.mean(len(chosen) for chosen in selected):.1f} on average")
+    print(f"glossary tokens : ~{full_tokens:,} with every entry, ~{sent_tokens:,.0f} selected "
+          f"({100.0 * (1 - sent_tokens / max(1, full_tokens)):.1f}% saved)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
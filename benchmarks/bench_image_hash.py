@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Measure perceptual-hash speed and accuracy over a folder of captures.
+
+Usage:
+  python benchmarks/bench_image_hash.py FOLDER [--crop 0,0.6,1,1] [--max-distance 3]
+
+Images directly in FOLDER are treated as different dialogue boxes. Images in
+the same subfolder are treated as captures of the same box, for example a
+sequence with a blinking text-advance arrow.
+
+The report gives, per hash method:
+  - hash time per image, including decoding the file
+  - false positives: pairs of different boxes within --max-distance
+  - matched duplicates: same-box pairs within --max-distance
+
+Every image is also used for a synthetic check. Two lines of random words are
+drawn into the text box (the --crop region, or the bottom third). The same
+frame with an advance arrow, or re-saved as JPEG, should match. The frames with
+different words, or with only the last word changed, should not, and count as
+false positives when they do.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import itertools
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+from image_hash import (  # noqa: E402
+    HASH_METHODS,
+    hamming_distance,
+    hash_image,
+    image_hash,
+    parse_crop,
+)
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".bmp"}
+WORDS = (
+    "the forest is quiet tonight stay close and keep your sword shield ready "
+    "where did merchant go he said would wait by bridge we must reach castle "
+    "before dawn king has fallen ill potion three gold coins thank you"
+).split()
+
+
+def collect(folder: Path):
+    """Return (group, path) pairs; each subfolder is one group."""
+    captures = []
+    for path in sorted(folder.rglob("*")):
+        if path.suffix.lower() not in IMAGE_SUFFIXES or not path.is_file():
+            continue
+        parent = path.parent.relative_to(folder)
+        group = str(parent) if parent != Path(".") else str(path)
+        captures.append((group, path))
+    return captures
+
+
+def text_box(image, crop):
+    width, height = image.size
+    left, top, right, bottom = crop or (0.0, 2.0 / 3.0, 1.0, 1.0)
+    return (round(left * width), round(top * height), round(right * width), round(bottom * height))
+
+
+def dialogue_words(seed, changed_word=False):
+    words = random.Random(seed).choices(WORDS, k=14)
+    if changed_word:
+        words[-1] = next(word for word in WORDS if word != words[-1])
+    return words
+
+
+def with_dialogue(image, crop, words):
+    """Draw a dialogue box with two lines of words over the text box."""
+    image = image.convert("RGB")
+    x0, y0, x1, y1 = text_box(image, crop)
+    size = max(10, (y1 - y0) // 6)
+    try:
+        font = ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 has a single bitmap font size
+        font = ImageFont.load_default()
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((x0, y0, x1 - 1, y1 - 1), fill=(12, 12, 40))
+    draw.multiline_text(
+        (x0 + size, y0 + size // 2),
+        " ".join(words[:7]) + "\n" + " ".join(words[7:]),
+        fill="white", font=font, spacing=size // 3,
+    )
+    return image
+
+
+def with_advance_arrow(image, crop):
+    """Draw a small text-advance arrow near the bottom-right of the text box."""
+    image = image.copy()
+    _x0, _y0, x1, y1 = text_box(image, crop)
+    size = max(4, round(0.02 * image.size[0]))
+    x, y = x1 - 3 * size, y1 - 2 * size
+    ImageDraw.Draw(image).polygon(
+        [(x, y), (x + size, y), (x + size // 2, y + size)], fill="white"
+    )
+    return image
+
+
+def recompressed(image):
+    encoded = io.BytesIO()
+    image.save(encoded, format="JPEG", quality=85)
+    encoded.seek(0)
+    return Image.open(encoded)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("folder", type=Path)
+    parser.add_argument("--crop", default="", help="text box as left,top,right,bottom fractions")
+    parser.add_argument("--max-distance", type=int, default=3)
+    args = parser.parse_args()
+
+    crop = parse_crop(args.crop)
+    captures = collect(args.folder)
+    if len(captures) < 2:
+        print("Need at least two images.", file=sys.stderr)
+        return 1
+    print(f"{len(captures)} images in {len({group for group, _ in captures})} groups, "
+          f"crop={crop}, max distance={args.max_distance}")
+
+    for method in HASH_METHODS:
+        image_hash(str(captures[0][1]), method, crop)  # warm up imports
+        timings, hashes = [], []
+        for _group, path in captures:
+            started = time.perf_counter()
+            hashes.append(image_hash(str(path), method, crop))
+            timings.append(time.perf_counter() - started)
+
+        different = same = false_positive = same_matched = 0
+        for (first, second) in itertools.combinations(range(len(captures)), 2):
+            close = hamming_distance(hashes[first], hashes[second]) <= args.max_distance
+            if captures[first][0] == captures[second][0]:
+                same += 1
+                same_matched += close
+            else:
+                different += 1
+                false_positive += close
+
+        synthetic = {"arrow": [], "jpeg": [], "text": [], "word": []}
+        for index, (_group, path) in enumerate(captures):
+            with Image.open(path) as image:
+                frame = with_dialogue(image, crop, dialogue_words(2 * index))
+                other = with_dialogue(image, crop, dialogue_words(2 * index + 1))
+                word = with_dialogue(image, crop, dialogue_words(2 * index, True))
+            base = hash_image(frame, method, crop)
+            for name, variant in (
+                ("arrow", with_advance_arrow(frame, crop)),
+                ("jpeg", recompressed(frame)),
+                ("text", other),
+                ("word", word),
+            ):
+                synthetic[name].append(hamming_distance(base, hash_image(variant, method, crop)))
+
+        timings.sort()
+        print(f"\n{method}: {statistics.mean(timings) * 1000:.1f} ms mean, "
+              f"{timings[int(0.95 * (len(timings) - 1))] * 1000:.1f} ms p95 per image")
+        print(f"  false positives : {false_positive}/{different} different-box pairs "
+              f"({100.0 * false_positive / max(1, different):.2f}%)")
+        if same:
+            print(f"  same-box pairs  : {same_matched}/{same} matched")
+        for name, distances in synthetic.items():
+            matched = sum(distance <= args.max_distance for distance in distances)
+            label = "false positives" if name in ("text", "word") else "matched"
+            print(f"  synthetic {name:5s}: {matched}/{len(distances)} {label}, "
+                  f"distance {min(distances)}-{max(distances)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
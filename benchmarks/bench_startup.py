@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Measure script import times and Study Library bridge startup.
+
+Usage:
+  python benchmarks/bench_startup.py [--db PATH] [--groups 300] [--repeat 15] [--no-site]
+
+The Study Library UI waits on ``study_library.py`` for every refresh and
+selection, so the wall time of its pure-SQLite commands is the UI stall. This
+benchmark reports:
+
+* ``python -X importtime`` totals for the helper scripts, each in a fresh
+  interpreter and without the ``site`` import that precedes it;
+* the median wall time of the bridge commands, run as the UI runs them,
+  against ``--db`` or a synthetic library of ``--groups`` explanations;
+* the median round trip of the same commands through the persistent bridge
+  server (``STUDY_LIBRARY_SERVER=1``).
+
+``--no-site`` runs the bridge with ``python -S``. That is closer to the
+bundled portable Python, whose ``._pth`` file skips ``site``; a full Python
+with many ``.pth`` files in site-packages can add 50-100 ms before the
+script starts. The empty-interpreter row shows this floor.
+
+Baselines (1 CPU Linux sandbox, Python 3.11; medians, ms). "Before" is the
+tree before lazy imports, with the UI starting study_library.py directly:
+
+  import                   before  after
+  study_library                31     15
+  anki_bridge                  74     39
+  anki_candidates              98     61
+  study_export                372     64
+  image_hash                  134     15
+  screenshot_translator       179     82
+
+  bridge command           before  after   (python -S)
+  empty interpreter            16     15
+  snapshot                    120     70
+  detail                      126     68
+  storage                     118     67
+
+With ``site`` (about 70 ms of .pth processing in that sandbox) snapshot went
+from 137 to about 100 ms. Through the bridge server (Unix socket in that
+sandbox) snapshot takes about 10 ms, detail 2 ms and storage 3 ms.
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import os
+import re
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parents[1] / "scripts"
+sys.path.insert(0, str(SCRIPTS))
+from study_library_sections import (  # noqa: E402
+    ensure_section_schema,
+    replace_explanation_sections,
+)
+
+MODULES = (
+    "study_library",
+    "anki_bridge",
+    "anki_candidates",
+    "study_export",
+    "image_hash",
+    "screenshot_translator",
+)
+IMPORTTIME_RE = re.compile(r"^import time:\s*\d+\s*\|\s*(\d+)\s*\|\s*(\S.*)$")
+# Cached bytecode is part of what is measured, so let the runs write it.
+ENV = {
+    **{name: value for name, value in os.environ.items() if name != "PYTHONDONTWRITEBYTECODE"},
+    "PYTHONPATH": str(SCRIPTS),
+}
+
+EXPLANATION = """## Translation
+"Mind the gate, traveller. The old bridge fell last winter."
+
+## Vocabulary
+- 門 (もん) — gate
+- 旅人 (たびびと) — traveller
+- 橋 (はし) — bridge
+
+## Grammar
+- ～に気をつけて: be careful of ～
+"""
+
+
+def study_library_schema() -> str:
+    """Read STUDY_LIBRARY_SCHEMA from explainer.py without running the script."""
+    tree = ast.parse((SCRIPTS / "explainer.py").read_text(encoding="utf-8"))
+    for node in tree.body:
+        if (
+            isinstance(node, ast.Assign)
+            and any(getattr(target, "id", "") == "STUDY_LIBRARY_SCHEMA" for target in node.targets)
+        ):
+            return ast.literal_eval(node.value)
+    raise RuntimeError("STUDY_LIBRARY_SCHEMA not found in explainer.py")
+
+
+def synthetic_library(path: Path, groups: int) -> None:
+    connection = sqlite3.connect(path)
+    try:
+        connection.executescript(study_library_schema())
+        ensure_section_schema(connection)
+        for index in range(1, groups + 1):
+            created = f"2026-01-{1 + index % 28:02d}T12:{index % 60:02d}:00+00:00"
+            group_id = connection.execute(
+                "INSERT INTO explanation_groups("
+                "game_profile, source_hash, source_kind, source_japanese, created_at, updated_at"
+                ") VALUES(?, ?, 'text', ?, ?, ?)",
+                ("Demo", f"{index:064x}", f"旅人よ、門に気をつけて。{index}", created, created),
+            ).lastrowid
+            explanation_id = connection.execute(
+                "INSERT INTO explanations("
+                "group_id, version, created_at, provider, model, prompt_profile, raw_text, preferred"
+                ") VALUES(?, 1, ?, 'openai', 'gpt', 'default', ?, 1)",
+                (group_id, created, EXPLANATION),
+            ).lastrowid
+            replace_explanation_sections(connection, explanation_id, EXPLANATION)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def import_ms(module: str) -> float:
+    """Cumulative import time of ``module`` in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SCRIPTS, capture_output=True, text=True, env=ENV,
+    )
+    if result.returncode != 0:
+        return float("nan")
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match and match.group(2) == module:
+            return int(match.group(1)) / 1000
+    return float("nan")
+
+
+def wall_ms(command: list, repeat: int) -> float:
+    """Median wall time after one warm-up run that refreshes the bytecode cache."""
+    times = []
+    for _ in range(repeat + 1):
+        started = time.perf_counter()
+        subprocess.run(command, cwd=SCRIPTS, check=True, stdout=subprocess.DEVNULL, env=ENV)
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times[1:])
+
+
+@contextmanager
+def bridge_server(work: str):
+    """Run study_library_server.py with its endpoint under ``work``."""
+    os.environ["TEMP"] = work  # read once, when the module is imported
+    import study_library_server
+
+    process = subprocess.Popen(
+        [sys.executable, str(SCRIPTS / "study_library_server.py")],
+        cwd=SCRIPTS, env={**ENV, "TEMP": work},
+    )
+    try:
+        for _ in range(100):
+            try:
+                study_library_server.request("ping")
+                break
+            except (OSError, ValueError):
+                time.sleep(0.05)
+        yield study_library_server.request
+    finally:
+        process.kill()
+        process.wait()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", type=Path)
+    parser.add_argument("--groups", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=15)
+    parser.add_argument("--no-site", action="store_true", help="run the bridge with python -S")
+    args = parser.parse_args()
+
+    print(f"{'import':24s} {'ms':>7s}")
+    for module in MODULES:
+        samples = [import_ms(module) for _ in range(max(1, args.repeat // 3) + 1)]
+        print(f"{module:24s} {statistics.median(samples[1:]):7.1f}")
+
+    python = [sys.executable] + (["-S"] if args.no_site else [])
+    with tempfile.TemporaryDirectory() as work:
+        database = args.db
+        if database is None:
+            database = Path(work) / "study_library.db"
+            synthetic_library(database, args.groups)
+        bridge = python + [
+            str(SCRIPTS / "study_library_launcher.py"), "{command}",
+            "--db", str(database), "--output-dir", work,
+        ]
+        subprocess.run(
+            [part.format(command="ensure") for part in bridge], cwd=SCRIPTS, check=True, env=ENV
+        )
+        print()
+        print(f"{'bridge command':24s} {'ms':>7s}" + ("  (-S)" if args.no_site else ""))
+        print(f"{'empty interpreter':24s} {wall_ms(python + ['-c', 'pass'], args.repeat):7.1f}")
+        for command, extra in (
+            ("snapshot", []),
+            ("detail", ["--group-id", "1"]),
+            ("storage", []),
+        ):
+            line = [part.format(command=command) for part in bridge] + extra
+            print(f"{command:24s} {wall_ms(line, args.repeat):7.1f}")
+
+        print()
+        print(f"{'bridge server':24s} {'ms':>7s}")
+        with bridge_server(work) as request:
+            for command, group_id in (("snapshot", 0), ("detail", 1), ("storage", 0)):
+                times = []
+                for _ in range(args.repeat + 1):
+                    started = time.perf_counter()
+                    status, exit_code, message = request(command, str(database), work, group_id)
+                    times.append((time.perf_counter() - started) * 1000)
+                    if status != "ok" or exit_code:
+                        raise RuntimeError(f"{command}: {status} {exit_code} {message}")
+                print(f"{command:24s} {statistics.median(times[1:]):7.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
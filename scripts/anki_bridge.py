@@ -17,8 +17,6 @@ import sqlite3
 import subprocess
 import sys
 import unicodedata
-import urllib.error
-import urllib.request
 from datetime import datetime
 from pathlib import Path
 from typing import Iterable
@@ -117,6 +115,10 @@ def anki_process_running() -> bool:
 
 
 def invoke(action: str, params: dict | None = None, timeout: float = 8.0):
+    # urllib.request pulls in http.client and ssl; only AnkiConnect calls need it.
+    import urllib.error
+    import urllib.request
+
     payload = json.dumps(
         {"action": action, "version": ANKI_CONNECT_VERSION, "params": params or {}},
         ensure_ascii=False,
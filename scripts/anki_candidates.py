@@ -31,7 +31,6 @@ from anki_bridge import (
     plain_text,
     remove_readings,
 )
-from example_sentence import call_model, extract_json_object, load_project_environment
 
 
 REVIEW_METADATA_KEY = "anki_candidates_reviewed_through"
@@ -960,6 +959,8 @@ def generate_recommendations(
     additional_criteria_hex: str = "",
     force: bool = False,
 ) -> int:
+    from example_sentence import call_model, extract_json_object
+
     status_path = output_dir / "candidate_recommendation_status.tsv"
     error_path = output_dir / "candidate_recommendation_error.txt"
     for path in (status_path, error_path):
@@ -1221,8 +1222,13 @@ def build_parser() -> argparse.ArgumentParser:
 
 
 def main() -> int:
-    load_project_environment()
     arguments = build_parser().parse_args()
+    if arguments.command == "generate-recommendations":
+        # Only the model call needs .env; the other commands are plain SQLite
+        # work and skip importing dotenv and the provider helpers.
+        from example_sentence import load_project_environment
+
+        load_project_environment()
     if arguments.command == "snapshot":
         return snapshot(
             arguments.db,
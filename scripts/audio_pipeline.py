@@ -0,0 +1,394 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Preallocated conversion and framing of live-audio capture blocks.
+
+``live_audio_translator`` records 100 ms float blocks from the loopback
+device and streams them to the provider as base64 PCM inside a JSON event.
+The helpers here do that work in buffers that are allocated once per stream:
+
+- ``PolyphaseResampler`` converts the device's native rate to the
+  provider's rate with a precomputed polyphase filter bank.
+- ``PcmConverter`` downmixes, resamples, clips and scales into reusable float and int16
+  arrays with ``out=`` ufuncs and returns a view of the int16 buffer.
+- ``VoiceGate`` optionally drops silent blocks before they are queued.
+- ``PcmRing`` hands converted blocks from the recorder thread to the
+  asyncio sender without locks and batches them when the sender falls behind.
+- ``AudioFrameEncoder`` serializes the provider event once around a
+  placeholder and base64-encodes each block through lookup tables straight
+  into a reusable ``bytearray`` between the fixed JSON prefix and suffix.
+
+The PCM and the event frames match the bytes of the original
+``astype``/``b64encode``/``json.dumps`` path exactly.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from functools import lru_cache
+from typing import Any, Dict
+
+import numpy as np
+
+AUDIO_PLACEHOLDER = "__JRPG_AUDIO__"
+
+_BASE64_CHARS = (
+    b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+)
+
+
+@lru_cache(maxsize=None)
+def _base64_pair_tables() -> tuple[np.ndarray, np.ndarray]:
+    """Map each little-endian byte pair of a 3-byte group to two characters.
+
+    The first table takes bytes 0 and 1 and gives characters 0 and 1; the
+    second takes bytes 1 and 2 and gives characters 2 and 3. Both are stored
+    as little-endian ``uint16`` so they can be written straight into a frame.
+    """
+    alphabet = np.frombuffer(_BASE64_CHARS, dtype=np.uint8).astype(np.uint16)
+    pair = np.arange(1 << 16, dtype=np.uint32)
+    low, high = pair & 0xFF, pair >> 8
+    leading = alphabet[low >> 2] | alphabet[((low & 0x03) << 4) | (high >> 4)] << 8
+    trailing = alphabet[((low & 0x0F) << 2) | (high >> 6)] | alphabet[high & 0x3F] << 8
+    return leading.astype("<u2"), trailing.astype("<u2")
+
+
+class PolyphaseResampler:
+    """Streaming rational-ratio resampler for fixed-size mono float blocks.
+
+    A Kaiser-windowed sinc low-pass is split into ``up`` phases. Because every
+    block has the same length, the input index and filter phase of each output
+    sample repeat from block to block; they are computed once, and a block is
+    resampled with one gather, one multiply and one row sum into reusable
+    buffers. The last input samples are carried over as filter history.
+    """
+
+    def __init__(
+        self,
+        input_rate: int,
+        output_rate: int,
+        block_frames: int,
+        zero_crossings: int = 8,
+        beta: float = 8.0,
+    ) -> None:
+        divisor = math.gcd(int(input_rate), int(output_rate))
+        up = int(output_rate) // divisor
+        down = int(input_rate) // divisor
+        if (block_frames * up) % down:
+            raise ValueError(
+                f"{block_frames} frames at {input_rate} Hz do not give a whole "
+                f"number of frames at {output_rate} Hz."
+            )
+        self.input_frames = block_frames
+        self.output_frames = block_frames * up // down
+
+        factor = max(up, down)
+        half = zero_crossings * factor
+        offsets = np.arange(-half, half + 1)
+        cutoff = 0.5 / factor
+        prototype = (
+            2.0 * cutoff * np.sinc(2.0 * cutoff * offsets)
+            * np.kaiser(offsets.size, beta) * up
+        )
+        taps = -(-prototype.size // up)
+        prototype = np.concatenate([prototype, np.zeros(taps * up - prototype.size)])
+
+        position = np.arange(self.output_frames) * down
+        tap = np.arange(taps)
+        self._coefficients = prototype[
+            (position % up)[:, None] + tap[None, :] * up
+        ].astype(np.float32)
+        self._history = taps - 1
+        self._indices = self._history + (position // up)[:, None] - tap[None, :]
+        self._buffer = np.zeros(self._history + block_frames, dtype=np.float32)
+        self._gathered = np.empty(self._coefficients.shape, dtype=np.float32)
+        self._output = np.empty(self.output_frames, dtype=np.float32)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Resample one block; the result is overwritten by the next call."""
+        buffer = self._buffer
+        np.copyto(buffer[self._history:], block, casting="unsafe")
+        np.take(buffer, self._indices, out=self._gathered)
+        np.multiply(self._gathered, self._coefficients, out=self._gathered)
+        np.sum(self._gathered, axis=1, out=self._output)
+        if self._history:
+            buffer[:self._history] = buffer[-self._history:]
+        return self._output
+
+
+class PcmConverter:
+    """Convert recorded float blocks to little-endian 16-bit mono PCM."""
+
+    def __init__(self, resampler: PolyphaseResampler | None = None) -> None:
+        self.resampler = resampler
+        self._mono = np.empty(0, dtype=np.float32)
+        self._pcm = np.empty(0, dtype="<i2")
+
+    def _buffers(self, frames: int, dtype) -> None:
+        if self._mono.shape[0] != frames or self._mono.dtype != dtype:
+            self._mono = np.empty(frames, dtype=dtype)
+
+    def convert(self, data: np.ndarray, out: np.ndarray | None = None) -> memoryview:
+        """Return the PCM bytes of ``data``.
+
+        The samples are written to ``out`` (an int16 array of the output
+        block's length) when given, otherwise to the converter's own buffer, which
+        the next call overwrites.
+        """
+        if data.ndim == 2 and data.shape[1] > 1:
+            dtype = data.dtype if data.dtype.kind == "f" else np.float64
+            self._buffers(data.shape[0], dtype)
+            mono = self._mono
+            # Channel-by-channel adds avoid the buffering of an axis reduction.
+            np.copyto(mono, data[:, 0], casting="unsafe")
+            for channel in range(1, data.shape[1]):
+                np.add(mono, data[:, channel], out=mono, casting="unsafe")
+            np.divide(mono, data.shape[1], out=mono)
+        else:
+            flat = data.reshape(-1)
+            dtype = flat.dtype if flat.dtype.kind == "f" else np.float64
+            self._buffers(flat.shape[0], dtype)
+            mono = self._mono
+            np.copyto(mono, flat, casting="unsafe")
+        if self.resampler is not None:
+            mono = self.resampler.process(mono)
+        np.clip(mono, -1.0, 1.0, out=mono)
+        np.multiply(mono, 32767.0, out=mono)
+        if out is None:
+            if self._pcm.shape[0] != mono.shape[0]:
+                self._pcm = np.empty(mono.shape[0], dtype="<i2")
+            out = self._pcm
+        np.copyto(out, mono, casting="unsafe")
+        return memoryview(out).cast("B")
+
+
+class VoiceGate:
+    """Energy-based voice-activity gate for 16-bit PCM blocks.
+
+    A block is voiced when its RMS level reaches ``threshold_dbfs``. With
+    ``spectral`` enabled it must also carry at least ``min_speech_ratio`` of
+    its energy in the 300-3400 Hz speech band and have a spectral flatness
+    of at most ``max_flatness``, which rejects hiss and broadband noise.
+
+    Blocks keep flowing for ``hangover_blocks`` after the last voiced block,
+    so provider-side turn detection still hears the pause after a line. Up to
+    ``preroll_blocks`` of the silence before speech are held back and sent
+    with the first voiced block. ``keepalive_blocks`` (0 disables it) lets
+    one silent block through at that interval during long silences.
+    """
+
+    def __init__(
+        self,
+        block_frames: int,
+        sample_rate: int,
+        threshold_dbfs: float = -50.0,
+        hangover_blocks: int = 8,
+        preroll_blocks: int = 2,
+        keepalive_blocks: int = 0,
+        spectral: bool = False,
+        min_speech_ratio: float = 0.35,
+        max_flatness: float = 0.5,
+    ) -> None:
+        self.block_frames = block_frames
+        # Compare mean squares instead of taking a square root and logarithm.
+        level = 10.0 ** (threshold_dbfs / 20.0) * 32768.0
+        self._threshold = level * level * block_frames
+        self.hangover_blocks = max(0, int(hangover_blocks))
+        self.keepalive_blocks = max(0, int(keepalive_blocks))
+        self.spectral = spectral
+        self.min_speech_ratio = min_speech_ratio
+        self.max_flatness = max_flatness
+        self._work = np.empty(block_frames, dtype=np.float32)
+        self._free = [
+            np.empty(block_frames, dtype="<i2")
+            for _ in range(max(0, int(preroll_blocks)))
+        ]
+        self._held: list = []
+        self.last_voiced = False
+        self._since_voice = self.hangover_blocks + 1
+        self._silent_run = 0
+        if spectral:
+            frequencies = np.fft.rfftfreq(block_frames, 1.0 / sample_rate)
+            self._window = np.hanning(block_frames).astype(np.float32)
+            self._speech_band = (frequencies >= 300.0) & (frequencies <= 3400.0)
+        self.sent_blocks = 0
+        self.suppressed_blocks = 0
+
+    def is_voiced(self, pcm: np.ndarray) -> bool:
+        work = self._work
+        np.copyto(work, pcm, casting="unsafe")
+        if float(np.dot(work, work)) < self._threshold:
+            return False
+        if not self.spectral:
+            return True
+        np.multiply(work, self._window, out=work)
+        power = np.abs(np.fft.rfft(work)) ** 2
+        total = float(power.sum())
+        if total <= 0.0:
+            return False
+        if float(power[self._speech_band].sum()) / total < self.min_speech_ratio:
+            return False
+        power += 1e-12
+        flatness = float(np.exp(np.mean(np.log(power)))) / float(np.mean(power))
+        return flatness <= self.max_flatness
+
+    def process(self, pcm: np.ndarray) -> list:
+        """Return the blocks to send for ``pcm``, oldest first.
+
+        Returned pre-roll blocks stay valid until the next call.
+        """
+        self.last_voiced = self.is_voiced(pcm)
+        if self.last_voiced:
+            self._since_voice = 0
+        else:
+            self._since_voice += 1
+
+        if self._since_voice <= self.hangover_blocks:
+            blocks = self._held + [pcm]
+            self._free.extend(self._held)
+            self._held = []
+            self._silent_run = 0
+            self.suppressed_blocks -= len(blocks) - 1
+            self.sent_blocks += len(blocks)
+            return blocks
+
+        self._silent_run += 1
+        if self.keepalive_blocks and self._silent_run % self.keepalive_blocks == 0:
+            # Held blocks are older than this one and must not follow it.
+            self._free.extend(self._held)
+            self._held = []
+            self.sent_blocks += 1
+            return [pcm]
+        self.suppressed_blocks += 1
+        if self._free or self._held:
+            buffer = self._free.pop() if self._free else self._held.pop(0)
+            np.copyto(buffer, pcm)
+            self._held.append(buffer)
+        return []
+
+
+class PcmRing:
+    """Bounded single-producer, single-consumer ring of PCM blocks.
+
+    The recorder thread only advances ``written`` and the sender only
+    advances ``read``, so neither side needs a lock. When the ring is full the
+    incoming block is dropped and counted as an overrun; queued audio is kept
+    so the stream stays contiguous up to the drop.
+    """
+
+    def __init__(self, block_frames: int, capacity: int) -> None:
+        self.capacity = max(2, int(capacity))
+        self._blocks = np.zeros((self.capacity, block_frames), dtype="<i2")
+        self._captured_at = np.zeros(self.capacity, dtype=np.float64)
+        self.written = 0
+        self.read = 0
+        self.overruns = 0
+        self.underruns = 0
+
+    def available(self) -> int:
+        return self.written - self.read
+
+    def write_slot(self) -> np.ndarray | None:
+        """Return the next free block, or ``None`` (an overrun) when full."""
+        if self.written - self.read >= self.capacity:
+            self.overruns += 1
+            return None
+        return self._blocks[self.written % self.capacity]
+
+    def commit(self, captured_at: float = 0.0) -> None:
+        self._captured_at[self.written % self.capacity] = captured_at
+        self.written += 1
+
+    def captured_at(self, count: int) -> np.ndarray:
+        """Return the capture times of the next ``count`` queued blocks."""
+        start = self.read % self.capacity
+        return self._captured_at[start:start + count]
+
+    def peek(self, max_blocks: int) -> tuple[memoryview, int]:
+        """Return up to ``max_blocks`` queued blocks as one contiguous view.
+
+        A batch never wraps around the end of the ring; the rest follows in
+        the next call. Pass the count to ``release`` once the bytes are sent.
+        """
+        start = self.read % self.capacity
+        count = min(self.available(), max_blocks, self.capacity - start)
+        pcm = self._blocks[start:start + count].reshape(-1)
+        return memoryview(pcm).cast("B"), count
+
+    def release(self, count: int) -> None:
+        self.read += count
+
+
+class AudioFrameEncoder:
+    """Build a provider's JSON audio event from a pre-serialized template.
+
+    ``template`` is the event with ``AUDIO_PLACEHOLDER`` in place of the
+    base64 audio string. ``encode`` returns UTF-8 JSON in a reusable
+    ``bytearray``; send it as a text frame before encoding the next block.
+
+    Every 3-byte group is read as two overlapping byte pairs, and each pair
+    is looked up in a 65536-entry table that yields two characters, so a
+    block takes two gathers and no payload-sized ``bytes`` is created. One
+    frame is kept per payload length, which covers the few batch sizes
+    ``PcmRing`` hands out.
+    """
+
+    def __init__(self, template: Dict[str, Any]) -> None:
+        serialized = json.dumps(template)
+        if serialized.count(AUDIO_PLACEHOLDER) != 1:
+            raise ValueError("The audio event template needs one audio placeholder.")
+        prefix, suffix = serialized.split(AUDIO_PLACEHOLDER)
+        self._prefix = prefix.encode("utf-8")
+        self._suffix = suffix.encode("utf-8")
+        self._leading, self._trailing = _base64_pair_tables()
+        self._frames: Dict[int, tuple[bytearray, np.ndarray, np.ndarray]] = {}
+        self._index = np.empty(0, dtype=np.intp)
+        self._pairs = np.empty(0, dtype="<u2")
+
+    def _frame(self, source_length: int) -> tuple[bytearray, np.ndarray, np.ndarray]:
+        entry = self._frames.get(source_length)
+        if entry is None:
+            groups, tail = divmod(source_length, 3)
+            payload_length = 4 * (groups + (1 if tail else 0))
+            start = len(self._prefix)
+            frame = bytearray(start + payload_length + len(self._suffix))
+            frame[:start] = self._prefix
+            frame[start + payload_length:] = self._suffix
+            # Characters 0-1 and 2-3 of every group, as strided uint16 views.
+            leading = np.ndarray((groups,), "<u2", frame, start, (4,))
+            trailing = np.ndarray((groups,), "<u2", frame, start + 2, (4,))
+            entry = self._frames[source_length] = (frame, leading, trailing)
+            if self._index.size < groups:
+                self._index = np.empty(groups, dtype=np.intp)
+                self._pairs = np.empty(groups, dtype="<u2")
+        return entry
+
+    def encode(self, pcm) -> bytearray:
+        # Base64 never needs JSON escaping, so it is written in as-is.
+        source = np.frombuffer(pcm, dtype=np.uint8)
+        frame, leading, trailing = self._frame(source.size)
+        groups, tail = divmod(source.size, 3)
+        if groups:
+            index = self._index[:groups]
+            pairs = self._pairs[:groups]
+            # np.take buffers a strided ``out``, so gather into a contiguous
+            # scratch array and copy that into the frame.
+            np.copyto(index, np.ndarray((groups,), "<u2", source, 0, (3,)))
+            np.take(self._leading, index, out=pairs, mode="clip")
+            np.copyto(leading, pairs)
+            np.copyto(index, np.ndarray((groups,), "<u2", source, 1, (3,)))
+            np.take(self._trailing, index, out=pairs, mode="clip")
+            np.copyto(trailing, pairs)
+        if tail:
+            # The last one or two bytes are padded with "=" as b64encode does.
+            offset = 3 * groups
+            position = len(self._prefix) + 4 * groups
+            first = source.item(offset)
+            second = source.item(offset + 1) if tail == 2 else 0
+            frame[position] = _BASE64_CHARS[first >> 2]
+            frame[position + 1] = _BASE64_CHARS[((first & 0x03) << 4) | (second >> 4)]
+            frame[position + 2] = (
+                _BASE64_CHARS[(second & 0x0F) << 2] if tail == 2 else 0x3D
+            )
+            frame[position + 3] = 0x3D
+        return frame
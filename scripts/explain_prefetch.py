@@ -0,0 +1,514 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Prefetch explanations of freshly translated lines in the background.
+
+With ``EXPLAIN_PREFETCH=1`` every successful screenshot translation hands its
+transcript to a small scheduler worker. The worker runs explainer.py for that
+line at low priority, with the overlay and both archives left alone, and the
+answer lands in the explanation cache (the option turns ``EXPLAIN_CACHE`` on).
+Pressing Explain for the line then replays the cached answer at once. When
+the prefetch is still running, explainer.py waits for it instead of sending a
+second request.
+
+A prefetch sends the line's text only. The cached screenshots may already
+belong to a newer capture by the time it starts, and an explanation of text
+is cached under the text alone, so the Explain button finds it either way.
+
+Provider, model and prompt profile come from the Explanation tab's saved
+settings in control.ini, as the Explain button uses them; a prefetch made
+under other settings simply misses the cache.
+
+Only the newest line waits to start: a newer line replaces it. When the
+concurrency limit is reached, the oldest running prefetch is cancelled to make
+room, so a prefetch never outlives more than ``MAX_CONCURRENT`` newer lines.
+Each start counts against the per-minute limit (a line that was already in the
+cache gives its slot back), and the tokens each finished prefetch used are
+added to a daily total in ``%TEMP%\\JRPG_Overlay``. A line arriving after the
+daily cap is reached is dropped. Cancelled requests are not charged tokens,
+although the provider may bill the part it had generated.
+
+Options (environment):
+  EXPLAIN_PREFETCH                 1 to prefetch explanations (default off)
+  EXPLAIN_PREFETCH_MAX_CONCURRENT  prefetches running at once (default 1)
+  EXPLAIN_PREFETCH_MAX_PER_MINUTE  prefetches started per minute (default 6)
+  EXPLAIN_PREFETCH_DAILY_TOKENS    tokens per local day, 0 for no cap
+                                   (default 200000)
+  EXPLAIN_PREFETCH_IDLE_SECONDS    worker exits after this idle time
+                                   (default 600)
+
+Usage:
+  python explain_prefetch.py --status
+  python explain_prefetch.py --serve [JOB_FILE]   (started by the translator)
+"""
+
+from __future__ import annotations
+
+import configparser
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+from local_worker import (  # noqa: E402
+    OVERLAY_DIR,
+    WorkerUnavailable,
+    idle_seconds,
+    serve,
+    source_fingerprint,
+    spawn,
+    submit,
+)
+
+WORKER_NAME = "explain_prefetch"
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+EXPLAINER = os.path.join(SCRIPT_DIR, "explainer.py")
+USAGE_FILE = os.path.join(OVERLAY_DIR, "explain_prefetch_usage.json")
+DEFAULT_MAX_CONCURRENT = 1
+DEFAULT_MAX_PER_MINUTE = 6
+DEFAULT_DAILY_TOKENS = 200_000
+# explainer.py gives its provider call 75 s; the control panel gives up after 120 s.
+PREFETCH_TIMEOUT_SECONDS = 120.0
+# How long a pressed Explain waits for a running prefetch before asking itself.
+WAIT_SECONDS = 30.0
+RECENT_LINES = 50
+BELOW_NORMAL_PRIORITY_CLASS = 0x00004000
+CREATE_NO_WINDOW = 0x08000000
+
+
+@dataclass(frozen=True)
+class PrefetchBudget:
+    max_concurrent: int = DEFAULT_MAX_CONCURRENT
+    max_per_minute: int = DEFAULT_MAX_PER_MINUTE
+    daily_tokens: int = DEFAULT_DAILY_TOKENS  # 0 = no cap
+
+    @classmethod
+    def from_env(cls, environment: Dict[str, str]) -> "PrefetchBudget":
+        def number(name: str, default: int, minimum: int) -> int:
+            try:
+                return max(minimum, int(float(environment.get(name, "") or default)))
+            except ValueError:
+                return default
+
+        return cls(
+            max_concurrent=number("EXPLAIN_PREFETCH_MAX_CONCURRENT", DEFAULT_MAX_CONCURRENT, 1),
+            max_per_minute=number("EXPLAIN_PREFETCH_MAX_PER_MINUTE", DEFAULT_MAX_PER_MINUTE, 1),
+            daily_tokens=number("EXPLAIN_PREFETCH_DAILY_TOKENS", DEFAULT_DAILY_TOKENS, 0),
+        )
+
+
+@dataclass
+class Prefetch:
+    source: str
+    environment: Dict[str, str]
+    budget: PrefetchBudget
+    cwd: str = ""
+    process: Optional[subprocess.Popen] = None
+    started: float = 0.0
+    files: List[str] = field(default_factory=list)
+
+    @property
+    def settings(self) -> Tuple[str, ...]:
+        """The settings that select the explanation cache entry, besides the line."""
+        return tuple(
+            self.environment.get(name, "")
+            for name in (
+                "EXPLAIN_PROVIDER", "EXPLAIN_MODEL", "GEMINI_EXPLAIN_MODEL",
+                "EXPLAIN_PROMPT_FILE", "SETTINGS_DIR",
+            )
+        )
+
+
+def worker_fingerprint() -> str:
+    return source_fingerprint([
+        os.path.abspath(__file__),
+        os.path.join(SCRIPT_DIR, "local_worker.py"),
+    ])
+
+
+def read_control_ini(settings_dir: str) -> Optional[configparser.ConfigParser]:
+    path = os.path.join(settings_dir, "control.ini")
+    if not os.path.isfile(path):
+        return None
+    for encoding in (
+        "utf-8", "utf-8-sig", "utf-16", "utf-16-le", "utf-16-be",
+        "cp1252", "cp932",
+    ):
+        try:
+            config = configparser.ConfigParser(interpolation=None)
+            with open(path, "r", encoding=encoding) as ini_file:
+                config.read_file(ini_file)
+            return config
+        except Exception:
+            continue
+    return None
+
+
+def explainer_environment(environment: Dict[str, str]) -> Dict[str, str]:
+    """Return the environment of a prefetch run, set up like the Explain button."""
+    settings_dir = (
+        environment.get("SETTINGS_DIR", "").strip()
+        or os.path.join(PROJECT_ROOT, "Settings")
+    )
+    config = read_control_ini(settings_dir)
+
+    def setting(section: str, name: str, default: str) -> str:
+        value = config.get(section, name, fallback="").strip() if config else ""
+        return value or default
+
+    provider = setting("cfg_explainer", "explainProvider", "openai").lower()
+    if provider not in ("openai", "gemini"):
+        provider = "openai"
+    gemini_model = setting("cfg_explainer", "explainGeminiModel", "gemini-2.5-flash")
+    if not gemini_model.startswith("models/"):
+        gemini_model = "models/" + gemini_model
+    prompt_profile = setting("cfg", "explainPromptProfile", "default_en")
+    prompt_file = os.path.join(settings_dir, "prompts_explain", prompt_profile + ".txt")
+
+    result = dict(environment)
+    result.update({
+        "EXPLAIN_PROVIDER": provider,
+        "EXPLAIN_MODEL": (
+            setting("cfg_explainer", "explainOpenAIModel", "gpt-4o-mini")
+            if provider == "openai" else ""
+        ),
+        "GEMINI_EXPLAIN_MODEL": gemini_model if provider == "gemini" else "",
+        "EXPLAIN_PROMPT_FILE": prompt_file if os.path.isfile(prompt_file) else "",
+        "EXPLAIN_PROMPT_PROFILE": prompt_profile,
+        "SETTINGS_DIR": settings_dir,
+        "EXPLAIN_CACHE": "1",
+        "EXPLAIN_CACHE_REGENERATE": "0",
+        "EXPLAIN_PREFETCH": "0",
+        "EXPLAIN_STREAM": "0",
+        "EXPLAIN_UPDATE_OVERLAY": "0",
+        "SAVE_EXPLAINS": "0",
+        "SAVE_STUDY_LIBRARY": "0",
+        "EXPLAIN_ERROR_FILE": "",
+        "JRPG_MODEL_TIMEOUT_SECONDS": "75",
+        "PYTHONIOENCODING": "utf-8",
+    })
+    return result
+
+
+def read_usage() -> Dict[str, Any]:
+    """Today's prefetch counts; a new day starts from zero."""
+    try:
+        with open(USAGE_FILE, "r", encoding="utf-8") as usage_file:
+            data = json.load(usage_file)
+    except Exception:
+        data = {}
+    if not isinstance(data, dict) or data.get("day") != date.today().isoformat():
+        data = {"day": date.today().isoformat()}
+    for name in ("tokens", "prefetched", "cached", "cancelled", "failed"):
+        data.setdefault(name, 0)
+    return data
+
+
+def write_usage(data: Dict[str, Any]) -> None:
+    try:
+        tmp = USAGE_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as usage_file:
+            json.dump(data, usage_file, indent=2)
+        os.replace(tmp, USAGE_FILE)
+    except Exception:
+        pass
+
+
+class PrefetchScheduler:
+    """Start, supersede and account for prefetch runs of explainer.py."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.pending: Optional[Prefetch] = None
+        self.running: List[Prefetch] = []
+        self.starts: Deque[float] = deque()
+        self.recent: Deque[Tuple[str, Tuple[str, ...]]] = deque(maxlen=RECENT_LINES)
+        self.counter = 0
+
+    def handle(self, job: Dict[str, Any], client_waiting: Callable[[], bool]) -> Dict[str, Any]:
+        command = job.get("command")
+        source = (job.get("source") or "").strip()
+        if command == "prefetch":
+            return self.queue(source, job.get("env") or dict(os.environ), job.get("cwd") or "")
+        if command == "status":
+            return self.status(source, bool(job.get("claim")))
+        if command == "usage":
+            with self.lock:
+                return {**read_usage(), "running": len(self.running)}
+        return {"status": "error", "error": f"Unknown command: {command}"}
+
+    def queue(self, source: str, environment: Dict[str, str], cwd: str) -> Dict[str, Any]:
+        if not source:
+            return {"status": "ignored"}
+        environment = explainer_environment(environment)
+        prefetch = Prefetch(source, environment, PrefetchBudget.from_env(environment), cwd)
+        with self.lock:
+            if (source, prefetch.settings) in self.recent or any(
+                (running.source, running.settings) == (source, prefetch.settings)
+                for running in self.running
+            ):
+                self.pending = None  # the newest line is already covered
+                return {"status": "covered"}
+            self.pending = prefetch
+        self.wake.set()
+        return {"status": "queued"}
+
+    def status(self, source: str, claim: bool) -> Dict[str, Any]:
+        """Report whether a prefetch of ``source`` runs or is about to start.
+
+        With ``claim``, a prefetch of ``source`` still held back by the budget
+        is dropped: the caller is about to explain the line itself.
+        """
+        with self.lock:
+            if any(running.source == source for running in self.running):
+                return {"in_flight": True}
+            pending = self.pending
+            if pending is None or pending.source != source:
+                return {"in_flight": False}
+            if self._can_start(pending.budget):
+                return {"in_flight": True}
+            if claim:
+                self.pending = None
+            return {"in_flight": False}
+
+    def run(self) -> None:
+        while True:
+            self.wake.wait(0.25)
+            self.wake.clear()
+            with self.lock:
+                self._reap()
+                self._start_pending()
+
+    def _can_start(self, budget: PrefetchBudget) -> bool:
+        now = time.monotonic()
+        while self.starts and now - self.starts[0] >= 60.0:
+            self.starts.popleft()
+        if len(self.starts) >= budget.max_per_minute:
+            return False
+        return not budget.daily_tokens or read_usage()["tokens"] < budget.daily_tokens
+
+    def _start_pending(self) -> None:
+        prefetch = self.pending
+        if prefetch is None:
+            return
+        budget = prefetch.budget
+        if budget.daily_tokens and read_usage()["tokens"] >= budget.daily_tokens:
+            self.pending = None
+            print(f"(Prefetch) daily cap of {budget.daily_tokens:,} tokens reached", file=sys.stderr)
+            return
+        if not self._can_start(budget):
+            return  # wait for a per-minute slot; a newer line may replace this one
+        while len(self.running) >= budget.max_concurrent:
+            self._cancel(self.running.pop(0))
+        self.pending = None
+
+        self.counter += 1
+        stem = os.path.join(OVERLAY_DIR, f"explain_prefetch.{os.getpid()}.{self.counter}")
+        source_file, usage_file = stem + ".txt", stem + ".usage.json"
+        # An empty list, not an empty name, which would mean last_src.txt.
+        paths_file = stem + ".paths.txt"
+        prefetch.files = [source_file, usage_file, paths_file]
+        environment = dict(prefetch.environment)
+        environment.update({
+            "EXPLAIN_SOURCE_TEXT_FILE": source_file,
+            "EXPLAIN_SOURCE_PATHS_FILE": paths_file,
+            "EXPLAIN_USAGE_FILE": usage_file,
+            "JRPG_REQUEST_ID": f"prefetch-{time.time_ns()}",
+        })
+        kwargs: Dict[str, Any] = {
+            "stdin": subprocess.DEVNULL,
+            "stdout": subprocess.DEVNULL,
+            "stderr": subprocess.DEVNULL,
+            "env": environment,
+        }
+        if prefetch.cwd and os.path.isdir(prefetch.cwd):
+            kwargs["cwd"] = prefetch.cwd
+        if sys.platform == "win32":
+            kwargs["creationflags"] = BELOW_NORMAL_PRIORITY_CLASS | CREATE_NO_WINDOW
+        try:
+            with open(source_file, "w", encoding="utf-8") as text_file:
+                text_file.write(prefetch.source)
+            open(paths_file, "w", encoding="utf-8").close()
+            prefetch.process = subprocess.Popen([sys.executable, EXPLAINER], **kwargs)
+        except Exception as exc:
+            print(f"(Prefetch) could not start: {exc}", file=sys.stderr)
+            self._remove_files(prefetch)
+            return
+        if hasattr(os, "setpriority"):
+            try:
+                os.setpriority(os.PRIO_PROCESS, prefetch.process.pid, 10)
+            except OSError:
+                pass
+        prefetch.started = time.monotonic()
+        self.starts.append(prefetch.started)
+        self.running.append(prefetch)
+
+    def _reap(self) -> None:
+        for prefetch in list(self.running):
+            exit_code = prefetch.process.poll()
+            if exit_code is None:
+                if time.monotonic() - prefetch.started >= PREFETCH_TIMEOUT_SECONDS:
+                    self.running.remove(prefetch)
+                    self._cancel(prefetch)
+                continue
+            self.running.remove(prefetch)
+            try:
+                with open(prefetch.files[1], "r", encoding="utf-8") as usage_file:
+                    used = json.load(usage_file)
+            except Exception:
+                used = {}
+            usage = read_usage()
+            usage["tokens"] += int(used.get("tokens") or 0)
+            if exit_code != 0:
+                usage["failed"] += 1
+            elif used.get("cached"):
+                usage["cached"] += 1
+                if prefetch.started in self.starts:
+                    self.starts.remove(prefetch.started)
+            else:
+                usage["prefetched"] += 1
+            write_usage(usage)
+            if exit_code == 0:
+                self.recent.append((prefetch.source, prefetch.settings))
+            self._remove_files(prefetch)
+
+    def _cancel(self, prefetch: Prefetch) -> None:
+        try:
+            prefetch.process.kill()
+            prefetch.process.wait(timeout=5)
+        except Exception:
+            pass
+        usage = read_usage()
+        usage["cancelled"] += 1
+        write_usage(usage)
+        self._remove_files(prefetch)
+
+    @staticmethod
+    def _remove_files(prefetch: Prefetch) -> None:
+        for path in prefetch.files:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def schedule(source: str) -> None:
+    """Queue an explanation of ``source``, starting the scheduler if needed.
+
+    Never raises: a prefetch is only ever an optimisation.
+    """
+    source = (source or "").strip()
+    if not source:
+        return
+    job = {"command": "prefetch", "source": source, "env": dict(os.environ), "cwd": os.getcwd()}
+    try:
+        submit(WORKER_NAME, job, fingerprint=worker_fingerprint())
+        return
+    except WorkerUnavailable:
+        pass
+    except Exception as exc:
+        print(f"(Prefetch) {exc}", file=sys.stderr)
+        return
+    # The new worker inherits this environment, so the job file holds only
+    # the line; API keys never land in %TEMP%.
+    job_file = os.path.join(OVERLAY_DIR, f"explain_prefetch.{os.getpid()}.{time.time_ns()}.job")
+    try:
+        os.makedirs(OVERLAY_DIR, exist_ok=True)
+        with open(job_file, "w", encoding="utf-8") as f:
+            json.dump({"command": "prefetch", "source": source, "cwd": os.getcwd()}, f)
+    except OSError:
+        return
+    spawn([os.path.abspath(__file__), "--serve", job_file])
+
+
+def wait_for_prefetch(source: str, lookup: Callable[[], Any],
+                      timeout: float = WAIT_SECONDS) -> Any:
+    """Wait while a prefetch of ``source`` runs, then return ``lookup()``.
+
+    Returns None at once when no prefetch of the line is running, and after
+    ``timeout`` seconds when it is still not done.
+    """
+    source = (source or "").strip()
+    deadline = time.monotonic() + timeout
+    claim = True
+    while True:
+        try:
+            reply = submit(WORKER_NAME, {"command": "status", "source": source, "claim": claim})
+        except Exception:
+            return None
+        claim = False
+        if not isinstance(reply, dict) or not reply.get("in_flight"):
+            return lookup()
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(0.2)
+        found = lookup()
+        if found is not None:
+            return found
+
+
+def serve_worker(job_file: str = "") -> None:
+    job = None
+    if job_file:
+        try:
+            with open(job_file, "r", encoding="utf-8") as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            job = None
+        try:
+            os.remove(job_file)
+        except OSError:
+            pass
+    if isinstance(job, dict):
+        job["env"] = dict(os.environ)
+        try:
+            # Another translation may have started a worker first.
+            submit(WORKER_NAME, job, fingerprint=worker_fingerprint())
+            return
+        except WorkerUnavailable:
+            pass
+    scheduler = PrefetchScheduler()
+    if isinstance(job, dict):
+        scheduler.handle(job, lambda: False)
+    threading.Thread(target=scheduler.run, name="explain-prefetch", daemon=True).start()
+    serve(
+        WORKER_NAME,
+        scheduler.handle,
+        fingerprint=worker_fingerprint(),
+        idle_timeout=idle_seconds("EXPLAIN_PREFETCH_IDLE_SECONDS"),
+    )
+
+
+def main(argv: List[str]) -> int:
+    if argv[:1] == ["--serve"]:
+        serve_worker(argv[1] if len(argv) > 1 else "")
+        return 0
+    if argv == ["--status"]:
+        try:
+            usage = submit(WORKER_NAME, {"command": "usage"})
+        except WorkerUnavailable:
+            usage = read_usage()
+        budget = PrefetchBudget.from_env(dict(os.environ))
+        cap = f"{budget.daily_tokens:,}" if budget.daily_tokens else "no cap"
+        print(
+            f"{usage['day']}: {usage['prefetched']} prefetched, {usage['cached']} already cached, "
+            f"{usage['cancelled']} cancelled, {usage['failed']} failed; "
+            f"{usage['tokens']:,} tokens ({cap}); {usage.get('running', 0)} running"
+        )
+        return 0
+    print(__doc__.split("Usage:")[-1].strip(), file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -1,10 +1,26 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+"""Japanese-learning explanations for the Explainer overlay and Study Library.
+
+``ExplainerEngine`` reads the provider, model, prompt and glossaries once and
+then explains any number of lines: ``explain(jp, source_paths, options)``
+returns an ``ExplainResult``, and ``ExplainOptions`` says where the result
+goes (overlay, archives, caches). Run as a script, it explains the last
+translated line once, with every setting read from the environment the
+control panel exports.
+
+Usage:
+  python explainer.py
+
+  engine = ExplainerEngine()
+  result = engine.explain("旅人よ、門に気をつけて。", [], ExplainOptions(update_overlay=False))
+"""
 
 import configparser
 import base64
 import hashlib
 import io
+import json
 import mimetypes
 import os
 import re
@@ -12,8 +28,14 @@ import shutil
 import sqlite3
 import sys
 import tempfile
+import time
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Tuple
+from typing import Any, List, Optional, Sequence, Tuple
+
+# JRPG_PROFILE=1 times the stages from here on (see stage_profile.py).
+_MODULE_STARTED = time.perf_counter()
+_MODULE_STARTED_WALL = time.time()
 
 # The packaged Python runtime is isolated by python312._pth and does not include
 # the launched script's directory automatically. Add it explicitly before
@@ -21,9 +43,21 @@ from typing import List, Tuple
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 if SCRIPT_DIR not in sys.path:
     sys.path.insert(0, SCRIPT_DIR)
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
 
 from dotenv import load_dotenv
 
+from glossary_engine import (
+    GlossaryEntries,
+    apply_glossary,
+    estimate_tokens,
+    load_glossary,
+    select_glossary_for_transcript,
+)
+from image_prep import ImageBatch, read_image
+from result_cache import TranslationCache, cache_key
+from stream_preview import CompletedLines, StreamPreview
+from stage_profile import StageProfile, profiling_enabled
 from study_library_sections import (
     SECTION_SCHEMA,
     ensure_section_schema,
@@ -31,11 +65,7 @@ from study_library_sections import (
     extract_strict_speaker_header,
     replace_explanation_sections,
 )
-
-# Console UTF-8 (Windows safe)
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8", errors="replace")
-
+
 # Shared temp folder (same as audio + overlay)
 TEMP_DIR      = os.environ.get("TEMP") or tempfile.gettempdir()
 OVERLAY_DIR   = os.path.join(TEMP_DIR, "JRPG_Overlay")
@@ -43,14 +73,7 @@ LAST_JP       = os.path.join(OVERLAY_DIR, "last_jp.txt")
 LAST_SRC      = os.path.join(OVERLAY_DIR, "last_src.txt")
 EXPLAINER_TXT = os.path.join(OVERLAY_DIR, "explainer.txt")
 EXPLAINER_DONE = os.path.join(OVERLAY_DIR, "explainer.done")
-os.makedirs(OVERLAY_DIR, exist_ok=True)
-
-MODEL_TIMEOUT_SECONDS = max(
-    15.0,
-    min(180.0, float(os.environ.get("JRPG_MODEL_TIMEOUT_SECONDS", "75"))),
-)
-
-import time  # add near the other imports
+PROFILE_LOG   = os.path.join(OVERLAY_DIR, "profile_log.jsonl")
 
 def atomic_write_text(path: str, text: str):
     tmp = path + ".tmp"
@@ -77,8 +100,8 @@ def request_completion_token() -> str:
     return (os.environ.get("JRPG_REQUEST_ID") or "").strip() or str(time.time_ns())
 
 
-def signal_explainer_completion() -> None:
-    atomic_write_text(EXPLAINER_DONE, request_completion_token())
+def signal_explainer_completion(token: str = "") -> None:
+    atomic_write_text(EXPLAINER_DONE, token or request_completion_token())
 
 
 def friendly_provider_error(provider_name: str, exc: Exception) -> str:
@@ -133,6 +156,8 @@ EXPLANATION_ARCHIVE_RE = re.compile(
 EXPLANATION_SOURCE_HEADER = "=== Japanese (source) ==="
 EXPLANATION_BODY_HEADER = "=== Explanation ==="
 SCREENSHOT_SOURCE_NOTE = "[Source supplied as cached screenshot(s)]"
+# Newest archive and its source hash, so a save does not list the whole folder.
+EXPLANATION_INDEX_NAME = ".explain_index.json"
 
 
 def explanation_source_block(jp: str, source_paths: List[str]) -> str:
@@ -168,45 +193,113 @@ def read_archived_explanation_source(path: str) -> str:
     return archived[start:end].strip()
 
 
-def next_explanation_archive_path(
-    explains_dir: str, jp: str, source_paths: List[str]
-) -> str:
-    """Keep consecutive repeats together as _v02, _v03, etc."""
-    from datetime import datetime, timedelta
+def explanation_source_hash(source_block: str) -> str:
+    """Hash the normalized source; empty when there is no source to compare."""
+    normalized = normalize_explanation_source(source_block)
+    if normalized in ("jp:", "screenshots:"):
+        return ""
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def read_explanation_index(explains_dir: str) -> Optional[dict]:
+    """Return the archive index, or None when the folder changed behind its back.
 
-    newest = None
+    Creating, deleting or renaming a file changes the folder's modification
+    time, and editing the newest archive changes its own, so comparing both
+    with the recorded values detects outside edits without listing the folder.
+    """
+    try:
+        with open(
+            os.path.join(explains_dir, EXPLANATION_INDEX_NAME), "r", encoding="utf-8"
+        ) as index_file:
+            index = json.load(index_file)
+        if index["folder_mtime_ns"] != os.stat(explains_dir).st_mtime_ns:
+            return None
+        newest = index["newest"]
+        if newest is not None:
+            if not EXPLANATION_ARCHIVE_RE.match(newest["name"]):
+                return None
+            stat = os.stat(os.path.join(explains_dir, newest["name"]))
+            if (stat.st_mtime_ns, stat.st_size) != (newest["mtime_ns"], newest["size"]):
+                return None
+        return index
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def write_explanation_index(
+    explains_dir: str, newest_name: str, source_hash: str
+) -> None:
+    """Record the newest archive; a failure only costs one folder scan later."""
+    index_path = os.path.join(explains_dir, EXPLANATION_INDEX_NAME)
+    try:
+        if not os.path.exists(index_path):
+            open(index_path, "w", encoding="utf-8").close()
+        newest = None
+        if newest_name:
+            stat = os.stat(os.path.join(explains_dir, newest_name))
+            newest = {
+                "name": newest_name,
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "source_hash": source_hash,
+            }
+        # Rewrite the existing file in place: replacing it would change the
+        # folder's modification time that the index has just recorded.
+        index = {"folder_mtime_ns": os.stat(explains_dir).st_mtime_ns, "newest": newest}
+        with open(index_path, "r+", encoding="utf-8") as index_file:
+            json.dump(index, index_file)
+            index_file.truncate()
+    except OSError:
+        pass
+
+
+def rebuild_explanation_index(explains_dir: str) -> Optional[dict]:
+    """Find the newest archive by listing the folder, then save the index."""
+    newest_name = ""
     newest_key = None
     for name in os.listdir(explains_dir):
-        match = EXPLANATION_ARCHIVE_RE.match(name)
-        if not match:
+        if not EXPLANATION_ARCHIVE_RE.match(name):
             continue
-        path = os.path.join(explains_dir, name)
         try:
-            key = (os.path.getmtime(path), name.lower())
+            key = (os.path.getmtime(os.path.join(explains_dir, name)), name.lower())
         except OSError:
             continue
         if newest_key is None or key > newest_key:
-            newest = (path, match)
+            newest_name = name
             newest_key = key
-
-    current_source = normalize_explanation_source(
-        explanation_source_block(jp, source_paths)
-    )
-    if newest is not None:
-        newest_path, newest_match = newest
-        previous_source = normalize_explanation_source(
-            read_archived_explanation_source(newest_path)
+    source_hash = ""
+    if newest_name:
+        source_hash = explanation_source_hash(
+            read_archived_explanation_source(os.path.join(explains_dir, newest_name))
         )
-        if previous_source and previous_source == current_source:
-            base = newest_match.group("timestamp")
-            version = int(newest_match.group("version") or "1") + 1
-            while True:
-                candidate = os.path.join(
-                    explains_dir, f"{base}_explain_v{version:02d}.txt"
-                )
-                if not os.path.exists(candidate):
-                    return candidate
-                version += 1
+    write_explanation_index(explains_dir, newest_name, source_hash)
+    if not newest_name:
+        return None
+    return {"name": newest_name, "source_hash": source_hash}
+
+
+def next_explanation_archive_path(
+    explains_dir: str, jp: str, source_paths: List[str]
+) -> str:
+    """Keep consecutive repeats together as _v02, _v03, etc."""
+    from datetime import datetime, timedelta
+
+    index = read_explanation_index(explains_dir)
+    newest = index["newest"] if index is not None else rebuild_explanation_index(explains_dir)
+
+    current_hash = explanation_source_hash(explanation_source_block(jp, source_paths))
+    if newest is not None and newest["source_hash"] and newest["source_hash"] == current_hash:
+        newest_match = EXPLANATION_ARCHIVE_RE.match(newest["name"])
+        base = newest_match.group("timestamp")
+        version = int(newest_match.group("version") or "1") + 1
+        while True:
+            candidate = os.path.join(
+                explains_dir, f"{base}_explain_v{version:02d}.txt"
+            )
+            if not os.path.exists(candidate):
+                return candidate
+            version += 1
 
     # Preserve the unversioned first-attempt format. If two different sources are
     # archived within the same second, advance the filename timestamp rather than
@@ -240,6 +333,11 @@ def archive_plain_text(
             archive_file.write(explanation_source_block(jp, source_paths) + "\r\n\r\n")
             archive_file.write(EXPLANATION_BODY_HEADER + "\r\n")
             archive_file.write(text + "\r\n")
+        write_explanation_index(
+            explains_dir,
+            os.path.basename(out_path),
+            explanation_source_hash(explanation_source_block(jp, source_paths)),
+        )
         print(f"(Archived) {out_path}")
         return out_path
     except Exception as exc:
@@ -321,7 +419,7 @@ def study_source_identity(jp: str, source_paths: List[str]) -> Tuple[str, str]:
         image_hashes = []
         for source_path in source_paths:
             try:
-                image_hashes.append(file_sha256(source_path))
+                image_hashes.append(read_image(source_path).sha256)
             except OSError:
                 continue
         identity = "images:" + "|".join(image_hashes)
@@ -495,133 +593,27 @@ def archive_study_library_entry(
 
 
 def file_to_data_url(path: str) -> str:
-    mime_type = mimetypes.guess_type(path)[0] or "image/png"
-    with open(path, "rb") as image_file:
-        encoded = base64.b64encode(image_file.read()).decode("ascii")
-    return f"data:{mime_type};base64,{encoded}"
-
-
-def load_glossary(path: str) -> List[Tuple[str, str]]:
-    """Load source-to-target mappings using the translator's accepted formats."""
-    entries: List[Tuple[str, str]] = []
-    if not path or not os.path.isfile(path):
-        return entries
-
-    encodings = [
-        "utf-8", "utf-8-sig", "utf-16", "utf-16-le", "utf-16-be",
-        "cp1252", "cp932",
-    ]
-    text = None
-    for encoding in encodings:
-        try:
-            with open(path, "r", encoding=encoding) as glossary_file:
-                text = glossary_file.read()
-            break
-        except Exception:
-            continue
-    if text is None:
-        return entries
-
-    for raw_line in text.splitlines():
-        line = raw_line.replace("\ufeff", "").strip()
-        if not line or line.startswith("#"):
-            continue
-        source = target = None
-        for separator in ("->", "→", "\t", ":", "="):
-            if separator in line:
-                source_part, target_part = line.split(separator, 1)
-                source, target = source_part.strip(), target_part.strip()
-                break
-        if source and target:
-            entries.append((source, target))
-    return entries
-
-
-def _sentence_case(text: str) -> str:
-    lowered = text.lower()
-    for index, char in enumerate(lowered):
-        if char.isalpha():
-            return lowered[:index] + char.upper() + lowered[index + 1:]
-    return lowered
-
-
-def _adapt_glossary_case(source: str, target: str, matched: str) -> str:
-    """Adapt a replacement's case unless its source declares canonical casing."""
-    source_first_letter = next((char for char in source if char.isalpha()), "")
-    if source_first_letter.isupper():
-        return target
-
-    matched_letters = [char for char in matched if char.isalpha()]
-    if not matched_letters:
-        return target
-    if all(char.isupper() for char in matched_letters):
-        return target.upper()
-    if all(char.islower() for char in matched_letters):
-        return target.lower()
-
-    if re.search(r"\s", source):
-        words = re.findall(r"[^\W\d_]+", matched, flags=re.UNICODE)
-        if words and all(
-            word[0].isupper() and word[1:].islower() for word in words
-        ):
-            return target.title()
-
-    if matched_letters[0].isupper() and all(
-        char.islower() for char in matched_letters[1:]
-    ):
-        return _sentence_case(target)
-
-    return target
+    image = read_image(path)
+    encoded = base64.b64encode(image.data).decode("ascii")
+    return f"data:{image.mime};base64,{encoded}"
 
 
 def apply_target_glossary(
     text: str,
-    glossary: List[Tuple[str, str]],
+    glossary: GlossaryEntries,
     protected_text: str = "",
 ) -> str:
     """Apply target-language replacements while preserving original source text."""
-    protected_segments = []
-    if protected_text:
-        if protected_text in text:
-            protected_segments = [protected_text]
-        else:
-            protected_segments = [
-                line for line in protected_text.splitlines() if line.strip()
-            ]
-
-    protected_values = []
-    out = text
-    for index, segment in enumerate(protected_segments):
-        token = f"\x00JRPG_PROTECTED_SOURCE_{index}\x00"
-        if segment in out:
-            out = out.replace(segment, token, 1)
-            protected_values.append((token, segment))
-
-    for source, target in glossary:
-        if re.search(r"\s", source):
-            pattern = re.compile(re.escape(source), flags=re.IGNORECASE)
-            out = pattern.sub(
-                lambda match: _adapt_glossary_case(
-                    source, target, match.group(0)
-                ),
-                out,
-            )
-        else:
-            pattern = re.compile(
-                rf"\b(?P<core>{re.escape(source)})(?P<suf>s|'s|’s)?\b",
-                flags=re.IGNORECASE,
-            )
-            out = pattern.sub(
-                lambda match: (
-                    _adapt_glossary_case(source, target, match.group("core"))
-                    + (match.group("suf") or "")
-                ),
-                out,
-            )
+    return apply_glossary(text, glossary, protected_text=protected_text)
+
+
+STREAM_METADATA_RE = re.compile(r"\[\[JRPG_TRANSLATOR_METADATA\]\]", re.IGNORECASE)
 
-    for token, segment in protected_values:
-        out = out.replace(token, segment)
-    return out
+
+def visible_stream_text(text: str) -> str:
+    """Drop the private metadata footer from a response that is still streaming."""
+    marker = STREAM_METADATA_RE.search(text)
+    return text[: marker.start()] if marker else text
 
 
 def build_source_glossary_prompt(glossary: List[Tuple[str, str]]) -> str:
@@ -695,59 +687,40 @@ def resolve_glossary_settings(project_root: str) -> Tuple[str, str, bool]:
         target_path = os.path.join(glossary_dir, target_profile, "en2en.txt")
     return source_path, target_path, enabled
 
-# Env + provider
-try:
-    from pathlib import Path
-    from dotenv import find_dotenv
+def load_env_files() -> None:
+    """Load API keys and options from the first .env file found."""
+    try:
+        from pathlib import Path
+        from dotenv import find_dotenv
 
-    # Project root (parent of /scripts or /bin, works in both cases)
-    _ROOT = Path(__file__).resolve().parents[1]
+        # Project root (parent of /scripts or /bin, works in both cases)
+        root = Path(__file__).resolve().parents[1]
 
-    # 1) If Control Panel exposes SETTINGS_DIR, prefer that
-    _SETTINGS_DIR = os.environ.get("SETTINGS_DIR", "").strip()
-    _ENV_FROM_SETTINGS_DIR = Path(_SETTINGS_DIR) / ".env" if _SETTINGS_DIR else None
+        # 1) If Control Panel exposes SETTINGS_DIR, prefer that
+        settings_dir = os.environ.get("SETTINGS_DIR", "").strip()
+        env_from_settings_dir = Path(settings_dir) / ".env" if settings_dir else None
 
-    # 2) Fallbacks
-    _ENV_SETTINGS = _ROOT / "Settings" / ".env"
-    _ENV_ROOT     = _ROOT / ".env"
+        # 2) Fallbacks
+        env_settings = root / "Settings" / ".env"
+        env_root = root / ".env"
 
-    # Try in priority order
-    for _p in (
-        _ENV_FROM_SETTINGS_DIR if _ENV_FROM_SETTINGS_DIR and _ENV_FROM_SETTINGS_DIR.exists() else None,
-        _ENV_SETTINGS if _ENV_SETTINGS.exists() else None,
-        _ENV_ROOT if _ENV_ROOT.exists() else None,
-    ):
-        if _p:
-            load_dotenv(_p, override=False, encoding="utf-8-sig")
-            break
-    else:
-        # Last resort: search from current working directory
-        p = find_dotenv(usecwd=True)
-        if p:
-            load_dotenv(p, override=False, encoding="utf-8-sig")
-except Exception:
-    pass
-PROVIDER   = (os.environ.get("EXPLAIN_PROVIDER") or os.environ.get("PROVIDER", "openai")).strip().lower()
-MODEL_NAME = os.environ.get("EXPLAIN_MODEL", "gpt-4o-mini")
-GEM_MODEL  = os.environ.get("GEMINI_EXPLAIN_MODEL", "gemini-2.5-flash")
-if not GEM_MODEL.startswith("models/"):
-    GEM_MODEL = "models/" + GEM_MODEL
+        # Try in priority order
+        for env_path in (
+            env_from_settings_dir if env_from_settings_dir and env_from_settings_dir.exists() else None,
+            env_settings if env_settings.exists() else None,
+            env_root if env_root.exists() else None,
+        ):
+            if env_path:
+                load_dotenv(env_path, override=False, encoding="utf-8-sig")
+                break
+        else:
+            # Last resort: search from current working directory
+            p = find_dotenv(usecwd=True)
+            if p:
+                load_dotenv(p, override=False, encoding="utf-8-sig")
+    except Exception:
+        pass
 
-# Optional custom prompt from file
-EXPLAIN_PROMPT_FILE = os.environ.get("EXPLAIN_PROMPT_FILE", "").strip()
-
-PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
-(
-    JP2TL_GLOSSARY_PATH,
-    TL2TL_GLOSSARY_PATH,
-    USE_TERMINOLOGY_OVERRIDES,
-) = resolve_glossary_settings(PROJECT_ROOT)
-JP2TL_GLOSSARY = (
-    load_glossary(JP2TL_GLOSSARY_PATH) if USE_TERMINOLOGY_OVERRIDES else []
-)
-TL2TL_GLOSSARY = (
-    load_glossary(TL2TL_GLOSSARY_PATH) if USE_TERMINOLOGY_OVERRIDES else []
-)
 
 BASE_PROMPT = """You are a friendly tutor for learners of Japanese (upper beginner to intermediate).
 Input is a short Japanese line (from a JRPG). Produce a concise, readable explanation in PLAIN TEXT.
@@ -790,6 +763,58 @@ Metadata rules:
 """.strip()
 
 
+def gemini_chunk_text(chunk) -> str:
+    """Return the text of one streamed Gemini chunk, or ""."""
+    try:
+        return getattr(chunk, "text", None) or ""
+    except Exception:
+        return ""
+
+
+def provider_token_count(usage) -> Optional[int]:
+    """Total tokens of an OpenAI ``usage`` or a Gemini ``usage_metadata``."""
+    if usage is None:
+        return None
+    for total, parts in (
+        ("total_tokens", ("input_tokens", "output_tokens")),
+        ("total_token_count", ("prompt_token_count", "candidates_token_count")),
+    ):
+        try:
+            value = getattr(usage, total, None)
+            if value:
+                return int(value)
+            counts = [getattr(usage, name, None) for name in parts]
+            if any(counts):
+                return sum(int(count or 0) for count in counts)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def estimate_image_tokens(source_paths: Sequence[str]) -> int:
+    """Estimate the input tokens of uploaded screenshots.
+
+    Uses OpenAI's high-detail rule: fit within 2048x2048, scale the short side
+    down to 768, then 170 tokens per 512-pixel tile plus 85. Gemini's 258-token
+    768-pixel tiles give a similar total for game screenshots.
+    """
+    tokens = 0
+    for source_path in source_paths:
+        try:
+            from PIL import Image
+
+            with Image.open(source_path) as image:
+                width, height = image.size
+        except Exception:
+            width, height = 1920, 1080
+        scale = min(1.0, 2048 / max(width, height, 1))
+        scale *= min(1.0, 768 / max(min(width, height) * scale, 1))
+        columns = -(-round(width * scale) // 512)
+        rows = -(-round(height * scale) // 512)
+        tokens += 85 + 170 * max(1, columns * rows)
+    return tokens
+
+
 def gemini_safety_settings(types):
     """Disable Gemini's adjustable content filters for faithful explanation."""
     return [
@@ -805,111 +830,582 @@ def gemini_safety_settings(types):
         )
     ]
 
-prompt_tpl = BASE_PROMPT
-if EXPLAIN_PROMPT_FILE and os.path.isfile(EXPLAIN_PROMPT_FILE):
+
+def gemini_api_key() -> str:
+    # Accept normal + local names
+    api_key = (
+        os.getenv("GEMINI_API_KEY")
+        or os.getenv("GOOGLE_API_KEY")
+        or os.getenv("GEMINI_LOCAL_KEY")
+        or os.getenv("GOOGLE_LOCAL_KEY")
+        or ""
+    )
+    api_key = api_key.strip().strip('"').strip("'")
+    if not api_key:
+        key_file = (os.getenv("GEMINI_API_KEY_FILE") or "").strip().strip('"').strip("'")
+        if key_file and os.path.isfile(key_file):
+            try:
+                with open(key_file, "r", encoding="utf-8") as kf:
+                    api_key = kf.read().strip()
+            except Exception:
+                pass
+    return api_key
+
+
+def openai_api_key() -> str:
+    # Handle BOM-prefixed names, common alternates, and *_FILE
+    bom = "\ufeff"
+    api_key = (
+        os.getenv("OPENAI_API_KEY")
+        or os.getenv(bom + "OPENAI_API_KEY")
+        or os.getenv("OPENAI_LOCAL_KEY")
+        or os.getenv(bom + "OPENAI_LOCAL_KEY")
+        or os.getenv("OPENAI_API_KEY_LOCAL")
+        or os.getenv(bom + "OPENAI_API_KEY_LOCAL")
+        or os.getenv("OPENAI_KEY")
+        or os.getenv(bom + "OPENAI_KEY")
+        or ""
+    )
+    api_key = api_key.strip().strip('"').strip("'")
+
+    if not api_key:
+        key_file = (
+            os.getenv("OPENAI_API_KEY_FILE")
+            or os.getenv(bom + "OPENAI_API_KEY_FILE")
+            or ""
+        ).strip().strip('"').strip("'")
+        if key_file and os.path.isfile(key_file):
+            try:
+                with open(key_file, "r", encoding="utf-8") as kf:
+                    api_key = kf.read().strip()
+            except Exception:
+                pass
+    return api_key
+
+
+def gemini_response_text(resp, text: str = "") -> str:
+    """Return the answer of a Gemini response, or a note on why there is none.
+
+    A streamed answer is passed in ``text`` and is already complete. Otherwise
+    handle the "blocked → no candidates" case cleanly; the last streamed chunk
+    carries the prompt feedback.
+    """
     try:
-        with open(EXPLAIN_PROMPT_FILE, "r", encoding="utf-8") as f:
-            prompt_tpl = f.read()
+        text = text or (getattr(resp, "text", "") or "").strip()
     except Exception:
-        pass
-
-source_text_file = os.environ.get("EXPLAIN_SOURCE_TEXT_FILE", "").strip()
-source_paths_file = os.environ.get("EXPLAIN_SOURCE_PATHS_FILE", "").strip()
-jp = read_text(source_text_file or LAST_JP).strip()
-source_paths = read_source_paths(source_paths_file)
-if not jp and not source_paths:
-    message = (
-        "Explanation could not start.\n\n"
-        "No Japanese source text was available. Translate a screenshot first and retry."
-    )
-    if env_flag("EXPLAIN_UPDATE_OVERLAY", True):
+        block_reason = None
         try:
-            atomic_write_text(EXPLAINER_TXT, message)
-            signal_explainer_completion()
+            fb = getattr(resp, "prompt_feedback", None)
+            block_reason = getattr(fb, "block_reason", None) if fb else None
         except Exception:
             pass
-    error_file = os.environ.get("EXPLAIN_ERROR_FILE", "").strip()
-    if error_file:
+        if block_reason:
+            text = f"(Gemini blocked the explanation; block_reason={block_reason})"
+        else:
+            text = "(Gemini returned no text candidates – likely blocked by safety settings.)"
+
+    if not text:
         try:
-            atomic_write_text(error_file, message)
+            candidates = getattr(resp, "candidates", None) or []
+            out_parts = []
+            for cand in candidates:
+                content = getattr(cand, "content", None)
+                if not content:
+                    continue
+                parts = getattr(content, "parts", None) or []
+                for part in parts:
+                    t = getattr(part, "text", None)
+                    if t:
+                        out_parts.append(t)
+            text = "".join(out_parts).strip()
         except Exception:
             pass
-    print(message, file=sys.stderr)
-    sys.exit(2)
-
-if jp:
-    prompt = prompt_tpl.format(jp=jp)
-else:
-    prompt = prompt_tpl.format(
-        jp="[Read the original Japanese from the attached screenshot(s), in order.]"
-    )
-    prompt += (
-        "\n\nThe original Japanese source is supplied in the attached screenshot(s). "
-        "Read only the Japanese text inside the dialogue, message, or menu box. "
-        "When multiple images are attached, treat them as consecutive parts of one passage "
-        "in the order supplied and join sentence fragments across image boundaries."
-    )
-source_glossary_prompt = build_source_glossary_prompt(JP2TL_GLOSSARY)
-if source_glossary_prompt:
-    prompt += "\n\n" + source_glossary_prompt
-prompt += "\n\n" + KEY_GRAMMAR_METADATA_INSTRUCTION
-
-try:
-    text = ""
+    if not text:
+        try:
+            prompt_feedback = getattr(resp, "prompt_feedback", None)
+            if prompt_feedback:
+                text = f"(Gemini returned no text; prompt_feedback={prompt_feedback})"
+        except Exception:
+            pass
+    if not text:
+        text = "(Gemini returned no text candidates.)"
+    return text
+
+
+@dataclass(frozen=True)
+class ExplainSettings:
+    """Provider, model, prompt template and glossaries, read once per engine."""
 
-    if PROVIDER == "gemini":
+    provider: str = "openai"
+    openai_model: str = "gpt-4o-mini"
+    gemini_model: str = "models/gemini-2.5-flash"
+    prompt_template: str = BASE_PROMPT
+    jp2tl_glossary: GlossaryEntries = field(default_factory=list)
+    tl2tl_glossary: GlossaryEntries = field(default_factory=list)
+    model_timeout_seconds: float = 75.0
+    cache_path: str = ""
+    cache_max_entries: int = 2000
+    cache_max_days: float = 90.0
+
+    @classmethod
+    def from_env(cls, profile: Optional[StageProfile] = None) -> "ExplainSettings":
+        """Load .env, then read the settings the control panel exports."""
+        if profile is None:
+            profile = StageProfile("explain", False)
+        load_env_files()
+        profile.lap("dotenv")
+        provider = (
+            os.environ.get("EXPLAIN_PROVIDER") or os.environ.get("PROVIDER", "openai")
+        ).strip().lower()
+        gemini_model = os.environ.get("GEMINI_EXPLAIN_MODEL", "gemini-2.5-flash")
+        if not gemini_model.startswith("models/"):
+            gemini_model = "models/" + gemini_model
+
+        # Optional custom prompt from file
+        prompt_template = BASE_PROMPT
+        prompt_file = os.environ.get("EXPLAIN_PROMPT_FILE", "").strip()
+        if prompt_file and os.path.isfile(prompt_file):
+            try:
+                with open(prompt_file, "r", encoding="utf-8") as f:
+                    prompt_template = f.read()
+            except Exception:
+                pass
+
         try:
-            from google import genai
-            from google.genai import types
-        except Exception as e:
-            raise RuntimeError(
-                "Missing google-genai package. Install with: python -m pip install -U google-genai"
-            ) from e
+            cache_max_entries = int(float(os.environ.get("EXPLAIN_CACHE_MAX_ENTRIES", "") or 2000))
+            cache_max_days = float(os.environ.get("EXPLAIN_CACHE_MAX_DAYS", "") or 90)
+        except ValueError:
+            cache_max_entries, cache_max_days = 2000, 90.0
+        glossary_source, glossary_target, use_overrides = resolve_glossary_settings(PROJECT_ROOT)
+        profile.lap("settings")
+        settings = cls(
+            provider=provider,
+            openai_model=os.environ.get("EXPLAIN_MODEL", "gpt-4o-mini"),
+            gemini_model=gemini_model,
+            prompt_template=prompt_template,
+            jp2tl_glossary=load_glossary(glossary_source) if use_overrides else [],
+            tl2tl_glossary=load_glossary(glossary_target) if use_overrides else [],
+            model_timeout_seconds=max(
+                15.0,
+                min(180.0, float(os.environ.get("JRPG_MODEL_TIMEOUT_SECONDS", "75"))),
+            ),
+            cache_path=os.environ.get("EXPLAIN_CACHE_PATH", "").strip() or os.path.join(
+                os.environ.get("SETTINGS_DIR", "").strip() or os.path.join(PROJECT_ROOT, "Settings"),
+                "explanation_cache.sqlite3",
+            ),
+            cache_max_entries=cache_max_entries,
+            cache_max_days=cache_max_days,
+        )
+        profile.lap("glossary load")
+        return settings
+
+    @property
+    def model(self) -> str:
+        return self.gemini_model if self.provider == "gemini" else self.openai_model
+
+
+@dataclass
+class ExplainOptions:
+    """Where one explanation goes and which caches it may use.
 
-        # Accept normal + local names
-        api_key = (
-            os.getenv("GEMINI_API_KEY")
-            or os.getenv("GOOGLE_API_KEY")
-            or os.getenv("GEMINI_LOCAL_KEY")
-            or os.getenv("GOOGLE_LOCAL_KEY")
-            or ""
-        )
-        api_key = api_key.strip().strip('"').strip("'")
-        if not api_key:
-            key_file = (os.getenv("GEMINI_API_KEY_FILE") or "").strip().strip('"').strip("'")
-            if key_file and os.path.isfile(key_file):
+    The defaults explain into the live overlay without caching or archiving.
+    """
+
+    update_overlay: bool = True
+    request_id: str = ""  # written to explainer.done for the waiting UI
+    stream: bool = False
+    stream_interval_seconds: float = 0.15
+    cache: bool = False
+    regenerate: bool = False
+    wait_for_prefetch: bool = False
+    save_explains: bool = False
+    explains_dir: str = ""  # default: <settings_dir>/Explanations
+    save_study_library: bool = False
+    study_library_dir: str = ""  # default: <settings_dir>/Study Library
+    study_library_profile: str = ""
+    study_library_chapter: str = ""
+    study_library_screenshots: bool = True
+    prompt_profile: str = ""
+    settings_dir: str = ""  # default: ./Settings
+    error_file: str = ""
+    usage_file: str = ""
+    debug: bool = False
+
+    @classmethod
+    def from_env(cls) -> "ExplainOptions":
+        return cls(
+            update_overlay=env_flag("EXPLAIN_UPDATE_OVERLAY", True),
+            request_id=(os.environ.get("JRPG_REQUEST_ID") or "").strip(),
+            stream=env_flag("EXPLAIN_STREAM"),
+            stream_interval_seconds=max(
+                0.05, float(os.environ.get("EXPLAIN_STREAM_INTERVAL_MS", "") or 150) / 1000.0
+            ),
+            cache=env_flag("EXPLAIN_CACHE") or env_flag("EXPLAIN_PREFETCH"),
+            regenerate=env_flag("EXPLAIN_CACHE_REGENERATE"),
+            wait_for_prefetch=env_flag("EXPLAIN_PREFETCH"),
+            save_explains=env_flag("SAVE_EXPLAINS"),
+            explains_dir=os.environ.get("EXPLAIN_SAVE_DIR", "").strip(),
+            save_study_library=env_flag("SAVE_STUDY_LIBRARY"),
+            study_library_dir=os.environ.get("STUDY_LIBRARY_DIR", "").strip(),
+            study_library_profile=os.environ.get("STUDY_LIBRARY_PROFILE", "").strip(),
+            study_library_chapter=os.environ.get("STUDY_LIBRARY_CHAPTER", "").strip(),
+            study_library_screenshots=env_flag("STUDY_LIBRARY_SCREENSHOTS", True),
+            prompt_profile=os.environ.get("EXPLAIN_PROMPT_PROFILE", "").strip(),
+            settings_dir=os.environ.get("SETTINGS_DIR", "").strip(),
+            error_file=os.environ.get("EXPLAIN_ERROR_FILE", "").strip(),
+            usage_file=os.environ.get("EXPLAIN_USAGE_FILE", "").strip(),
+            debug=env_flag("JRPG_DEBUG"),
+        )
+
+
+@dataclass
+class ExplainResult:
+    text: str  # the explanation as shown, metadata removed and glossary applied
+    key_grammar: List[str] = field(default_factory=list)
+    exit_code: int = 0  # 0 done, 1 the provider failed, 2 there was no source
+    error: str = ""  # the message shown for a failed request
+    cached: bool = False
+    tokens: int = 0  # reported by the provider, else estimated; 0 when cached
+    text_archive_path: str = ""
+
+
+class ExplainerEngine:
+    """Explain Japanese lines with settings, glossaries and client loaded once.
+
+    One engine serves any number of ``explain`` calls; only the first one
+    pays for importing the provider SDK and creating its client. Running this
+    file as a script makes one engine and one call from the environment.
+    """
+
+    def __init__(self, settings: Optional[ExplainSettings] = None):
+        self.settings = settings if settings is not None else ExplainSettings.from_env()
+        self._client = None
+        self._cache: Optional[TranslationCache] = None
+
+    def build_prompt(self, jp: str, source_paths: Sequence[str] = ()) -> str:
+        settings = self.settings
+        if jp:
+            prompt = settings.prompt_template.format(jp=jp)
+        else:
+            prompt = settings.prompt_template.format(
+                jp="[Read the original Japanese from the attached screenshot(s), in order.]"
+            )
+            prompt += (
+                "\n\nThe original Japanese source is supplied in the attached screenshot(s). "
+                "Read only the Japanese text inside the dialogue, message, or menu box. "
+                "When multiple images are attached, treat them as consecutive parts of one passage "
+                "in the order supplied and join sentence fragments across image boundaries."
+            )
+        prompt_glossary = settings.jp2tl_glossary
+        if jp and settings.jp2tl_glossary:
+            # Only entries whose source occurs in the line can matter to its explanation.
+            prompt_glossary = select_glossary_for_transcript(settings.jp2tl_glossary, jp)
+            if len(prompt_glossary) < len(settings.jp2tl_glossary):
+                saved_tokens = estimate_tokens(
+                    build_source_glossary_prompt(settings.jp2tl_glossary)
+                ) - estimate_tokens(build_source_glossary_prompt(prompt_glossary))
+                print(
+                    f"(Glossary) {len(prompt_glossary)} of {len(settings.jp2tl_glossary)} entries sent, "
+                    f"about {saved_tokens:,} prompt tokens saved",
+                    file=sys.stderr,
+                )
+        source_glossary_prompt = build_source_glossary_prompt(prompt_glossary)
+        if source_glossary_prompt:
+            prompt += "\n\n" + source_glossary_prompt
+        prompt += "\n\n" + KEY_GRAMMAR_METADATA_INSTRUCTION
+        return prompt
+
+    def cache(self) -> TranslationCache:
+        if self._cache is None:
+            self._cache = TranslationCache(
+                self.settings.cache_path,
+                max_entries=self.settings.cache_max_entries,
+                max_age_days=self.settings.cache_max_days,
+            )
+        return self._cache
+
+    def explain(
+        self,
+        jp: str,
+        source_paths: Sequence[str] = (),
+        options: Optional[ExplainOptions] = None,
+        profile: Optional[StageProfile] = None,
+    ) -> ExplainResult:
+        """Explain ``jp``, or the Japanese in the ``source_paths`` screenshots."""
+        settings = self.settings
+        options = options if options is not None else ExplainOptions()
+        if profile is None:
+            profile = StageProfile("explain", profiling_enabled())
+        jp = (jp or "").strip()
+        source_paths = list(source_paths)
+        os.makedirs(OVERLAY_DIR, exist_ok=True)
+        if not jp and not source_paths:
+            message = (
+                "Explanation could not start.\n\n"
+                "No Japanese source text was available. Translate a screenshot first and retry."
+            )
+            if options.update_overlay:
                 try:
-                    with open(key_file, "r", encoding="utf-8") as kf:
-                        api_key = kf.read().strip()
+                    atomic_write_text(EXPLAINER_TXT, message)
+                    signal_explainer_completion(options.request_id)
                 except Exception:
                     pass
-        if not api_key:
-            raise RuntimeError("Missing GEMINI_API_KEY/GOOGLE_API_KEY (or *_LOCAL / _FILE)")
+            if options.error_file:
+                try:
+                    atomic_write_text(options.error_file, message)
+                except Exception:
+                    pass
+            print(message, file=sys.stderr)
+            return ExplainResult("", exit_code=2, error=message)
 
-        model_name = GEM_MODEL
-        if model_name.startswith("models/"):
-            model_name = model_name[len("models/"):]
+        # Read and hash every source image on the pool while the prompt and provider
+        # client are prepared; uploads and the Study Library identity reuse the bytes.
+        source_batch = ImageBatch(source_paths, [("read", lambda index, path: read_image(path))])
+        prompt = self.build_prompt(jp, source_paths)
+        profile.lap("prompt")
+
+        # Optional explanation cache (EXPLAIN_CACHE=1). The key covers the source, the
+        # provider and model, and the finished prompt, which already holds the prompt
+        # template and the glossary entries sent. EXPLAIN_CACHE_REGENERATE=1 asks the
+        # model again and replaces the stored answer. EXPLAIN_PREFETCH=1 (see
+        # explain_prefetch.py) fills the same cache in the background, so it turns the
+        # cache on too; a miss waits for a prefetch of the line that is still running.
+        explanation_cache = None
+        explanation_cache_key = ""
+        cached_explanation = None
+        if options.cache:
+            try:
+                explanation_cache = self.cache()
+                explanation_cache_key = cache_key(
+                    [study_source_identity(jp, source_paths)[1]],
+                    {
+                        "kind": "explain",
+                        "provider": settings.provider,
+                        "model": settings.model,
+                        "prompt": prompt,
+                    },
+                )
+                if options.regenerate:
+                    profile.set(cache="regenerate")
+                else:
+                    cached_explanation = explanation_cache.get(explanation_cache_key)
+                    profile.set(cache="hit" if cached_explanation is not None else "miss")
+                    # With text the key ignores the attached screenshots, so a
+                    # text-only prefetch of the line answers this request too.
+                    if cached_explanation is None and jp and options.wait_for_prefetch:
+                        from explain_prefetch import wait_for_prefetch
+
+                        cached_explanation = wait_for_prefetch(
+                            jp, lambda: explanation_cache.get(explanation_cache_key)
+                        )
+                        if cached_explanation is not None:
+                            profile.set(cache="prefetch")
+            except Exception as exc:
+                print(f"(Cache) disabled: {exc}", file=sys.stderr)
+                explanation_cache = None
+            profile.lap("cache lookup")
+
+        # Optional streaming (EXPLAIN_STREAM=1): the overlay shows each complete line
+        # as it arrives, with the target glossary applied once per line. The metadata
+        # footer, the final glossary pass and archiving wait for the whole answer.
+        stream_preview = None
+        if cached_explanation is None and options.stream and options.update_overlay:
+            target_glossary = settings.tl2tl_glossary
+            stream_lines = CompletedLines(
+                lambda block: apply_target_glossary(block, target_glossary, protected_text=jp)
+                if target_glossary else block
+            )
+            stream_preview = StreamPreview(
+                lambda text: stream_lines(visible_stream_text(text)),
+                lambda text: atomic_write_text(EXPLAINER_TXT, text),
+                options.stream_interval_seconds,
+            )
 
+        usage = None
         try:
-            client = genai.Client(
-                api_key=api_key,
-                http_options=types.HttpOptions(timeout=int(MODEL_TIMEOUT_SECONDS * 1000)),
+            if cached_explanation is not None:
+                text = cached_explanation.result
+                print(
+                    f"(Cache) hit, stored {cached_explanation.age_seconds / 60:.0f} min ago",
+                    file=sys.stderr,
+                )
+            else:
+                text, usage = self.call_provider(prompt, source_paths, stream_preview, profile)
+        except Exception as e:
+            return self._provider_failed(e, options, profile)
+
+        # Store the raw answer, so its metadata block and the target glossary are
+        # processed again on replay. Gemini's "(Gemini ...)" notes about blocked or
+        # empty answers are not worth replaying.
+        if (
+            explanation_cache is not None
+            and cached_explanation is None
+            and text
+            and not text.startswith("(Gemini")
+        ):
+            try:
+                explanation_cache.put(explanation_cache_key, text, jp)
+            except Exception as exc:
+                print(f"(Cache) store failed: {exc}", file=sys.stderr)
+
+        tokens = 0
+        if cached_explanation is None:
+            tokens = provider_token_count(usage) or (
+                estimate_tokens(prompt)
+                + estimate_image_tokens(source_paths)
+                + estimate_tokens(text)
             )
-        except TypeError:
-            client = genai.Client(api_key=api_key)
+        # explain_prefetch.py charges each prefetch against its daily token budget.
+        if options.usage_file:
+            try:
+                atomic_write_text(
+                    options.usage_file,
+                    json.dumps({"tokens": tokens, "cached": cached_explanation is not None}),
+                )
+            except Exception:
+                pass
+
+        if not text:
+            text = "(No explanation returned)"
+        if stream_preview is not None:
+            if stream_preview.first_text_seconds is not None:
+                profile.set(first_text_ms=round(stream_preview.first_text_seconds * 1000))
+            if options.debug:
+                print(f"(Stream) {stream_preview.summary()}", file=sys.stderr)
+
+        text, key_grammar_values = extract_key_grammar_metadata(text)
+        key_grammar = " • ".join(key_grammar_values)
+
+        if settings.tl2tl_glossary:
+            text = apply_target_glossary(text, settings.tl2tl_glossary, protected_text=jp)
+        profile.lap("postprocess")
+
+        # Normal gameplay requests update the live overlay. Study Reader regeneration
+        # can opt out so reviewing an archived line does not replace the player's
+        # current in-game explanation or last-source context.
+        if options.update_overlay:
+            atomic_write_text(EXPLAINER_TXT, text)
+            signal_explainer_completion(options.request_id)
+            print(f"Wrote explanation to: {EXPLAINER_TXT}")
+        else:
+            print("Generated Study Library explanation without updating the live overlay")
+        profile.lap("write")
+        if options.debug:
+            print(f"(Images) {source_batch.summary()}", file=sys.stderr)
+
+        # Optional legacy plain-text archive. Keep this independent from the Study Library
+        # so either output can be enabled without making the other one a dependency.
+        settings_dir = options.settings_dir or os.path.join(os.getcwd(), "Settings")
+
+        # A replayed explanation was archived when it was generated; saving it again
+        # would only add an identical version.
+        text_archive_path = ""
+        if cached_explanation is not None:
+            print("(Archive skipped) Explanation replayed from the cache")
+        elif options.save_explains:
+            explains_dir = options.explains_dir or os.path.join(settings_dir, "Explanations")
+            text_archive_path = archive_plain_text(explains_dir, jp, source_paths, text)
+
+        if cached_explanation is None and options.save_study_library:
+            study_dir = options.study_library_dir or os.path.join(settings_dir, "Study Library")
+            try:
+                archive_study_library_entry(
+                    study_dir=study_dir,
+                    jp=jp,
+                    source_paths=source_paths,
+                    text=text,
+                    game_profile=options.study_library_profile,
+                    provider=settings.provider,
+                    model=settings.model,
+                    prompt_profile=options.prompt_profile,
+                    key_grammar=key_grammar,
+                    chapter=options.study_library_chapter,
+                    include_screenshots=options.study_library_screenshots,
+                    text_archive_path=text_archive_path,
+                )
+            except Exception as exc:
+                # Archiving must never turn a successful explanation request into a failed one.
+                print(f"(Study Library skipped) {exc}", file=sys.stderr)
+        profile.lap("archive")
+
+        if profile.enabled:
+            source_batch.summary()  # waits for image reads still running
+            for phase, seconds in source_batch.phase_seconds.items():
+                profile.add(f"image {phase}", seconds)
+            profile.set(provider=settings.provider, images=len(source_paths), response_chars=len(text))
+            profile.record(PROFILE_LOG)
+        return ExplainResult(
+            text,
+            key_grammar=key_grammar_values,
+            cached=cached_explanation is not None,
+            tokens=tokens,
+            text_archive_path=text_archive_path,
+        )
+
+    def call_provider(
+        self,
+        prompt: str,
+        source_paths: Sequence[str] = (),
+        stream_preview: Optional[StreamPreview] = None,
+        profile: Optional[StageProfile] = None,
+    ) -> Tuple[str, Any]:
+        """Ask the configured model; return its raw answer and token usage.
+
+        With ``stream_preview``, the answer is streamed and fed to it as it
+        arrives.
+        """
+        if profile is None:
+            profile = StageProfile("explain", False)
+        if self.settings.provider == "gemini":
+            return self._call_gemini(prompt, source_paths, stream_preview, profile)
+        if self.settings.provider == "openai":
+            return self._call_openai(prompt, source_paths, stream_preview, profile)
+        raise RuntimeError(f"Unknown provider: {self.settings.provider}")
+
+    def _gemini_client(self):
+        if self._client is None:
+            try:
+                from google import genai
+                from google.genai import types
+            except Exception as e:
+                raise RuntimeError(
+                    "Missing google-genai package. Install with: python -m pip install -U google-genai"
+                ) from e
+
+            api_key = gemini_api_key()
+            if not api_key:
+                raise RuntimeError("Missing GEMINI_API_KEY/GOOGLE_API_KEY (or *_LOCAL / _FILE)")
+            try:
+                client = genai.Client(
+                    api_key=api_key,
+                    http_options=types.HttpOptions(
+                        timeout=int(self.settings.model_timeout_seconds * 1000)
+                    ),
+                )
+            except TypeError:
+                client = genai.Client(api_key=api_key)
+            self._client = (client, types)
+        return self._client
+
+    def _call_gemini(self, prompt, source_paths, stream_preview, profile) -> Tuple[str, Any]:
+        client, types = self._gemini_client()
+        profile.lap("provider client")
+        model_name = self.settings.gemini_model
+        if model_name.startswith("models/"):
+            model_name = model_name[len("models/"):]
+
         if source_paths:
             content_parts = [types.Part.from_text(text=prompt)]
             for source_path in source_paths:
-                mime_type = mimetypes.guess_type(source_path)[0] or "image/png"
-                with open(source_path, "rb") as image_file:
-                    content_parts.append(
-                        types.Part.from_bytes(data=image_file.read(), mime_type=mime_type)
-                    )
+                image = read_image(source_path)
+                content_parts.append(
+                    types.Part.from_bytes(data=image.data, mime_type=image.mime)
+                )
             contents = [types.Content(role="user", parts=content_parts)]
         else:
             contents = prompt
 
-        resp = client.models.generate_content(
+        request = dict(
             model=model_name,
             contents=contents,
             config=types.GenerateContentConfig(
@@ -917,87 +1413,45 @@ try:
                 safety_settings=gemini_safety_settings(types),
             ),
         )
-
-        # Handle the "blocked → no candidates" case cleanly.
-        try:
-            text = (getattr(resp, "text", "") or "").strip()
-        except Exception:
-            block_reason = None
-            try:
-                fb = getattr(resp, "prompt_feedback", None)
-                block_reason = getattr(fb, "block_reason", None) if fb else None
-            except Exception:
-                pass
-            if block_reason:
-                text = f"(Gemini blocked the explanation; block_reason={block_reason})"
-            else:
-                text = "(Gemini returned no text candidates – likely blocked by safety settings.)"
-
-        if not text:
-            try:
-                candidates = getattr(resp, "candidates", None) or []
-                out_parts = []
-                for cand in candidates:
-                    content = getattr(cand, "content", None)
-                    if not content:
-                        continue
-                    parts = getattr(content, "parts", None) or []
-                    for part in parts:
-                        t = getattr(part, "text", None)
-                        if t:
-                            out_parts.append(t)
-                text = "".join(out_parts).strip()
-            except Exception:
-                pass
-        if not text:
+        text = ""
+        if stream_preview is None:
+            resp = client.models.generate_content(**request)
+            usage = getattr(resp, "usage_metadata", None)
+        else:
+            resp, pieces, usage = None, [], None
+            stream = client.models.generate_content_stream(**request)
             try:
-                prompt_feedback = getattr(resp, "prompt_feedback", None)
-                if prompt_feedback:
-                    text = f"(Gemini returned no text; prompt_feedback={prompt_feedback})"
-            except Exception:
-                pass
-        if not text:
-            text = "(Gemini returned no text candidates.)"
-
-    elif PROVIDER == "openai":
-        from openai import OpenAI
-
-        # Handle BOM-prefixed names, common alternates, and *_FILE
-        bom = "\ufeff"
-        api_key = (
-            os.getenv("OPENAI_API_KEY")
-            or os.getenv(bom + "OPENAI_API_KEY")
-            or os.getenv("OPENAI_LOCAL_KEY")
-            or os.getenv(bom + "OPENAI_LOCAL_KEY")
-            or os.getenv("OPENAI_API_KEY_LOCAL")
-            or os.getenv(bom + "OPENAI_API_KEY_LOCAL")
-            or os.getenv("OPENAI_KEY")
-            or os.getenv(bom + "OPENAI_KEY")
-            or ""
-        )
-        api_key = api_key.strip().strip('"').strip("'")
-
-        if not api_key:
-            key_file = (
-                os.getenv("OPENAI_API_KEY_FILE")
-                or os.getenv(bom + "OPENAI_API_KEY_FILE")
-                or ""
-            ).strip().strip('"').strip("'")
-            if key_file and os.path.isfile(key_file):
-                try:
-                    with open(key_file, "r", encoding="utf-8") as kf:
-                        api_key = kf.read().strip()
-                except Exception:
-                    pass
+                for resp in stream:
+                    usage = getattr(resp, "usage_metadata", None) or usage
+                    piece = gemini_chunk_text(resp)
+                    if piece:
+                        pieces.append(piece)
+                        stream_preview.feed("".join(pieces))
+            finally:
+                close = getattr(stream, "close", None)
+                if close is not None:
+                    close()
+            text = "".join(pieces).strip()
+        profile.lap("provider call")
+        return gemini_response_text(resp, text), usage
 
-        if not api_key:
-            raise RuntimeError("Missing OPENAI_API_KEY (or *_LOCAL / _FILE)")
+    def _openai_client(self):
+        if self._client is None:
+            from openai import OpenAI
 
-        client = OpenAI(
-            api_key=api_key,
-            timeout=MODEL_TIMEOUT_SECONDS,
-            max_retries=2,
-        )
+            api_key = openai_api_key()
+            if not api_key:
+                raise RuntimeError("Missing OPENAI_API_KEY (or *_LOCAL / _FILE)")
+            self._client = OpenAI(
+                api_key=api_key,
+                timeout=self.settings.model_timeout_seconds,
+                max_retries=2,
+            )
+        return self._client
+
+    def _call_openai(self, prompt, source_paths, stream_preview, profile) -> Tuple[str, Any]:
+        client = self._openai_client()
+        profile.lap("provider client")
         if source_paths:
             input_content = [{"type": "input_text", "text": prompt}]
             input_content.extend(
@@ -1007,94 +1461,83 @@ try:
             request_input = [{"role": "user", "content": input_content}]
         else:
             request_input = prompt
-        r = client.responses.create(model=MODEL_NAME, input=request_input)
-        text = (getattr(r, "output_text", "") or "").strip()
-
-    else:
-        raise RuntimeError(f"Unknown provider: {PROVIDER}")
+        model = self.settings.openai_model
+        if stream_preview is None:
+            r = client.responses.create(model=model, input=request_input)
+            text = (getattr(r, "output_text", "") or "").strip()
+            usage = getattr(r, "usage", None)
+        else:
+            pieces, usage = [], None
+            stream = client.responses.create(model=model, input=request_input, stream=True)
+            try:
+                for event in stream:
+                    event_type = getattr(event, "type", "")
+                    if event_type == "response.output_text.delta":
+                        pieces.append(event.delta)
+                        stream_preview.feed("".join(pieces))
+                    elif event_type == "response.completed":
+                        usage = getattr(getattr(event, "response", None), "usage", None)
+            finally:
+                close = getattr(stream, "close", None)
+                if close is not None:
+                    close()
+            text = "".join(pieces).strip()
+        profile.lap("provider call")
+        return text, usage
 
-except Exception as e:
-    error_text = str(e)
-    update_overlay = env_flag("EXPLAIN_UPDATE_OVERLAY", True)
-    provider_name = "Gemini" if PROVIDER == "gemini" else "OpenAI"
-    if update_overlay and "Missing OPENAI_API_KEY" in error_text:
-        atomic_write_text(
-            EXPLAINER_TXT,
-            "OpenAI API key missing.\n\n"
-            "Add it in the API Keys tab, or set OPENAI_API_KEY in Windows "
-            "Environment Variables and restart JRPG Translator.",
-        )
-    elif update_overlay and "Missing GEMINI_API_KEY/GOOGLE_API_KEY" in error_text:
-        atomic_write_text(
-            EXPLAINER_TXT,
-            "Gemini API key missing.\n\n"
-            "Add it in the API Keys tab, or set GEMINI_API_KEY (or GOOGLE_API_KEY) "
-            "in Windows Environment Variables and restart JRPG Translator.",
-        )
-    elif update_overlay:
-        atomic_write_text(EXPLAINER_TXT, friendly_provider_error(provider_name, e))
-    if update_overlay:
-        signal_explainer_completion()
-    error_file = (os.environ.get("EXPLAIN_ERROR_FILE") or "").strip()
-    if error_file:
-        try:
-            atomic_write_text(error_file, friendly_provider_error(provider_name, e))
-        except Exception:
-            pass
-    print(f"(Python error) Explain call failed: {e}", file=sys.stderr)
-    sys.exit(1)
+    def _provider_failed(
+        self, e: Exception, options: ExplainOptions, profile: StageProfile
+    ) -> ExplainResult:
+        error_text = str(e)
+        provider = self.settings.provider
+        provider_name = "Gemini" if provider == "gemini" else "OpenAI"
+        message = friendly_provider_error(provider_name, e)
+        if options.update_overlay and "Missing OPENAI_API_KEY" in error_text:
+            atomic_write_text(
+                EXPLAINER_TXT,
+                "OpenAI API key missing.\n\n"
+                "Add it in the API Keys tab, or set OPENAI_API_KEY in Windows "
+                "Environment Variables and restart JRPG Translator.",
+            )
+        elif options.update_overlay and "Missing GEMINI_API_KEY/GOOGLE_API_KEY" in error_text:
+            atomic_write_text(
+                EXPLAINER_TXT,
+                "Gemini API key missing.\n\n"
+                "Add it in the API Keys tab, or set GEMINI_API_KEY (or GOOGLE_API_KEY) "
+                "in Windows Environment Variables and restart JRPG Translator.",
+            )
+        elif options.update_overlay:
+            atomic_write_text(EXPLAINER_TXT, message)
+        if options.update_overlay:
+            signal_explainer_completion(options.request_id)
+        if options.error_file:
+            try:
+                atomic_write_text(options.error_file, message)
+            except Exception:
+                pass
+        print(f"(Python error) Explain call failed: {e}", file=sys.stderr)
+        profile.set(provider=provider, error=type(e).__name__)
+        profile.record(PROFILE_LOG)
+        return ExplainResult("", exit_code=1, error=message)
 
-if not text:
-    text = "(No explanation returned)"
-
-text, key_grammar_values = extract_key_grammar_metadata(text)
-key_grammar = " • ".join(key_grammar_values)
-
-if TL2TL_GLOSSARY:
-    text = apply_target_glossary(text, TL2TL_GLOSSARY, protected_text=jp)
-
-# Normal gameplay requests update the live overlay. Study Reader regeneration
-# can opt out so reviewing an archived line does not replace the player's
-# current in-game explanation or last-source context.
-if env_flag("EXPLAIN_UPDATE_OVERLAY", True):
-    atomic_write_text(EXPLAINER_TXT, text)
-    signal_explainer_completion()
-    print(f"Wrote explanation to: {EXPLAINER_TXT}")
-else:
-    print("Generated Study Library explanation without updating the live overlay")
 
-# Optional legacy plain-text archive. Keep this independent from the Study Library
-# so either output can be enabled without making the other one a dependency.
-settings_dir = os.environ.get("SETTINGS_DIR", "").strip()
-if not settings_dir:
-    settings_dir = os.path.join(os.getcwd(), "Settings")
-
-text_archive_path = ""
-if env_flag("SAVE_EXPLAINS"):
-    explains_dir = os.environ.get("EXPLAIN_SAVE_DIR", "").strip()
-    if not explains_dir:
-        explains_dir = os.path.join(settings_dir, "Explanations")
-    text_archive_path = archive_plain_text(explains_dir, jp, source_paths, text)
-
-if env_flag("SAVE_STUDY_LIBRARY"):
-    study_dir = os.environ.get("STUDY_LIBRARY_DIR", "").strip()
-    if not study_dir:
-        study_dir = os.path.join(settings_dir, "Study Library")
-    try:
-        archive_study_library_entry(
-            study_dir=study_dir,
-            jp=jp,
-            source_paths=source_paths,
-            text=text,
-            game_profile=os.environ.get("STUDY_LIBRARY_PROFILE", "").strip(),
-            provider=PROVIDER,
-            model=(GEM_MODEL if PROVIDER == "gemini" else MODEL_NAME),
-            prompt_profile=os.environ.get("EXPLAIN_PROMPT_PROFILE", "").strip(),
-            key_grammar=key_grammar,
-            chapter=os.environ.get("STUDY_LIBRARY_CHAPTER", "").strip(),
-            include_screenshots=env_flag("STUDY_LIBRARY_SCREENSHOTS", True),
-            text_archive_path=text_archive_path,
-        )
-    except Exception as exc:
-        # Archiving must never turn a successful explanation request into a failed one.
-        print(f"(Study Library skipped) {exc}", file=sys.stderr)
+def main() -> int:
+    # Console UTF-8 (Windows safe)
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8", errors="replace")
+    os.makedirs(OVERLAY_DIR, exist_ok=True)
+
+    profile = StageProfile("explain", profiling_enabled(), _MODULE_STARTED, _MODULE_STARTED_WALL)
+    profile.lap("imports")
+    engine = ExplainerEngine(ExplainSettings.from_env(profile))
+    profile.enabled = profiling_enabled()  # .env may have switched it on
+
+    source_text_file = os.environ.get("EXPLAIN_SOURCE_TEXT_FILE", "").strip()
+    source_paths_file = os.environ.get("EXPLAIN_SOURCE_PATHS_FILE", "").strip()
+    jp = read_text(source_text_file or LAST_JP).strip()
+    source_paths = read_source_paths(source_paths_file)
+    return engine.explain(jp, source_paths, ExplainOptions.from_env(), profile).exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
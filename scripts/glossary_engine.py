@@ -0,0 +1,399 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compiled terminology glossaries shared by the translator scripts.
+
+A glossary is compiled once into a single case-insensitive regular expression
+whose alternatives are factored into a character trie, so every replacement is
+applied in one left-to-right scan instead of one regex pass per entry.
+
+Matching rules are those of the original per-entry replacement loop:
+
+- Sources containing whitespace match anywhere, without word boundaries.
+- Single-token sources match whole words and keep a plural or possessive
+  suffix (``s``, ``'s``, ``’s``) after the replacement.
+- Capitalized sources use the target exactly as written; lowercase sources
+  adapt the target to the matched lowercase, sentence-case, title-case, or
+  uppercase text.
+
+Because the scan is single-pass, replacement text is never matched again, and
+where two sources overlap the leftmost, then longest, match wins.
+
+JP->target glossaries are not applied to text but sent with a prompt. A
+``GlossarySourceIndex`` stores their Japanese sources in a character trie, so
+the entries that occur in a known transcript are found in one walk over the
+transcript instead of one substring test per entry.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Iterator, List, Sequence, Tuple
+
+GlossaryEntries = Sequence[Tuple[str, str]]
+
+GLOSSARY_ENCODINGS = (
+    "utf-8", "utf-8-sig", "utf-16", "utf-16-le", "utf-16-be", "cp1252", "cp932",
+)
+GLOSSARY_SEPARATORS = ("->", "→", "\t", ":", "=")
+SUFFIX_PATTERN = r"s|'s|’s"
+READING_ANNOTATION_RE = re.compile(r"(?<=[\u3400-\u9fff々〆ヶ])\([ぁ-ゖー]+\)")
+CJK_RE = re.compile(r"[\u3000-\u30ff\u3400-\u9fff\uff00-\uffef]")
+_COMPILED_CACHE_SIZE = 8
+
+
+def load_glossary(path) -> List[Tuple[str, str]]:
+    """Load 'source -> target' pairs.
+
+    Separators ``->``, ``→``, tab, ``:`` and ``=`` are accepted in that order of
+    preference. Blank lines and lines starting with ``#`` are ignored.
+    """
+    entries: List[Tuple[str, str]] = []
+    if not path or not os.path.isfile(path):
+        return entries
+
+    text = None
+    for encoding in GLOSSARY_ENCODINGS:
+        try:
+            with open(path, "r", encoding=encoding) as glossary_file:
+                text = glossary_file.read()
+            break
+        except Exception:
+            continue
+    if text is None:
+        return entries
+
+    for raw_line in text.splitlines():
+        line = raw_line.replace("\ufeff", "").strip()
+        if not line or line.startswith("#"):
+            continue
+        source = target = None
+        for separator in GLOSSARY_SEPARATORS:
+            if separator in line:
+                source_part, target_part = line.split(separator, 1)
+                source, target = source_part.strip(), target_part.strip()
+                break
+        if source and target:
+            entries.append((source, target))
+    return entries
+
+
+def _sentence_case(text: str) -> str:
+    lowered = text.lower()
+    for index, char in enumerate(lowered):
+        if char.isalpha():
+            return lowered[:index] + char.upper() + lowered[index + 1:]
+    return lowered
+
+
+def adapt_glossary_case(source: str, target: str, matched: str) -> str:
+    """Adapt a replacement's case unless its source declares canonical casing."""
+    source_first_letter = next((char for char in source if char.isalpha()), "")
+    if source_first_letter.isupper():
+        return target
+
+    matched_letters = [char for char in matched if char.isalpha()]
+    if not matched_letters:
+        return target
+    if all(char.isupper() for char in matched_letters):
+        return target.upper()
+    if all(char.islower() for char in matched_letters):
+        return target.lower()
+
+    if re.search(r"\s", source):
+        words = re.findall(r"[^\W\d_]+", matched, flags=re.UNICODE)
+        if words and all(
+            word[0].isupper() and word[1:].islower() for word in words
+        ):
+            return target.title()
+
+    if matched_letters[0].isupper() and all(
+        char.islower() for char in matched_letters[1:]
+    ):
+        return _sentence_case(target)
+
+    return target
+
+
+def _fold(text: str) -> str:
+    folded = text.lower()
+    # A few characters change length when lowercased; keep those verbatim so
+    # the trie still spells a string the regex can match.
+    return folded if len(folded) == len(text) else text
+
+
+def _trie_pattern(sources: Sequence[str]) -> str:
+    """Return a regex alternation of ``sources`` factored by common prefixes.
+
+    Greedy optional groups try the longer continuation first, so the pattern
+    prefers the longest source that matches at a position.
+    """
+    trie: dict = {}
+    for source in sources:
+        node = trie
+        for char in source:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def render(node: dict) -> str:
+        branches = [
+            re.escape(char) + render(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            return "(?:" + body + ")?"
+        return body
+
+    return render(trie)
+
+
+class CompiledGlossary:
+    """A glossary compiled for single-scan application."""
+
+    def __init__(self, entries: GlossaryEntries):
+        self.entries = tuple(entries)
+        self._phrases: dict = {}
+        self._words: dict = {}
+        for source, target in self.entries:
+            if not source:
+                continue
+            table = self._phrases if re.search(r"\s", source) else self._words
+            # The first entry for a source wins, as it did when entries were
+            # applied in file order.
+            table.setdefault(_fold(source), (source, target))
+
+        self.max_source_length = max(
+            (len(source) for source, _target in self.entries), default=0
+        )
+        alternatives = []
+        if self._phrases:
+            alternatives.append(f"(?P<phrase>{_trie_pattern(list(self._phrases))})")
+        if self._words:
+            alternatives.append(
+                rf"\b(?P<core>{_trie_pattern(list(self._words))})"
+                rf"(?P<suf>{SUFFIX_PATTERN})?\b"
+            )
+        self._pattern = (
+            re.compile("|".join(alternatives), flags=re.IGNORECASE)
+            if alternatives
+            else None
+        )
+
+    def __bool__(self) -> bool:
+        return self._pattern is not None
+
+    def _lookup(self, table: dict, matched: str):
+        entry = table.get(_fold(matched))
+        if entry is not None:
+            return entry
+        for source, target in table.values():
+            if re.fullmatch(re.escape(source), matched, flags=re.IGNORECASE):
+                return source, target
+        return None
+
+    def replacements(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """Yield ``(start, end, replacement)`` for every match in ``text``."""
+        if self._pattern is None:
+            return
+        for match in self._pattern.finditer(text):
+            phrase = match.group("phrase") if self._phrases else None
+            if phrase is not None:
+                entry = self._lookup(self._phrases, phrase)
+                if entry is not None:
+                    yield (
+                        match.start(),
+                        match.end(),
+                        adapt_glossary_case(entry[0], entry[1], phrase),
+                    )
+                continue
+            core = match.group("core")
+            entry = self._lookup(self._words, core)
+            if entry is not None:
+                yield (
+                    match.start(),
+                    match.end(),
+                    adapt_glossary_case(entry[0], entry[1], core)
+                    + (match.group("suf") or ""),
+                )
+
+    def apply(self, text: str, protected_text: str = "") -> str:
+        """Apply every replacement in one scan.
+
+        ``protected_text`` (or each of its non-blank lines when the whole text
+        is not present verbatim) is left untouched, so an original Japanese
+        line quoted inside an explanation keeps its source spelling.
+        """
+        if self._pattern is None or not text:
+            return text
+
+        protected_segments = []
+        if protected_text:
+            if protected_text in text:
+                protected_segments = [protected_text]
+            else:
+                protected_segments = [
+                    line for line in protected_text.splitlines() if line.strip()
+                ]
+
+        protected_values = []
+        out = text
+        for index, segment in enumerate(protected_segments):
+            token = f"\x00JRPG_PROTECTED_SOURCE_{index}\x00"
+            if segment in out:
+                out = out.replace(segment, token, 1)
+                protected_values.append((token, segment))
+
+        pieces = []
+        position = 0
+        for start, end, replacement in self.replacements(out):
+            pieces.append(out[position:start])
+            pieces.append(replacement)
+            position = end
+        if pieces:
+            pieces.append(out[position:])
+            out = "".join(pieces)
+
+        for token, segment in protected_values:
+            out = out.replace(token, segment)
+        return out
+
+
+_COMPILED: "OrderedDict[tuple, CompiledGlossary]" = OrderedDict()
+
+
+def compile_glossary(entries: GlossaryEntries) -> CompiledGlossary:
+    """Return a compiled glossary, reusing recent compilations of equal entries."""
+    if isinstance(entries, CompiledGlossary):
+        return entries
+    key = tuple(entries)
+    compiled = _COMPILED.get(key)
+    if compiled is not None:
+        _COMPILED.move_to_end(key)
+        return compiled
+    compiled = CompiledGlossary(key)
+    _COMPILED[key] = compiled
+    while len(_COMPILED) > _COMPILED_CACHE_SIZE:
+        _COMPILED.popitem(last=False)
+    return compiled
+
+
+def apply_glossary(
+    text: str,
+    entries: GlossaryEntries,
+    protected_text: str = "",
+) -> str:
+    """Apply ``entries`` to ``text`` using the shared compiled-glossary cache."""
+    if not entries:
+        return text
+    return compile_glossary(entries).apply(text, protected_text=protected_text)
+
+
+_FILE_CACHE: dict = {}
+
+
+def load_glossary_cached(path) -> List[Tuple[str, str]]:
+    """Return ``load_glossary(path)``, parsing the file again only after it changes."""
+    if not path:
+        return []
+    try:
+        stat = os.stat(path)
+    except OSError:
+        _FILE_CACHE.pop(path, None)
+        return []
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _FILE_CACHE.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    entries = load_glossary(path)
+    _FILE_CACHE[path] = (key, entries)
+    return entries
+
+
+def load_compiled_glossary(path) -> CompiledGlossary:
+    """Return the compiled glossary for ``path``, keyed on the file's mtime."""
+    return compile_glossary(load_glossary_cached(path))
+
+
+def strip_generated_kanji_readings(text: str) -> str:
+    """Remove prompt-added readings such as 名前(なまえ) for exact source matching."""
+    return READING_ANNOTATION_RE.sub("", text or "")
+
+
+def jp_glossary_match_key(text: str) -> str:
+    return unicodedata.normalize("NFKC", strip_generated_kanji_readings(text)).strip()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt-token count: one per CJK character, one per four others."""
+    cjk = len(CJK_RE.findall(text or ""))
+    return cjk + (len(text or "") - cjk + 3) // 4
+
+
+class GlossarySourceIndex:
+    """Find the JP->target entries whose source occurs in a transcript.
+
+    The result equals keeping every entry whose ``jp_glossary_match_key`` is a
+    substring of the transcript's key, in glossary order.
+    """
+
+    def __init__(self, entries: GlossaryEntries):
+        self.entries = tuple(entries)
+        self._trie: dict = {}
+        for index, (source, _target) in enumerate(self.entries):
+            key = jp_glossary_match_key(source)
+            if not key:
+                continue
+            node = self._trie
+            for char in key:
+                node = node.setdefault(char, {})
+            node.setdefault("", []).append(index)
+
+    def select(self, transcript: str) -> List[Tuple[str, str]]:
+        text = jp_glossary_match_key(transcript)
+        trie = self._trie
+        found = set()
+        for start in range(len(text)):
+            node = trie.get(text[start])
+            position = start + 1
+            while node is not None:
+                matches = node.get("")
+                if matches:
+                    found.update(matches)
+                if position == len(text):
+                    break
+                node = node.get(text[position])
+                position += 1
+        return [self.entries[index] for index in sorted(found)]
+
+
+_INDEXES: "OrderedDict[tuple, GlossarySourceIndex]" = OrderedDict()
+
+
+def glossary_source_index(entries: GlossaryEntries) -> GlossarySourceIndex:
+    """Return the source index for ``entries``, reusing recent ones."""
+    key = tuple(entries)
+    index = _INDEXES.get(key)
+    if index is not None:
+        _INDEXES.move_to_end(key)
+        return index
+    index = GlossarySourceIndex(key)
+    _INDEXES[key] = index
+    while len(_INDEXES) > _COMPILED_CACHE_SIZE:
+        _INDEXES.popitem(last=False)
+    return index
+
+
+def select_glossary_for_transcript(
+    entries: GlossaryEntries,
+    transcript: str,
+) -> List[Tuple[str, str]]:
+    """Keep only entries whose exact Japanese source occurs in ``transcript``."""
+    if not entries:
+        return []
+    return glossary_source_index(entries).select(transcript)
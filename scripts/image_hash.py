@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Perceptual hashes for spotting near-identical screenshots.
+
+An exact hash changes when a dialogue box only differs by a blinking cursor,
+an animated portrait or the text-advance arrow. A perceptual hash of a small
+grayscale thumbnail changes by a few bits at most for such captures, so the
+Hamming distance between two hashes tells whether they show the same text.
+
+  dhash  compares neighbouring pixels of a 33x16 thumbnail: 512 bits (default)
+  phash  keeps the signs of the 16x16 lowest DCT frequencies of a 64x64
+         thumbnail: 256 bits, more tolerant of brightness changes but less
+         sensitive to which characters are shown
+
+The classic 64-bit hashes are too coarse for dialogue: two different lines in
+the same text box usually hash identically. Even at this size a one-word
+change looks like a blinking arrow, so keep the distance small and crop to the
+text box, which makes text changes cover a larger part of the hash. The crop
+is given as fractions of the image: "left,top,right,bottom".
+
+Without a crop a match is only trusted for the transcript hint of two-stage
+mode; the previous translation itself is reused only when a crop is set. With
+the bottom-third crop, bench_image_hash.py puts an advance arrow at distance 3
+and a different line at 40 or more, hence the default of 3. A single changed
+word can still fall inside that, so check the "word" row for your own captures.
+
+Options (environment):
+  SHOT_NEAR_DUPLICATE           "dhash", "phash" or "off" (default); "1" = dhash
+  SHOT_NEAR_DUPLICATE_DISTANCE  largest Hamming distance treated as the same
+                                capture (default 3)
+  SHOT_NEAR_DUPLICATE_CROP      e.g. "0,0.6,1,1" for the bottom 40 percent
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+HASH_METHODS = ("dhash", "phash")
+Crop = Tuple[float, float, float, float]
+
+_DHASH_SIZE = (32, 16)
+_PHASH_SIZE = 64
+_PHASH_BITS = 16
+
+
+def parse_crop(text: str) -> Optional[Crop]:
+    """Parse "left,top,right,bottom" fractions; return None when invalid."""
+    try:
+        left, top, right, bottom = (float(part) for part in (text or "").split(","))
+    except ValueError:
+        return None
+    if not (0.0 <= left < right <= 1.0 and 0.0 <= top < bottom <= 1.0):
+        return None
+    if (left, top, right, bottom) == (0.0, 0.0, 1.0, 1.0):
+        return None
+    return (left, top, right, bottom)
+
+
+@dataclass(frozen=True)
+class NearDuplicateOptions:
+    method: str = "off"
+    max_distance: int = 3
+    crop: Optional[Crop] = None
+
+    @classmethod
+    def from_env(cls) -> "NearDuplicateOptions":
+        method = (os.environ.get("SHOT_NEAR_DUPLICATE", "") or "off").strip().lower()
+        if method in {"1", "true", "yes", "on"}:
+            method = "dhash"
+        if method not in HASH_METHODS:
+            method = "off"
+        try:
+            max_distance = int(os.environ.get("SHOT_NEAR_DUPLICATE_DISTANCE", "") or 3)
+        except ValueError:
+            max_distance = 3
+        return cls(
+            method=method,
+            max_distance=min(64, max(0, max_distance)),
+            crop=parse_crop(os.environ.get("SHOT_NEAR_DUPLICATE_CROP", "")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.method in HASH_METHODS
+
+    @property
+    def reuses_translation(self) -> bool:
+        # A whole-screen hash cannot tell a changed word from a blinking arrow.
+        return self.enabled and self.crop is not None
+
+
+# numpy is imported where it is used: it costs about 100 ms at startup, and
+# most requests never hash an image.
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    import numpy as np
+
+    return int.from_bytes(np.packbits(bits.reshape(-1)).tobytes(), "big")
+
+
+@lru_cache(maxsize=None)
+def _dct_matrix(size: int) -> np.ndarray:
+    import numpy as np
+
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2.0 / size)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+def dhash_pixels(pixels: np.ndarray) -> int:
+    """dHash of a 16 row x 33 column grayscale thumbnail."""
+    import numpy as np
+
+    pixels = pixels.astype(np.int16, copy=False)
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def phash_pixels(pixels: np.ndarray) -> int:
+    """pHash of a 64x64 grayscale thumbnail."""
+    import numpy as np
+
+    dct = _dct_matrix(_PHASH_SIZE)
+    frequencies = dct @ pixels.astype(np.float64) @ dct.T
+    low = frequencies[:_PHASH_BITS, :_PHASH_BITS].reshape(-1)
+    # The DC term only measures overall brightness; leave it out of the median.
+    return _bits_to_int(low > np.median(low[1:]))
+
+
+def hash_image(image, method: str = "dhash", crop: Optional[Crop] = None) -> int:
+    """Return the perceptual hash of an open Pillow image."""
+    import numpy as np
+    from PIL import Image
+
+    if crop:
+        width, height = image.size
+        image = image.crop((
+            round(crop[0] * width), round(crop[1] * height),
+            round(crop[2] * width), round(crop[3] * height),
+        ))
+    gray = image.convert("L")
+    if method == "phash":
+        thumb = gray.resize((_PHASH_SIZE, _PHASH_SIZE), Image.Resampling.BOX)
+        return phash_pixels(np.asarray(thumb))
+    columns, rows = _DHASH_SIZE
+    thumb = gray.resize((columns + 1, rows), Image.Resampling.BOX)
+    return dhash_pixels(np.asarray(thumb))
+
+
+def image_hash(path: str, method: str = "dhash", crop: Optional[Crop] = None) -> int:
+    """Return the perceptual hash of the image file at ``path``."""
+    from PIL import Image
+
+    with Image.open(path) as opened:
+        # draft() lets JPEG decoding skip most of the full-size work.
+        opened.draft("L", (_PHASH_SIZE * 4, _PHASH_SIZE * 4))
+        return hash_image(opened, method, crop)
+
+
+def hamming_distance(first: int, second: int) -> int:
+    return bin(first ^ second).count("1")
@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Screenshot pre-processing before upload to a vision model.
+
+Full-resolution PNG captures are often several MB, and every translation and
+corrective retry used to upload them unchanged. ``prepare_image`` can shrink
+the longest edge, convert to grayscale, raise contrast, and re-encode as WebP,
+JPEG or optimized PNG. With the default options the file bytes are used as-is
+and Pillow is not imported.
+
+``ImageBatch`` runs the per-image work of one request (reading and hashing,
+re-encoding, copying) on a small shared thread pool, so several screenshots
+are handled at once and the work overlaps provider client setup. It records
+the time spent in each phase.
+
+Options (environment):
+  SHOT_IMAGE_MAX_EDGE   longest edge in pixels; 0 (default) keeps the size
+  SHOT_IMAGE_GRAYSCALE  "1" converts to grayscale
+  SHOT_IMAGE_CONTRAST   contrast factor (1.0 = unchanged) or "auto"
+  SHOT_IMAGE_FORMAT     "original" (default), "webp", "jpeg" or "png"
+  SHOT_IMAGE_QUALITY    WebP/JPEG quality, 1-100 (default 85)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import mimetypes
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+IMAGE_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "jpg": ("JPEG", "image/jpeg"),
+    "png": ("PNG", "image/png"),
+}
+_CACHE_SIZE = 16
+IMAGE_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+
+@dataclass(frozen=True)
+class ImagePrepOptions:
+    max_edge: int = 0
+    grayscale: bool = False
+    contrast: str = "1.0"
+    image_format: str = "original"
+    quality: int = 85
+
+    @classmethod
+    def from_env(cls) -> "ImagePrepOptions":
+        def number(name: str, default: int) -> int:
+            try:
+                return int(float(os.environ.get(name, "").strip() or default))
+            except ValueError:
+                return default
+
+        image_format = (os.environ.get("SHOT_IMAGE_FORMAT", "") or "original").strip().lower()
+        if image_format not in IMAGE_FORMATS:
+            image_format = "original"
+        contrast = (os.environ.get("SHOT_IMAGE_CONTRAST", "") or "1.0").strip().lower()
+        return cls(
+            max_edge=max(0, number("SHOT_IMAGE_MAX_EDGE", 0)),
+            grayscale=os.environ.get("SHOT_IMAGE_GRAYSCALE", "").strip().lower()
+            in {"1", "true", "yes", "on"},
+            contrast=contrast,
+            image_format=image_format,
+            quality=min(100, max(1, number("SHOT_IMAGE_QUALITY", 85))),
+        )
+
+    def contrast_factor(self) -> float:
+        if self.contrast == "auto":
+            return 0.0
+        try:
+            return float(self.contrast)
+        except ValueError:
+            return 1.0
+
+    @property
+    def changes_pixels(self) -> bool:
+        return bool(self.max_edge or self.grayscale or self.contrast_factor() != 1.0)
+
+    @property
+    def enabled(self) -> bool:
+        return self.changes_pixels or self.image_format != "original"
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    mime: str
+    data: bytes
+    original_bytes: int
+    size: Tuple[int, int] = (0, 0)
+    sha256: str = ""
+
+
+def _original(path: str) -> PreparedImage:
+    mime, _ = mimetypes.guess_type(path)
+    with open(path, "rb") as image_file:
+        data = image_file.read()
+    return PreparedImage(mime or "image/png", data, len(data), sha256=hashlib.sha256(data).hexdigest())
+
+
+def prepare_image(path: str, options: ImagePrepOptions) -> PreparedImage:
+    """Return the bytes to upload for ``path`` under ``options``.
+
+    A re-encoding that leaves the pixels unchanged but comes out larger than
+    the file is discarded in favour of the original bytes.
+    """
+    if not options.enabled:
+        return _original(path)
+
+    from PIL import Image, ImageEnhance, ImageOps
+
+    original = _original(path)
+    with Image.open(io.BytesIO(original.data)) as opened:
+        image = ImageOps.exif_transpose(opened)
+        has_alpha = image.mode in ("RGBA", "LA") or (
+            image.mode == "P" and "transparency" in image.info
+        )
+        if has_alpha:
+            # Flatten onto black, like the overlay shows dialogue boxes.
+            rgba = image.convert("RGBA")
+            flattened = Image.new("RGB", rgba.size, "black")
+            flattened.paste(rgba, mask=rgba.getchannel("A"))
+            image = flattened
+        image = image.convert("L" if options.grayscale else "RGB")
+        if options.max_edge and max(image.size) > options.max_edge:
+            image.thumbnail((options.max_edge, options.max_edge), Image.Resampling.LANCZOS)
+        factor = options.contrast_factor()
+        if factor == 0.0:
+            image = ImageOps.autocontrast(image, cutoff=1)
+        elif factor != 1.0:
+            image = ImageEnhance.Contrast(image).enhance(factor)
+
+        pillow_format, mime = IMAGE_FORMATS.get(options.image_format, IMAGE_FORMATS["png"])
+        encoded = io.BytesIO()
+        if pillow_format == "WEBP":
+            image.save(encoded, format="WEBP", quality=options.quality, method=4)
+        elif pillow_format == "JPEG":
+            image.save(encoded, format="JPEG", quality=options.quality, optimize=True)
+        else:
+            image.save(encoded, format="PNG", optimize=True)
+        size = image.size
+
+    data = encoded.getvalue()
+    if not options.changes_pixels and len(data) >= original.original_bytes:
+        return original
+    return PreparedImage(mime, data, original.original_bytes, size, original.sha256)
+
+
+_PREPARED: "OrderedDict[tuple, PreparedImage]" = OrderedDict()
+_IN_FLIGHT: "Dict[tuple, Future]" = {}
+_PREPARED_LOCK = threading.Lock()
+
+
+def prepare_image_cached(path: str, options: ImagePrepOptions) -> PreparedImage:
+    """``prepare_image`` that reuses the result while the file is unchanged.
+
+    Corrective retries upload the same screenshots again, so each capture is
+    read and encoded once per request. A caller asking for an image that
+    another thread is still preparing waits for that result.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, options)
+    with _PREPARED_LOCK:
+        prepared = _PREPARED.get(key)
+        if prepared is not None:
+            _PREPARED.move_to_end(key)
+            return prepared
+        pending = _IN_FLIGHT.get(key)
+        owner = pending is None
+        if owner:
+            pending = _IN_FLIGHT[key] = Future()
+    if not owner:
+        return pending.result()
+
+    try:
+        prepared = prepare_image(path, options)
+    except BaseException as exc:
+        with _PREPARED_LOCK:
+            _IN_FLIGHT.pop(key, None)
+        pending.set_exception(exc)
+        raise
+    with _PREPARED_LOCK:
+        _PREPARED[key] = prepared
+        while len(_PREPARED) > _CACHE_SIZE:
+            _PREPARED.popitem(last=False)
+        _IN_FLIGHT.pop(key, None)
+    pending.set_result(prepared)
+    return prepared
+
+
+def read_image(path: str) -> PreparedImage:
+    """The unmodified file bytes and their SHA-256, read once per file version."""
+    return prepare_image_cached(path, ImagePrepOptions())
+
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def image_executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=IMAGE_WORKERS, thread_name_prefix="image-prep"
+            )
+        return _EXECUTOR
+
+
+ImageStep = Callable[[int, str], object]
+
+
+class ImageBatch:
+    """Run named steps for every image of a request concurrently.
+
+    Each ``(step, image)`` pair is its own task, so ``results("read")`` only
+    waits for reading, not for a slower re-encode of the same files. Missing
+    files get ``None`` for every step. A step's exception is raised again by
+    ``results``.
+    """
+
+    def __init__(self, paths: Sequence[str], steps: Sequence[Tuple[str, ImageStep]]):
+        self.paths = list(paths)
+        self.started = time.perf_counter()
+        self.finished = self.started
+        self.phase_seconds: Dict[str, float] = {name: 0.0 for name, _step in steps}
+        self._lock = threading.Lock()
+        executor = image_executor()
+        self._futures: Dict[str, List[Optional[Future]]] = {}
+        # Submit step by step, so the first step of every image starts first.
+        for name, step in steps:
+            self._futures[name] = [
+                executor.submit(self._timed, name, step, index, path)
+                if path and os.path.isfile(path) else None
+                for index, path in enumerate(self.paths)
+            ]
+
+    def _timed(self, name: str, step: ImageStep, index: int, path: str):
+        started = time.perf_counter()
+        try:
+            return step(index, path)
+        finally:
+            now = time.perf_counter()
+            with self._lock:
+                self.phase_seconds[name] += now - started
+                self.finished = max(self.finished, now)
+
+    def results(self, name: str) -> List[object]:
+        """Wait for one step and return its results in path order."""
+        return [
+            future.result() if future is not None else None
+            for future in self._futures.get(name, [])
+        ]
+
+    def cancel(self, *names: str) -> None:
+        """Drop steps that have not started, e.g. after a cache hit.
+
+        Only the named steps are dropped when names are given.
+        """
+        for name, futures in self._futures.items():
+            if names and name not in names:
+                continue
+            for future in futures:
+                if future is not None:
+                    future.cancel()
+
+    def summary(self) -> str:
+        """Wait for the remaining steps and describe where the time went."""
+        for futures in self._futures.values():
+            for future in futures:
+                if future is not None and not future.cancelled():
+                    try:
+                        future.result()
+                    except Exception:
+                        pass
+        phases = ", ".join(
+            f"{name} {seconds * 1000:.0f} ms"
+            for name, seconds in self.phase_seconds.items()
+            if seconds
+        )
+        count = sum(1 for path in self.paths if path and os.path.isfile(path))
+        return (
+            f"{count} image(s) in {(self.finished - self.started) * 1000:.0f} ms "
+            f"on {IMAGE_WORKERS} thread(s) ({phases or 'no work'})"
+        )
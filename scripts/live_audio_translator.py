@@ -1,16 +1,15 @@
 import asyncio
-import base64
 import configparser
 import json
 import os
-import re
 import socket
 import sys
 import tempfile
+import threading
 import time
 import traceback
 from pathlib import Path
-from typing import List, Tuple
+from typing import Tuple
 
 import numpy as np
 import soundcard as sc
@@ -21,6 +20,21 @@ from dotenv import load_dotenv
 SCRIPT_DIR = Path(__file__).resolve().parent
 PROJECT_ROOT = SCRIPT_DIR.parent
 
+# The bundled portable Python isolates sys.path with a ._pth file. Add this
+# directory explicitly so sibling helper modules remain importable.
+if str(SCRIPT_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPT_DIR))
+
+from audio_pipeline import (
+    AUDIO_PLACEHOLDER,
+    AudioFrameEncoder,
+    PcmConverter,
+    PcmRing,
+    PolyphaseResampler,
+    VoiceGate,
+)
+from glossary_engine import GlossaryEntries, apply_glossary, load_compiled_glossary
+
 
 def _load_dotenv_files():
     settings_dir = os.environ.get("SETTINGS_DIR", "").strip()
@@ -57,107 +71,12 @@ def _get_key(*names, file_var=None):
     return ""
 
 
-def load_glossary(path: str) -> List[Tuple[str, str]]:
-    """Load source-to-target mappings using the translator's accepted formats."""
-    entries: List[Tuple[str, str]] = []
-    if not path or not os.path.isfile(path):
-        return entries
-
-    encodings = [
-        "utf-8", "utf-8-sig", "utf-16", "utf-16-le", "utf-16-be",
-        "cp1252", "cp932",
-    ]
-    text = None
-    for encoding in encodings:
-        try:
-            with open(path, "r", encoding=encoding) as glossary_file:
-                text = glossary_file.read()
-            break
-        except Exception:
-            continue
-    if text is None:
-        return entries
-
-    for raw_line in text.splitlines():
-        line = raw_line.replace("\ufeff", "").strip()
-        if not line or line.startswith("#"):
-            continue
-        source = target = None
-        for separator in ("->", "→", "\t", ":", "="):
-            if separator in line:
-                source_part, target_part = line.split(separator, 1)
-                source, target = source_part.strip(), target_part.strip()
-                break
-        if source and target:
-            entries.append((source, target))
-    return entries
-
-
-def _sentence_case(text: str) -> str:
-    lowered = text.lower()
-    for index, char in enumerate(lowered):
-        if char.isalpha():
-            return lowered[:index] + char.upper() + lowered[index + 1:]
-    return lowered
-
-
-def _adapt_glossary_case(source: str, target: str, matched: str) -> str:
-    """Adapt a replacement's case unless its source declares canonical casing."""
-    source_first_letter = next((char for char in source if char.isalpha()), "")
-    if source_first_letter.isupper():
-        return target
-
-    matched_letters = [char for char in matched if char.isalpha()]
-    if not matched_letters:
-        return target
-    if all(char.isupper() for char in matched_letters):
-        return target.upper()
-    if all(char.islower() for char in matched_letters):
-        return target.lower()
-
-    if re.search(r"\s", source):
-        words = re.findall(r"[^\W\d_]+", matched, flags=re.UNICODE)
-        if words and all(
-            word[0].isupper() and word[1:].islower() for word in words
-        ):
-            return target.title()
-
-    if matched_letters[0].isupper() and all(
-        char.islower() for char in matched_letters[1:]
-    ):
-        return _sentence_case(target)
-
-    return target
-
-
 def apply_target_glossary(
     text: str,
-    glossary: List[Tuple[str, str]],
+    glossary: GlossaryEntries,
 ) -> str:
     """Apply case-insensitive, boundary-aware target-language replacements."""
-    out = text
-    for source, target in glossary:
-        if re.search(r"\s", source):
-            pattern = re.compile(re.escape(source), flags=re.IGNORECASE)
-            out = pattern.sub(
-                lambda match: _adapt_glossary_case(
-                    source, target, match.group(0)
-                ),
-                out,
-            )
-        else:
-            pattern = re.compile(
-                rf"\b(?P<core>{re.escape(source)})(?P<suf>s|'s|’s)?\b",
-                flags=re.IGNORECASE,
-            )
-            out = pattern.sub(
-                lambda match: (
-                    _adapt_glossary_case(source, target, match.group("core"))
-                    + (match.group("suf") or "")
-                ),
-                out,
-            )
-    return out
+    return apply_glossary(text, glossary)
 
 
 def resolve_target_glossary_settings(project_root: Path) -> Tuple[str, bool, str]:
@@ -219,7 +138,7 @@ _load_dotenv_files()
 ) = (
     resolve_target_glossary_settings(PROJECT_ROOT)
 )
-TL2TL_GLOSSARY = load_glossary(TL2TL_GLOSSARY_PATH)
+TL2TL_GLOSSARY = load_compiled_glossary(TL2TL_GLOSSARY_PATH)
 _TERMINOLOGY_CHECK_AFTER = 0.0
 
 
@@ -262,6 +181,7 @@ TEMP_DIR = os.environ.get("TEMP") or tempfile.gettempdir()
 OVERLAY_DIR = os.path.join(TEMP_DIR, "JRPG_Overlay")
 AUDIO_TXT = os.path.join(OVERLAY_DIR, "audio.txt")
 LOG_TXT = os.path.join(OVERLAY_DIR, "audio_log.txt")
+METRICS_TXT = os.path.join(OVERLAY_DIR, "audio_metrics.txt")
 ERR_TXT = os.path.join(OVERLAY_DIR, "audio_error.txt")
 os.makedirs(OVERLAY_DIR, exist_ok=True)
 
@@ -276,11 +196,65 @@ TARGET_LANGUAGE_NAME = (os.environ.get("TARGET_LANGUAGE_NAME", "English") or "En
 SPEAKER_NAME = os.environ.get("SPEAKER_NAME", "").strip()
 DEBUG = os.environ.get("JRPG_DEBUG", "0").strip() == "1"
 
-CAPTURE_RATE = 16000
-BLOCK_DUR = 0.10
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def _env_flag(name):
+    return os.environ.get(name, "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+# Audio sent to each provider: 16-bit mono PCM at "rate", in events of
+# "block_seconds". Larger blocks mean fewer websocket events, smaller ones
+# lower latency. AUDIO_SEND_RATE and AUDIO_BLOCK_SECONDS override the profile.
+AUDIO_PROFILES = {
+    "openai": {"rate": 16000, "block_seconds": 0.10},
+    "gemini": {"rate": 16000, "block_seconds": 0.10},
+}
+_AUDIO_PROFILE = AUDIO_PROFILES.get(AUDIO_PROVIDER, AUDIO_PROFILES["openai"])
+CAPTURE_RATE = max(8000, int(_env_float("AUDIO_SEND_RATE", _AUDIO_PROFILE["rate"])))
+BLOCK_DUR = min(1.0, max(0.02, _env_float(
+    "AUDIO_BLOCK_SECONDS", _AUDIO_PROFILE["block_seconds"]
+)))
+BLOCK_FRAMES = round(CAPTURE_RATE * BLOCK_DUR)
+# The loopback device is recorded at its own mix rate (48 kHz on most Windows
+# systems) and resampled here. 0 asks WASAPI to deliver CAPTURE_RATE instead.
+DEVICE_RATE = max(0, int(_env_float("AUDIO_DEVICE_RATE", 48000)))
+CAPTURE_CHANNELS = max(1, int(_env_float("AUDIO_CAPTURE_CHANNELS", 2)))
+# Captured audio waits in a ring while the websocket is busy. When the sender
+# falls behind, queued blocks go out together, up to MAX_BLOCKS_PER_FRAME per
+# event; a full ring drops new blocks (an overrun). No audio for
+# UNDERRUN_BLOCKS block durations counts as an underrun.
+CAPTURE_RING_SECONDS = 2.0
+MAX_BLOCKS_PER_FRAME = 5
+UNDERRUN_BLOCKS = 3
 MAX_DISPLAY_CHARS = 1800
 
 
+# Optional voice-activity gate: silent blocks are not streamed to the provider.
+AUDIO_VAD = _env_flag("AUDIO_VAD")
+AUDIO_VAD_THRESHOLD_DBFS = _env_float("AUDIO_VAD_THRESHOLD_DBFS", -50.0)
+AUDIO_VAD_HANGOVER_SECONDS = max(0.0, _env_float("AUDIO_VAD_HANGOVER_SECONDS", 0.8))
+AUDIO_VAD_PREROLL_SECONDS = max(0.0, _env_float("AUDIO_VAD_PREROLL_SECONDS", 0.2))
+AUDIO_VAD_KEEPALIVE_SECONDS = max(0.0, _env_float("AUDIO_VAD_KEEPALIVE_SECONDS", 0.0))
+AUDIO_VAD_SPECTRAL = _env_flag("AUDIO_VAD_SPECTRAL")
+
+# audio.txt is polled by the overlay, so transcript deltas are coalesced and
+# written at most this many times per second. 0 writes every delta.
+AUDIO_OVERLAY_MAX_HZ = max(0.0, _env_float("AUDIO_OVERLAY_MAX_HZ", 30.0))
+
+# Latency percentiles go to audio_metrics.txt with AUDIO_METRICS=1 or JRPG_DEBUG.
+AUDIO_METRICS = _env_flag("AUDIO_METRICS") or DEBUG
+AUDIO_METRICS_INTERVAL_SECONDS = max(
+    5.0, _env_float("AUDIO_METRICS_INTERVAL_SECONDS", 60.0)
+)
+
+
 def _rotate_if_big(path, max_bytes=2_000_000, backups=3):
     try:
         if os.path.getsize(path) <= max_bytes:
@@ -410,19 +384,82 @@ def _pick_speaker():
     return sc.default_speaker()
 
 
-def capture_blocks(speaker):
-    block_size = int(CAPTURE_RATE * BLOCK_DUR)
-    mic = sc.get_microphone(id=speaker.name, include_loopback=True)
-    with mic.recorder(samplerate=CAPTURE_RATE, channels=2) as rec:
-        while True:
-            data = rec.record(numframes=block_size)
-            if data.ndim == 2 and data.shape[1] > 1:
-                mono = data.mean(axis=1)
-            else:
-                mono = data.reshape(-1)
-            mono = np.clip(mono, -1.0, 1.0)
-            pcm = (mono * 32767.0).astype("<i2", copy=False)
-            yield pcm.tobytes()
+def make_voice_gate():
+    if not AUDIO_VAD:
+        return None
+    return VoiceGate(
+        BLOCK_FRAMES,
+        CAPTURE_RATE,
+        threshold_dbfs=AUDIO_VAD_THRESHOLD_DBFS,
+        hangover_blocks=round(AUDIO_VAD_HANGOVER_SECONDS / BLOCK_DUR),
+        preroll_blocks=round(AUDIO_VAD_PREROLL_SECONDS / BLOCK_DUR),
+        keepalive_blocks=round(AUDIO_VAD_KEEPALIVE_SECONDS / BLOCK_DUR),
+        spectral=AUDIO_VAD_SPECTRAL,
+    )
+
+
+def capture_format():
+    """Return the recording rate, frames per block, and resampler to use."""
+    if DEVICE_RATE and DEVICE_RATE != CAPTURE_RATE:
+        device_frames = round(DEVICE_RATE * BLOCK_DUR)
+        try:
+            resampler = PolyphaseResampler(DEVICE_RATE, CAPTURE_RATE, device_frames)
+            if resampler.output_frames == BLOCK_FRAMES:
+                return DEVICE_RATE, device_frames, resampler
+        except ValueError as exc:
+            log(f"resampler unavailable, recording at {CAPTURE_RATE} Hz: {exc}")
+    return CAPTURE_RATE, BLOCK_FRAMES, None
+
+
+def record_into_ring(speaker, ring, stop, wake, failure, gate=None,
+                     metrics=None):
+    """Capture thread: convert loopback blocks into ``ring`` slots.
+
+    Without a voice gate each block is converted straight into its slot;
+    with one, only the blocks the gate lets through are copied in.
+    """
+    record_rate, record_frames, resampler = capture_format()
+    converter = PcmConverter(resampler)
+    pcm = np.empty(BLOCK_FRAMES, dtype="<i2")
+    # Latency metrics need speech onsets even when nothing is gated.
+    detector = None
+    if metrics is not None and gate is None:
+        detector = VoiceGate(
+            BLOCK_FRAMES, CAPTURE_RATE, threshold_dbfs=AUDIO_VAD_THRESHOLD_DBFS
+        )
+    try:
+        mic = sc.get_microphone(id=speaker.name, include_loopback=True)
+        with mic.recorder(
+            samplerate=record_rate, channels=CAPTURE_CHANNELS
+        ) as rec:
+            while not stop.is_set():
+                data = rec.record(numframes=record_frames)
+                captured_at = time.perf_counter()
+                if gate is None:
+                    slot = ring.write_slot()
+                    if slot is None:
+                        continue
+                    converter.convert(data, out=slot)
+                    if detector is not None:
+                        metrics.observe_voice(detector.is_voiced(slot), captured_at)
+                    ring.commit(captured_at)
+                else:
+                    converter.convert(data, out=pcm)
+                    blocks = gate.process(pcm)
+                    if metrics is not None:
+                        metrics.observe_voice(gate.last_voiced, captured_at)
+                    if not blocks:
+                        continue
+                    for block in blocks:
+                        slot = ring.write_slot()
+                        if slot is None:
+                            break
+                        np.copyto(slot, block)
+                        ring.commit(captured_at)
+                wake()
+    except Exception as exc:
+        failure.append(exc)
+        wake()
 
 
 def test_audio_input(duration_seconds=4.0):
@@ -510,40 +547,365 @@ def trim_display(text):
     return text[-MAX_DISPLAY_CHARS:].lstrip()
 
 
+class LatencyMetrics:
+    """Latency samples for live audio, written as percentile summaries.
+
+    The capture thread reports speech onsets: the first voiced block after
+    at least ``onset_silence_blocks`` silent ones, timed at the end of that
+    block. The event loop reports sends, transcript events and overlay
+    writes. Every ``interval`` seconds, and when a connection ends, the
+    samples are summarized as p50/p95/p99 milliseconds in one JSON line of
+    audio_metrics.txt.
+
+    Samples:
+      capture_to_send       block captured -> its websocket send finished
+      send                  duration of one websocket send
+      onset_to_first_delta  speech onset -> first transcript delta
+      onset_to_overlay      speech onset -> first overlay write showing it
+      onset_to_done         speech onset -> final transcript of the turn
+      delta_to_overlay      transcript delta -> overlay write containing it
+    """
+
+    def __init__(self, context, interval=AUDIO_METRICS_INTERVAL_SECONDS,
+                 onset_silence_blocks=5):
+        self.context = context
+        self.interval = interval
+        self.onset_silence_blocks = onset_silence_blocks
+        self.samples = {}
+        self._silent_run = onset_silence_blocks
+        self._onset = None  # written by the capture thread only
+        self._turn = None
+        self._awaiting = set()
+        self._last_summary = time.perf_counter()
+
+    def add(self, name, seconds):
+        self.samples.setdefault(name, []).append(seconds)
+
+    def observe_voice(self, voiced, captured_at):
+        """Capture thread: track speech onsets."""
+        if voiced:
+            if self._silent_run >= self.onset_silence_blocks:
+                self._onset = captured_at
+            self._silent_run = 0
+        else:
+            self._silent_run += 1
+
+    def _turn_sample(self, name, at):
+        onset = self._onset
+        if onset is not None and onset != self._turn:
+            self._turn = onset
+            self._awaiting = {
+                "onset_to_first_delta", "onset_to_overlay", "onset_to_done",
+            }
+        if name in self._awaiting:
+            self._awaiting.discard(name)
+            self.add(name, at - self._turn)
+
+    def blocks_sent(self, captured_at, started_at, sent_at):
+        self.samples.setdefault("capture_to_send", []).extend(
+            (sent_at - captured_at).tolist()
+        )
+        self.add("send", sent_at - started_at)
+        if sent_at - self._last_summary >= self.interval:
+            self.flush()
+
+    def transcript_delta(self, at):
+        self._turn_sample("onset_to_first_delta", at)
+
+    def transcript_done(self, at):
+        self._turn_sample("onset_to_done", at)
+
+    def overlay_write(self, at, pending_since):
+        if pending_since is not None:
+            self.add("delta_to_overlay", at - pending_since)
+        if "onset_to_first_delta" not in self._awaiting:
+            self._turn_sample("onset_to_overlay", at)
+
+    def flush(self):
+        self._last_summary = time.perf_counter()
+        if not self.samples:
+            return
+        summary = {}
+        for name, values in self.samples.items():
+            p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000.0
+            summary[name] = {
+                "count": len(values),
+                "p50": round(float(p50), 1),
+                "p95": round(float(p95), 1),
+                "p99": round(float(p99), 1),
+            }
+        self.samples = {}
+        record = {"time": time.strftime("%Y-%m-%d %H:%M:%S"), **self.context,
+                  "latency_ms": summary}
+        try:
+            _rotate_if_big(METRICS_TXT)
+            with open(METRICS_TXT, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except Exception:
+            pass
+        log("latency ms: " + "; ".join(
+            f"{name} p50={values['p50']:.0f} p95={values['p95']:.0f} "
+            f"p99={values['p99']:.0f} (n={values['count']})"
+            for name, values in summary.items()
+        ))
+
+
+def make_latency_metrics(model):
+    if not AUDIO_METRICS:
+        return None
+    return LatencyMetrics({
+        "provider": AUDIO_PROVIDER,
+        "model": model,
+        "send_rate": CAPTURE_RATE,
+        "device_rate": DEVICE_RATE,
+        "block_seconds": BLOCK_DUR,
+        "vad": AUDIO_VAD,
+        "overlay_max_hz": AUDIO_OVERLAY_MAX_HZ,
+    })
+
+
+# Characters that must follow a word boundary before the glossary output in
+# front of it is final: a plural/possessive suffix plus the closing \b check.
+GLOSSARY_LOOKAHEAD_CHARS = 3
+
+
 class TranscriptBuffer:
-    def __init__(self):
+    """Rolling overlay transcript with incremental glossary substitution.
+
+    Text before the last safe word or sentence boundary is kept as already
+    substituted chunks, so each delta only re-scans the unsettled tail
+    instead of the whole 1,800-character buffer.
+
+    While ``run_writer`` runs, deltas only mark the buffer dirty and the
+    writer flushes them to ``audio.txt`` at most ``max_hz`` times per second.
+    ``deltas`` and ``writes`` count what was received and what was written.
+    """
+
+    def __init__(self, max_hz=AUDIO_OVERLAY_MAX_HZ, metrics=None):
         self.text = ""
         self.last_write = ""
+        self.deltas = 0
+        self.writes = 0
+        self.metrics = metrics
+        self._pending_since = None
+        self._write_interval = 1.0 / max_hz if max_hz > 0 else 0.0
+        self._dirty = None
+        self._glossary = None
+        self._chunks = []  # [raw length, substituted text] per settled chunk
+        self._stable_length = 0
+        self._stable_text = ""
 
     def append(self, delta):
         if not delta:
             return
-        self.text = trim_display(self.text + delta)
-        self.write()
+        combined = self.text + delta
+        self.text = trim_display(combined)
+        # trim_display keeps a suffix of the right-stripped text; whatever it
+        # cut from the front leaves the settled chunks too.
+        self._drop_front(len(combined.rstrip()) - len(self.text))
+        self.deltas += 1
+        if self.metrics is not None:
+            now = time.perf_counter()
+            self.metrics.transcript_delta(now)
+            if self._pending_since is None:
+                self._pending_since = now
+        if self._dirty is None:
+            self.write()
+        else:
+            self._dirty.set()
 
     def replace(self, text):
+        """Replace the transcript with a final one and write it immediately."""
         if text is None:
             return
         self.text = trim_display(text)
+        self._reset_stable()
+        if self.metrics is not None:
+            self.metrics.transcript_done(time.perf_counter())
+        self.write()
+
+    async def run_writer(self):
+        """Write coalesced deltas until cancelled."""
+        if not self._write_interval:
+            return
+        self._dirty = asyncio.Event()
+        while True:
+            await self._dirty.wait()
+            self._dirty.clear()
+            try:
+                self.write()
+            except Exception as exc:
+                log(f"overlay write failed: {exc}")
+            await asyncio.sleep(self._write_interval)
+
+    def close(self):
+        """Flush pending text and log how far the writes were coalesced."""
+        self._dirty = None
         self.write()
+        log(f"overlay: {self.deltas} deltas, {self.writes} writes")
+        if self.metrics is not None:
+            self.metrics.flush()
+
+    def _reset_stable(self):
+        self._chunks = []
+        self._stable_length = 0
+        self._stable_text = ""
+
+    def _drop_front(self, count):
+        if count <= 0 or not self._chunks:
+            return
+        while self._chunks and count >= self._chunks[0][0]:
+            count -= self._chunks[0][0]
+            self._stable_length -= self._chunks[0][0]
+            self._chunks.pop(0)
+        if self._chunks and count:
+            # The trim cut into a chunk; substitute what is left of it again.
+            raw_length = self._chunks[0][0] - count
+            self._chunks[0] = [
+                raw_length, self._glossary.apply(self.text[:raw_length])
+            ]
+            self._stable_length -= count
+        elif not self._chunks:
+            self._stable_length = 0
+        self._stable_text = "".join(text for _length, text in self._chunks)
+
+    def _settled_boundary(self, tail, spans):
+        """Return the last tail offset whose substitution can no longer change.
+
+        The offset must follow a non-word character, lie outside every match,
+        and be followed by enough text to decide any match starting there.
+        """
+        limit = len(tail) - (
+            self._glossary.max_source_length + GLOSSARY_LOOKAHEAD_CHARS
+        )
+        span_index = len(spans) - 1
+        for boundary in range(limit, 0, -1):
+            while span_index >= 0 and spans[span_index][0] >= boundary:
+                span_index -= 1
+            if span_index >= 0 and spans[span_index][1] > boundary:
+                continue
+            char = tail[boundary - 1]
+            if not (char.isalnum() or char == "_"):
+                return boundary
+        return 0
+
+    def _substitute_tail(self):
+        tail = self.text[self._stable_length:]
+        spans = list(self._glossary.replacements(tail))
+        pieces = []
+        position = 0
+        for start, end, replacement in spans:
+            pieces.append(tail[position:start])
+            pieces.append(replacement)
+            position = end
+        pieces.append(tail[position:])
+        tail_text = "".join(pieces)
+
+        boundary = self._settled_boundary(tail, spans)
+        if not boundary:
+            return tail_text
+        settled_length = boundary + sum(
+            len(replacement) - (end - start)
+            for start, end, replacement in spans
+            if end <= boundary
+        )
+        settled = tail_text[:settled_length]
+        self._chunks.append([boundary, settled])
+        self._stable_length += boundary
+        self._stable_text += settled
+        return tail_text[settled_length:]
 
     def write(self):
         glossary = (
-            TL2TL_GLOSSARY if terminology_overrides_enabled() else []
-        )
-        display_text = trim_display(
-            apply_target_glossary(self.text, glossary)
+            TL2TL_GLOSSARY if terminology_overrides_enabled() else None
         )
+        if glossary is not self._glossary:
+            self._glossary = glossary
+            self._reset_stable()
+        if glossary:
+            tail_text = self._substitute_tail()
+            display_text = trim_display(self._stable_text + tail_text)
+        else:
+            display_text = trim_display(self.text)
         if display_text != self.last_write:
             atomic_write_text(AUDIO_TXT, display_text)
             self.last_write = display_text
+            self.writes += 1
+            if self.metrics is not None:
+                self.metrics.overlay_write(
+                    time.perf_counter(), self._pending_since
+                )
+        self._pending_since = None
 
 
-async def audio_sender(ws, speaker, make_event):
-    blocks = capture_blocks(speaker)
-    while True:
-        chunk = await asyncio.to_thread(next, blocks)
-        await ws.send(json.dumps(make_event(chunk)))
+async def audio_sender(ws, speaker, encoder, metrics=None):
+    """Send captured audio, batching queued blocks when the socket is slow."""
+    loop = asyncio.get_running_loop()
+    ring = PcmRing(
+        BLOCK_FRAMES, round(CAPTURE_RING_SECONDS / BLOCK_DUR)
+    )
+    gate = make_voice_gate()
+    ready = asyncio.Event()
+    stop = threading.Event()
+    failure = []
+
+    def wake():
+        try:
+            loop.call_soon_threadsafe(ready.set)
+        except RuntimeError:
+            pass  # the event loop is already closed
+
+    threading.Thread(
+        target=record_into_ring,
+        args=(speaker, ring, stop, wake, failure, gate, metrics),
+        name="audio-capture",
+        daemon=True,
+    ).start()
+    reported_overruns = 0
+    try:
+        while True:
+            if failure:
+                raise failure[0]
+            if not ring.available():
+                ready.clear()
+                if not ring.available():
+                    gated = gate.suppressed_blocks if gate is not None else 0
+                    try:
+                        await asyncio.wait_for(
+                            ready.wait(), BLOCK_DUR * UNDERRUN_BLOCKS
+                        )
+                    except asyncio.TimeoutError:
+                        if gate is not None and gate.suppressed_blocks != gated:
+                            continue  # silence held back by the voice gate
+                        ring.underruns += 1
+                        log(
+                            "capture underrun: no audio for "
+                            f"{BLOCK_DUR * UNDERRUN_BLOCKS:.1f} s"
+                        )
+                    continue
+            pcm, count = ring.peek(MAX_BLOCKS_PER_FRAME)
+            started_at = time.perf_counter()
+            await ws.send(encoder.encode(pcm), text=True)
+            if metrics is not None:
+                metrics.blocks_sent(
+                    ring.captured_at(count), started_at, time.perf_counter()
+                )
+            ring.release(count)
+            if ring.overruns != reported_overruns:
+                reported_overruns = ring.overruns
+                log(f"capture overrun: {reported_overruns} blocks dropped so far")
+    finally:
+        stop.set()
+        log(
+            f"capture: {ring.written} blocks, {ring.overruns} overruns, "
+            f"{ring.underruns} underruns"
+        )
+        if gate is not None:
+            total = gate.sent_blocks + gate.suppressed_blocks
+            log(
+                f"vad: {gate.suppressed_blocks * BLOCK_DUR:.1f} s of "
+                f"{total * BLOCK_DUR:.1f} s not sent"
+            )
 
 
 def _extract_text_parts(value):
@@ -590,14 +952,17 @@ async def run_openai(speaker):
         await ws.send(json.dumps(setup))
         _mark_audio_connection_ready()
 
-        def make_event(chunk):
-            return {
-                "type": "session.input_audio_buffer.append",
-                "audio": base64.b64encode(chunk).decode("ascii"),
-            }
+        encoder = AudioFrameEncoder({
+            "type": "session.input_audio_buffer.append",
+            "audio": AUDIO_PLACEHOLDER,
+        })
 
-        buf = TranscriptBuffer()
-        sender = asyncio.create_task(audio_sender(ws, speaker, make_event))
+        metrics = make_latency_metrics(TRANSLATE_MODEL)
+        buf = TranscriptBuffer(metrics=metrics)
+        sender = asyncio.create_task(
+            audio_sender(ws, speaker, encoder, metrics)
+        )
+        writer = asyncio.create_task(buf.run_writer())
         try:
             async for raw in ws:
                 msg = json.loads(_decode_ws_text(raw))
@@ -628,6 +993,8 @@ async def run_openai(speaker):
                         buf.append(text)
         finally:
             sender.cancel()
+            writer.cancel()
+            buf.close()
 
 
 async def run_gemini(speaker):
@@ -664,18 +1031,21 @@ async def run_gemini(speaker):
         log("gemini setup: " + setup_ack[:500])
         _mark_audio_connection_ready()
 
-        def make_event(chunk):
-            return {
-                "realtimeInput": {
-                    "audio": {
-                        "data": base64.b64encode(chunk).decode("ascii"),
-                        "mimeType": f"audio/pcm;rate={CAPTURE_RATE}",
-                    }
+        encoder = AudioFrameEncoder({
+            "realtimeInput": {
+                "audio": {
+                    "data": AUDIO_PLACEHOLDER,
+                    "mimeType": f"audio/pcm;rate={CAPTURE_RATE}",
                 }
             }
+        })
 
-        buf = TranscriptBuffer()
-        sender = asyncio.create_task(audio_sender(ws, speaker, make_event))
+        metrics = make_latency_metrics(GEMINI_AUDIO_MODEL)
+        buf = TranscriptBuffer(metrics=metrics)
+        sender = asyncio.create_task(
+            audio_sender(ws, speaker, encoder, metrics)
+        )
+        writer = asyncio.create_task(buf.run_writer())
         try:
             async for raw in ws:
                 msg = json.loads(_decode_ws_text(raw))
@@ -691,6 +1061,8 @@ async def run_gemini(speaker):
                         buf.append(text)
         finally:
             sender.cancel()
+            writer.cancel()
+            buf.close()
 
 
 async def run_audio_with_reconnect(speaker):
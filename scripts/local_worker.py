@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Long-lived local worker processes for the JRPG Translator scripts.
+
+The AutoHotkey front end starts one short Python process per action.  A script
+can instead hand its job to an already running worker that keeps imports,
+clients, and parsed settings warm.  Workers listen on a named pipe (Windows) or
+a Unix socket and publish their address in ``%TEMP%\\JRPG_Overlay``.  Every
+connection is authenticated with a random key stored next to the address, so
+only processes of the same user can submit jobs.
+
+The caller always keeps a working fallback: when no worker answers,
+``submit`` raises ``WorkerUnavailable`` and the job runs in-process as before.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Sequence
+
+TEMP_DIR = os.environ.get("TEMP") or tempfile.gettempdir()
+OVERLAY_DIR = os.path.join(TEMP_DIR, "JRPG_Overlay")
+DEFAULT_IDLE_SECONDS = 600.0
+
+
+class WorkerUnavailable(RuntimeError):
+    """No compatible worker accepted the job; run it in-process instead."""
+
+
+def env_enabled(name: str, default: bool = False) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def idle_seconds(name: str, default: float = DEFAULT_IDLE_SECONDS) -> float:
+    try:
+        return max(10.0, float(os.environ.get(name, "") or default))
+    except ValueError:
+        return default
+
+
+def endpoint_path(name: str) -> str:
+    return os.path.join(OVERLAY_DIR, f"{name}.worker.json")
+
+
+def source_fingerprint(paths: Sequence[str]) -> str:
+    """Identify the code a worker runs so an updated script never uses a stale one."""
+    parts = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            parts.append(f"{os.path.basename(path)}:{stat.st_mtime_ns}:{stat.st_size}")
+        except OSError:
+            parts.append(f"{os.path.basename(path)}:missing")
+    return "|".join(parts)
+
+
+def _read_endpoint(name: str) -> dict[str, Any] | None:
+    try:
+        with open(endpoint_path(name), "r", encoding="utf-8") as endpoint_file:
+            endpoint = json.load(endpoint_file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(endpoint, dict) or not endpoint.get("address"):
+        return None
+    return endpoint
+
+
+def _remove_endpoint(name: str, address: str = "") -> None:
+    """Remove the endpoint file, but never one published by a newer worker."""
+    if address:
+        current = _read_endpoint(name)
+        if current and current.get("address") != address:
+            return
+    try:
+        os.remove(endpoint_path(name))
+    except OSError:
+        pass
+
+
+def _connect(endpoint: dict[str, Any]):
+    from multiprocessing.connection import Client
+
+    return Client(
+        endpoint["address"],
+        family=endpoint.get("family") or None,
+        authkey=bytes.fromhex(endpoint.get("authkey", "")),
+    )
+
+
+def submit(name: str, payload: dict[str, Any], fingerprint: str = "") -> Any:
+    """Send one job to a running worker and wait for its reply."""
+    endpoint = _read_endpoint(name)
+    if endpoint is None:
+        raise WorkerUnavailable(f"No {name} worker is running.")
+    if fingerprint and endpoint.get("fingerprint") != fingerprint:
+        # The scripts were updated after this worker started. Ask it to exit so
+        # the next spawn picks up the new code.
+        try:
+            connection = _connect(endpoint)
+            try:
+                connection.send({"command": "shutdown"})
+            finally:
+                connection.close()
+        except Exception:
+            _remove_endpoint(name, endpoint.get("address", ""))
+        raise WorkerUnavailable(f"The {name} worker runs outdated code.")
+
+    try:
+        connection = _connect(endpoint)
+    except Exception as exc:
+        _remove_endpoint(name, endpoint.get("address", ""))
+        raise WorkerUnavailable(f"The {name} worker did not answer: {exc}") from exc
+    try:
+        connection.send(payload)
+        return connection.recv()
+    except (EOFError, OSError) as exc:
+        raise WorkerUnavailable(f"The {name} worker stopped during the job: {exc}") from exc
+    finally:
+        connection.close()
+
+
+def spawn(arguments: Sequence[str]) -> None:
+    """Start a detached worker process without a console window."""
+    kwargs: dict[str, Any] = {
+        "stdin": subprocess.DEVNULL,
+        "stdout": subprocess.DEVNULL,
+        "stderr": subprocess.DEVNULL,
+        "close_fds": True,
+    }
+    if sys.platform == "win32":
+        kwargs["creationflags"] = (
+            getattr(subprocess, "DETACHED_PROCESS", 0x00000008)
+            | getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0x00000200)
+            | getattr(subprocess, "CREATE_NO_WINDOW", 0x08000000)
+        )
+    else:
+        kwargs["start_new_session"] = True
+    try:
+        subprocess.Popen([sys.executable, *arguments], **kwargs)
+    except Exception as exc:
+        print(f"(Worker) could not start: {exc}", file=sys.stderr)
+
+
+def serve(
+    name: str,
+    handle: Callable[[dict[str, Any], Callable[[], bool]], Any],
+    fingerprint: str = "",
+    idle_timeout: float = DEFAULT_IDLE_SECONDS,
+) -> None:
+    """Accept jobs one at a time until idle for ``idle_timeout`` seconds.
+
+    ``handle`` receives the job and a callable that reports whether the
+    submitting process is still waiting. A client that was closed by the
+    AutoHotkey watchdog should not have its timeout message overwritten.
+    """
+    from multiprocessing.connection import Listener
+
+    os.makedirs(OVERLAY_DIR, exist_ok=True)
+    family = "AF_PIPE" if sys.platform == "win32" else "AF_UNIX"
+    authkey = os.urandom(32)
+    listener = Listener(family=family, authkey=authkey)
+    address = listener.address
+    state = {"busy": False, "last_activity": time.monotonic()}
+    lock = threading.Lock()
+
+    def publish() -> None:
+        endpoint = {
+            "address": address,
+            "family": family,
+            "authkey": authkey.hex(),
+            "pid": os.getpid(),
+            "fingerprint": fingerprint,
+        }
+        temporary = endpoint_path(name) + f".{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as endpoint_file:
+            json.dump(endpoint, endpoint_file)
+        os.replace(temporary, endpoint_path(name))
+
+    def shutdown() -> None:
+        _remove_endpoint(name, address)
+        # Listener.accept() cannot be interrupted portably; exit the process.
+        os._exit(0)
+
+    def watchdog() -> None:
+        while True:
+            time.sleep(1.0)
+            with lock:
+                idle = (
+                    not state["busy"]
+                    and time.monotonic() - state["last_activity"] >= idle_timeout
+                )
+            if idle:
+                shutdown()
+
+    publish()
+    threading.Thread(target=watchdog, name=f"{name}-idle", daemon=True).start()
+    try:
+        while True:
+            try:
+                connection = listener.accept()
+            except Exception:
+                # Failed authentication or a client that vanished mid-handshake.
+                continue
+            with lock:
+                state["busy"] = True
+            try:
+                try:
+                    job = connection.recv()
+                except (EOFError, OSError):
+                    continue
+                if isinstance(job, dict) and job.get("command") == "shutdown":
+                    shutdown()
+
+                def client_waiting() -> bool:
+                    try:
+                        if not connection.poll():
+                            return True
+                        connection.recv()
+                    except (EOFError, OSError):
+                        return False
+                    return True
+
+                try:
+                    reply = handle(job, client_waiting)
+                except Exception as exc:
+                    reply = {"status": "error", "error": str(exc)}
+                try:
+                    connection.send(reply)
+                except (EOFError, OSError):
+                    pass
+            finally:
+                connection.close()
+                with lock:
+                    state["busy"] = False
+                    state["last_activity"] = time.monotonic()
+    finally:
+        _remove_endpoint(name, address)
+        listener.close()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Hedged provider requests: the first valid answer wins.
+
+Most screenshot translations finish in a few seconds, but a small share of
+requests sits in a provider queue for 20 s or more. A hedged request starts
+the normal request and, if it has not answered after ``delay`` seconds, a
+second one to the same or an alternate provider/model. The first answer that
+passes the caller's validity check wins, and the other request is cancelled.
+
+The SDKs used here are synchronous, so each attempt runs on a daemon thread.
+Attempts are streamed, and a cancelled attempt stops at its next chunk and
+closes its connection. An attempt still waiting for its first byte cannot be
+interrupted; its answer is ignored, and a one-shot process does not wait for
+it on exit.
+
+``HedgeStats`` keeps recent latencies of the normal request in a small JSON
+file. Its 90th percentile is the "auto" hedge delay, and the win counts and
+estimated time saved show whether the delay is well chosen.
+
+Options (environment):
+  SHOT_HEDGE                "off" (default), "1" to hedge after the delay, or
+                            "race" to send both requests at once
+  SHOT_HEDGE_DELAY_SECONDS  seconds, or "auto" (default): the p90 latency of
+                            recent requests, 8 s until 20 have been recorded
+  SHOT_HEDGE_PROVIDER       provider of the second request (default: same)
+  SHOT_HEDGE_MODEL          model of the second request (default: the
+                            provider's usual model)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import statistics
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+HEDGE_MODES = ("delay", "race")
+DEFAULT_DELAY_SECONDS = 8.0
+MIN_SAMPLES = 20
+MAX_SAMPLES = 200
+
+
+class HedgeCancelled(Exception):
+    """Raised inside an attempt that lost the race."""
+
+
+@dataclass(frozen=True)
+class HedgeOptions:
+    mode: str = "off"
+    delay_seconds: Optional[float] = None  # None = "auto"
+    provider: str = ""
+    model: str = ""
+
+    @classmethod
+    def from_env(cls) -> "HedgeOptions":
+        mode = (os.environ.get("SHOT_HEDGE", "") or "off").strip().lower()
+        if mode in {"1", "true", "yes", "on", "hedge"}:
+            mode = "delay"
+        if mode not in HEDGE_MODES:
+            mode = "off"
+        delay_text = (os.environ.get("SHOT_HEDGE_DELAY_SECONDS", "") or "auto").strip().lower()
+        try:
+            delay = None if delay_text == "auto" else max(0.0, float(delay_text))
+        except ValueError:
+            delay = None
+        return cls(
+            mode=mode,
+            delay_seconds=delay,
+            provider=(os.environ.get("SHOT_HEDGE_PROVIDER", "") or "").strip().lower(),
+            model=(os.environ.get("SHOT_HEDGE_MODEL", "") or "").strip(),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in HEDGE_MODES
+
+
+@dataclass
+class HedgeOutcome:
+    text: str
+    winner: str  # "primary", "hedge" or "" when no attempt was valid
+    seconds: float
+    hedge_started: Optional[float] = None
+    primary_seconds: Optional[float] = None  # None while the primary still ran
+    primary_failed: bool = False
+
+
+Attempt = Callable[[threading.Event], str]
+
+
+def hedged_call(primary: Attempt, hedge: Attempt, delay: float,
+                is_valid: Callable[[str], bool]) -> HedgeOutcome:
+    """Run ``primary``, add ``hedge`` after ``delay`` seconds, return the first valid text.
+
+    Each attempt receives an event that is set once it has lost; it should
+    raise ``HedgeCancelled`` (or return) when it sees it. A failed or invalid
+    primary starts the hedge at once. When neither attempt is valid, the
+    primary's text is returned, else the hedge's, else the primary's
+    exception is raised.
+    """
+    started = time.perf_counter()
+    results: "queue.Queue" = queue.Queue()
+    cancel = {"primary": threading.Event(), "hedge": threading.Event()}
+
+    def run(name: str, attempt: Attempt) -> None:
+        try:
+            text, error = attempt(cancel[name]), None
+        except BaseException as exc:  # reported to the waiting caller
+            text, error = "", exc
+        results.put((name, text, error, time.perf_counter() - started))
+
+    def start(name: str, attempt: Attempt) -> None:
+        threading.Thread(target=run, args=(name, attempt), name=f"hedge-{name}", daemon=True).start()
+
+    start("primary", primary)
+    running = {"primary"}
+    outcome = HedgeOutcome("", "", 0.0)
+    finished: Dict[str, tuple] = {}
+    while running:
+        timeout = None
+        if outcome.hedge_started is None:
+            timeout = max(0.0, delay - (time.perf_counter() - started))
+        try:
+            name, text, error, seconds = results.get(timeout=timeout)
+        except queue.Empty:
+            name = None
+        if name is not None:
+            running.discard(name)
+            finished[name] = (text, error)
+            if name == "primary":
+                outcome.primary_seconds = seconds
+                outcome.primary_failed = error is not None or not is_valid(text)
+            if error is None and is_valid(text):
+                outcome.text, outcome.winner, outcome.seconds = text, name, seconds
+                break
+        if outcome.hedge_started is None and (name is None or name == "primary"):
+            outcome.hedge_started = time.perf_counter() - started
+            start("hedge", hedge)
+            running.add("hedge")
+
+    for name in running:
+        cancel[name].set()
+    if outcome.winner:
+        return outcome
+
+    outcome.seconds = time.perf_counter() - started
+    for name in ("primary", "hedge"):
+        text, _error = finished.get(name, ("", None))
+        if text:
+            outcome.text = text
+            return outcome
+    _text, error = finished.get("primary", ("", None))
+    if error is not None:
+        raise error
+    return outcome
+
+
+class HedgeStats:
+    """Latency samples and win counts in a JSON file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+        except Exception:
+            self.data = {}
+        for name in ("requests", "hedged", "primary_wins", "hedge_wins", "saved_seconds"):
+            self.data.setdefault(name, 0)
+        self.data.setdefault("primary_latencies", [])
+        self.data.setdefault("cancelled_primary_after", [])
+
+    @property
+    def latencies(self) -> List[float]:
+        """Latencies of normal requests that answered."""
+        return [float(value) for value in self.data["primary_latencies"]]
+
+    @property
+    def cancelled(self) -> List[float]:
+        """How long cancelled normal requests had run: lower bounds of their latency."""
+        return [float(value) for value in self.data["cancelled_primary_after"]]
+
+    def delay(self, options: HedgeOptions) -> float:
+        """Return the hedge delay for the next request."""
+        if options.mode == "race":
+            return 0.0
+        if options.delay_seconds is not None:
+            return options.delay_seconds
+        latencies = self.latencies + self.cancelled
+        if len(latencies) < MIN_SAMPLES:
+            return DEFAULT_DELAY_SECONDS
+        return statistics.quantiles(latencies, n=10)[-1]
+
+    def estimated_saving(self, outcome: HedgeOutcome) -> float:
+        """Estimate how much sooner a hedge win answered than the primary would have.
+
+        The cancelled primary's own latency is unknown, so the median latency
+        of past primaries that answered after the hedge start stands in for it.
+        """
+        if outcome.winner != "hedge" or outcome.hedge_started is None or outcome.primary_failed:
+            return 0.0
+        slow = [value for value in self.latencies if value > outcome.hedge_started]
+        if not slow:
+            return 0.0
+        return max(0.0, statistics.median(slow) - outcome.seconds)
+
+    def record(self, outcome: HedgeOutcome) -> float:
+        """Count one request, save the file, and return the estimated saving."""
+        saved = self.estimated_saving(outcome)
+        data = self.data
+        data["requests"] += 1
+        data["hedged"] += int(outcome.hedge_started is not None)
+        if outcome.winner:
+            data[f"{outcome.winner}_wins"] += 1
+        data["saved_seconds"] = round(float(data["saved_seconds"]) + saved, 3)
+        # An error or unusable answer says nothing about the primary's latency.
+        if outcome.primary_failed:
+            pass
+        elif outcome.primary_seconds is not None:
+            data["primary_latencies"] = (
+                self.latencies + [round(outcome.primary_seconds, 3)]
+            )[-MAX_SAMPLES:]
+        else:
+            data["cancelled_primary_after"] = (
+                self.cancelled + [round(outcome.seconds, 3)]
+            )[-MAX_SAMPLES:]
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, self.path)
+        except Exception:
+            pass
+        return saved
+
+    def summary(self) -> str:
+        data = self.data
+        hedged = int(data["hedged"])
+        return (
+            f"{hedged}/{data['requests']} requests hedged, hedge won "
+            f"{data['hedge_wins']}/{hedged or 1}, ~{float(data['saved_seconds']):.1f} s saved"
+        )
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""On-disk cache of finished screenshot translations and explanations.
+
+Games redisplay the same dialogue box often: re-reading a sign, retrying a
+battle, reloading a save. With the cache enabled, an identical capture that is
+translated under identical settings is answered from a local SQLite file
+instead of the provider.
+
+Entries are content-addressed. The key is a SHA-256 over the image bytes plus
+every input that can change the post-processed text (provider, model, prompt,
+glossaries, post-processing mode, upload options). Anything that changes
+one of these simply misses, so there is nothing to invalidate by hand.
+
+Entries older than ``max_age_days`` and the least recently used entries beyond
+``max_entries`` are evicted when a new translation is stored. Hit and miss
+counts are kept in the same database.
+
+explainer.py keeps its answers in a separate database,
+``Settings/explanation_cache.sqlite3`` (``EXPLAIN_CACHE=1``); pass it with
+``--db`` to inspect it.
+
+Usage:
+  python result_cache.py [--db PATH] stats
+  python result_cache.py [--db PATH] clear
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+DEFAULT_DATABASE = Path(__file__).resolve().parents[1] / "Settings" / "translation_cache.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    transcript TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS translations_last_used ON translations(last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+@dataclass(frozen=True)
+class CachedTranslation:
+    result: str
+    transcript: str
+    age_seconds: float
+
+
+def cache_key(image_digests: Iterable[str], settings: Dict[str, object]) -> str:
+    """Combine image hashes and translation settings into one cache key."""
+    payload = json.dumps(
+        {"images": list(image_digests), "settings": settings},
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    def __init__(self, database: Path, max_entries: int = 2000, max_age_days: float = 30.0):
+        self.database = Path(database)
+        self.max_entries = max(1, int(max_entries))
+        self.max_age_seconds = max(0.0, float(max_age_days)) * 86400.0
+
+    def _connect(self) -> sqlite3.Connection:
+        self.database.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.database, timeout=10)
+        connection.execute("PRAGMA busy_timeout = 10000")
+        connection.executescript(SCHEMA)
+        return connection
+
+    @staticmethod
+    def _count(connection: sqlite3.Connection, name: str) -> None:
+        connection.execute(
+            "INSERT INTO counters(name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, key: str) -> Optional[CachedTranslation]:
+        """Return the stored translation for ``key`` and record a hit or miss."""
+        now = time.time()
+        with closing(self._connect()) as connection, connection:
+            row = connection.execute(
+                "SELECT result, transcript, created FROM translations WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is not None and self.max_age_seconds and now - row[2] > self.max_age_seconds:
+                connection.execute("DELETE FROM translations WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self._count(connection, "misses")
+                return None
+            connection.execute(
+                "UPDATE translations SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                (now, key),
+            )
+            self._count(connection, "hits")
+            return CachedTranslation(row[0], row[1], now - row[2])
+
+    def put(self, key: str, result: str, transcript: str = "") -> None:
+        """Store a finished translation and evict old or surplus entries."""
+        now = time.time()
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO translations(key, result, transcript, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, result, transcript, now, now),
+            )
+            self._evict(connection, now)
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        if self.max_age_seconds:
+            connection.execute(
+                "DELETE FROM translations WHERE created < ?",
+                (now - self.max_age_seconds,),
+            )
+        connection.execute(
+            "DELETE FROM translations WHERE key IN ("
+            "SELECT key FROM translations ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def stats(self) -> Dict[str, int]:
+        with closing(self._connect()) as connection:
+            entries, size = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(CAST(result AS BLOB)) "
+                "+ LENGTH(CAST(transcript AS BLOB))), 0) FROM translations"
+            ).fetchone()
+            counters = dict(connection.execute("SELECT name, value FROM counters"))
+        return {
+            "entries": int(entries),
+            "text_bytes": int(size),
+            "hits": int(counters.get("hits", 0)),
+            "misses": int(counters.get("misses", 0)),
+        }
+
+    def clear(self) -> None:
+        with closing(self._connect()) as connection, connection:
+            connection.execute("DELETE FROM translations")
+            connection.execute("DELETE FROM counters")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect the screenshot translation cache.")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DATABASE)
+    parser.add_argument("command", choices=("stats", "clear"))
+    args = parser.parse_args(argv)
+
+    cache = TranslationCache(args.db)
+    if args.command == "clear":
+        cache.clear()
+        print(f"Cleared {args.db}")
+        return 0
+    stats = cache.stats()
+    lookups = stats["hits"] + stats["misses"]
+    rate = 100.0 * stats["hits"] / lookups if lookups else 0.0
+    print(f"Database : {args.db}")
+    print(f"Entries  : {stats['entries']} ({stats['text_bytes']:,} bytes of text)")
+    print(f"Lookups  : {lookups} ({stats['hits']} hits, {stats['misses']} misses, {rate:.0f}% hit rate)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,7 @@ and speaker-name header normalization (kana→romaji fallback).
 
 Usage:
   python screenshot_translator.py <image1> [<image2> ...]
+  python screenshot_translator.py --serve      (persistent worker, see below)
 
 Environment:
   PROVIDER                (optional) "openai" (default) or "gemini"
@@ -29,20 +30,87 @@ Environment:
   POSTPROC_MODE           (optional) "tt" (default) | "translation" | "none"
   PROMPT_PROFILE          (optional) name of a prompt in Settings/prompts/<name>.txt
                            or prompts/<name>.txt (overridden by PROMPT_FILE/TEXT)
+
+  --- Persistent worker ---
+  JRPG_TRANSLATOR_WORKER  (optional) "1" hands each job to a warm background
+                           worker that keeps the SDK client, glossaries, and
+                           prompt loaded. The first request starts the worker
+                           and still translates in-process; ocr.txt/ocr.done
+                           are written exactly as before.
+  JRPG_TRANSLATOR_WORKER_IDLE_SECONDS
+                          (optional) worker exit after this idle time (default 600)
+
+  --- Screenshot upload ---
+  SHOT_IMAGE_MAX_EDGE, SHOT_IMAGE_GRAYSCALE, SHOT_IMAGE_CONTRAST,
+  SHOT_IMAGE_FORMAT, SHOT_IMAGE_QUALITY
+                          (optional) shrink/re-encode captures before upload;
+                           see image_prep.py. Off by default.
+
+  --- Translation cache ---
+  JRPG_TRANSLATION_CACHE  (optional) "1" answers a repeated screenshot from
+                           Settings/translation_cache.sqlite3 when the image
+                           bytes, provider, model, prompt, glossaries and
+                           post-processing settings all match; see result_cache.py
+  JRPG_TRANSLATION_CACHE_MAX_ENTRIES, JRPG_TRANSLATION_CACHE_MAX_DAYS
+                          (optional) eviction limits (default 2000 entries, 30 days)
+  SHOT_NEAR_DUPLICATE     (optional) "dhash" or "phash" reuses the previous
+                           translation when the cropped text box is perceptually
+                           the same, e.g. only a blinking arrow changed; without
+                           a crop only its transcript is reused; see image_hash.py
+  SHOT_NEAR_DUPLICATE_DISTANCE, SHOT_NEAR_DUPLICATE_CROP
+                          (optional) match threshold and text-box region
+
+  --- Glossary pre-filtering ---
+  SHOT_TWO_STAGE          (optional) "1" first asks for a transcript only, then
+                           sends just the glossary entries found in it, so a
+                           corrective retry is rarely needed
+  SHOT_TRANSCRIPT_MODEL   (optional) model for the transcript pass (default:
+                           the translation model)
+
+  --- Streaming ---
+  SHOT_STREAM             (optional) "1" streams the response and rewrites
+                           ocr.txt with the post-processed lines received so
+                           far; the final result replaces them as before
+  SHOT_STREAM_INTERVAL_MS (optional) minimum time between partial writes
+                           (default 150)
+
+  --- Hedged requests ---
+  SHOT_HEDGE              (optional) "1" sends a second request when the first
+                           has not answered after SHOT_HEDGE_DELAY_SECONDS
+                           ("auto" = p90 of recent requests); "race" sends both
+                           at once. The first valid answer wins.
+  SHOT_HEDGE_PROVIDER, SHOT_HEDGE_MODEL
+                          (optional) target of the second request; see
+                           provider_hedge.py
+
+  --- Explanation prefetch ---
+  EXPLAIN_PREFETCH        (optional) "1" queues a background explanation of
+                           each translated line so Explain answers from the
+                           explanation cache; see explain_prefetch.py
+
+  --- Diagnostics ---
+  JRPG_DEBUG              (optional) "1" appends to translator_log.txt
+  JRPG_PROFILE            (optional) "1" appends per-stage timings of every
+                           request to profile_log.jsonl; see stage_profile.py
 """
 
 # --- Imports must come before using os.environ ---
 import io
+import json
 import os
 import re
 import sys
 import base64
-import mimetypes
 import shutil
 import time
 import tempfile
+import threading
 import unicodedata
-from typing import List, Tuple
+from typing import Callable, List, Optional, Tuple
+
+# JRPG_PROFILE=1 times the stages from here on (see stage_profile.py).
+_MODULE_STARTED = time.perf_counter()
+_MODULE_STARTED_WALL = time.time()
 
 # --- .env bootstrap: prefer SETTINGS_DIR\.env, then Settings\.env, then root (BOM-safe) ---
 try:
@@ -76,6 +144,7 @@ try:
             load_dotenv(p, override=False, encoding="utf-8-sig")
 except Exception:
     pass
+_ENV_LOADED = time.perf_counter()
 
 
 def _get_key(*names, file_var=None):
@@ -106,16 +175,14 @@ OVERLAY_DIR = os.path.join(TEMP_DIR, "JRPG_Overlay")
 LAST_JP = os.path.join(OVERLAY_DIR, "last_jp.txt")
 LAST_SRC = os.path.join(OVERLAY_DIR, "last_src.txt")
 LAST_SRC_DIR = os.path.join(OVERLAY_DIR, "last_source_images")
+LAST_TRANSLATION = os.path.join(OVERLAY_DIR, "last_translation.json")
+RETRY_STATS = os.path.join(OVERLAY_DIR, "translation_retry_stats.json")
+HEDGE_STATS = os.path.join(OVERLAY_DIR, "translation_hedge_stats.json")
+PROFILE_LOG = os.path.join(OVERLAY_DIR, "profile_log.jsonl")
 OCR_TXT = os.path.join(OVERLAY_DIR, "ocr.txt")
 OCR_DONE = os.path.join(OVERLAY_DIR, "ocr.done")
 os.makedirs(OVERLAY_DIR, exist_ok=True)
 
-MODEL_TIMEOUT_SECONDS = max(
-    15.0,
-    min(180.0, float(os.environ.get("JRPG_MODEL_TIMEOUT_SECONDS", "75"))),
-)
-
-
 def atomic_write_text(path: str, text: str):
     """UTF-8 atomic write so AHK never reads partial content (tolerant of brief locks)."""
     tmp = path + ".tmp"
@@ -145,6 +212,25 @@ def signal_ocr_completion() -> None:
     atomic_write_text(OCR_DONE, request_completion_token())
 
 
+TRANSLATOR_LOG = os.path.join(OVERLAY_DIR, "translator_log.txt")
+
+
+def debug_log(line: str) -> None:
+    """Append a diagnostic line to translator_log.txt when JRPG_DEBUG=1."""
+    if os.environ.get("JRPG_DEBUG", "0").strip() != "1":
+        return
+    try:
+        if os.path.getsize(TRANSLATOR_LOG) > 2_000_000:
+            os.replace(TRANSLATOR_LOG, TRANSLATOR_LOG + ".1")
+    except OSError:
+        pass
+    try:
+        with open(TRANSLATOR_LOG, "a", encoding="utf-8", errors="ignore") as f:
+            f.write(time.strftime("%Y-%m-%d %H:%M:%S ") + line.rstrip("\r\n") + "\n")
+    except Exception:
+        pass
+
+
 def friendly_provider_error(provider_name: str, exc: Exception, action: str = "translation") -> str:
     """Return a concise overlay-safe explanation while retaining a useful error code."""
     detail = re.sub(r"\s+", " ", str(exc or "")).strip()
@@ -175,283 +261,311 @@ def friendly_provider_error(provider_name: str, exc: Exception, action: str = "t
     return f"{heading}\n\n{guidance}"
 
 
-# ---- Post-processing mode -----------------------------------------------------
-# "tt" (default): enforce Transcript/Translation and normalize headers
-# "translation": return only the Translation block (no headings)
-# "none": return raw model text (no headings, no normalization)
-POSTPROC_MODE = (
-    os.environ.get("POSTPROC_MODE")
-    or os.environ.get("SHOT_POSTPROC")
-    or "tt"
-).strip().lower()
-
 # ---- Console UTF-8 on Windows -------------------------------------------------
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
 sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8", errors="replace")
 
-# ---- Provider selection -------------------------------------------------------
-PROVIDER = os.environ.get("PROVIDER", "openai").strip().lower()
-
-# ---- OpenAI (optional) --------------------------------------------------------
+# ---- Common paths -------------------------------------------------------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)  # one level up from /scripts
+
+# The bundled portable Python isolates sys.path with a ._pth file. Add this
+# directory explicitly so sibling helper modules remain importable.
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+from glossary_engine import (
+    apply_glossary,
+    estimate_tokens,
+    jp_glossary_match_key,
+    load_glossary_cached,
+    select_glossary_for_transcript,
+)
+from image_hash import NearDuplicateOptions, hamming_distance, image_hash
+from image_prep import (
+    ImageBatch,
+    ImagePrepOptions,
+    PreparedImage,
+    prepare_image_cached,
+    read_image,
+)
+from local_worker import (
+    WorkerUnavailable,
+    env_enabled,
+    idle_seconds,
+    serve,
+    source_fingerprint,
+    spawn,
+    submit,
+)
+from provider_hedge import HedgeCancelled, HedgeOptions, HedgeStats, hedged_call
+from result_cache import TranslationCache, cache_key
+from stage_profile import StageProfile, profiling_enabled
+from stream_preview import StreamPreview
+
+PROFILE = StageProfile("screenshot", profiling_enabled(), _MODULE_STARTED, _MODULE_STARTED_WALL)
+PROFILE.add("dotenv", _ENV_LOADED - _MODULE_STARTED)
+PROFILE.add("imports", time.perf_counter() - _ENV_LOADED)
+
+
+def _find_settings_ini(base_dir: str):
+    env_settings_dir = os.environ.get("SETTINGS_DIR", "").strip()
+    cands = []
+    if env_settings_dir:
+        cands.extend([
+            os.path.join(env_settings_dir, "control.ini"),
+            os.path.join(env_settings_dir, "config.ini"),
+        ])
+    cands.extend([
+        os.path.join(base_dir, "Settings", "control.ini"),
+        os.path.join(os.path.dirname(base_dir), "Settings", "control.ini"),
+        os.path.join(base_dir, "Settings", "config.ini"),
+        os.path.join(os.path.dirname(base_dir), "Settings", "config.ini"),
+    ])
+    for p in cands:
+        if os.path.isfile(p):
+            return p
+    return None
+
+
+def _read_profiles_from_ini(_path: str, enabled_default: bool):
+    import configparser
+
+    encs = ["utf-8", "utf-8-sig", "utf-16", "utf-16-le", "utf-16-be", "cp1252", "cp932"]
+    for enc in encs:
+        try:
+            cfg = configparser.ConfigParser()
+            with open(_path, "r", encoding=enc) as fh:
+                cfg.read_file(fh)
+            jp = (cfg.get("cfg", "jp2enGlossaryProfile", fallback="default").strip() or "default")
+            en = (cfg.get("cfg", "en2enGlossaryProfile", fallback="default").strip() or "default")
+            enabled = cfg.getboolean(
+                "cfg", "useTerminologyOverrides", fallback=True
+            )
+            return jp, en, enabled
+        except Exception:
+            continue
+    return "default", "default", enabled_default
+
+
+def refresh_runtime_settings() -> None:
+    """Resolve every per-request setting from the current environment.
+
+    A one-shot process calls this once at import. A persistent worker calls it
+    again for every job because the control panel exports fresh values before
+    each translation.
+    """
+    global MODEL_TIMEOUT_SECONDS, POSTPROC_MODE, PROVIDER, IMAGE_PREP, TRANSLATION_CACHE
+    global NEAR_DUPLICATE, TWO_STAGE, STREAM, STREAM_INTERVAL_SECONDS, HEDGE
+    global JP2EN_GLOSSARY_PATH, EN2EN_GLOSSARY_PATH, USE_TERMINOLOGY_OVERRIDES
+
+    MODEL_TIMEOUT_SECONDS = max(
+        15.0,
+        min(180.0, float(os.environ.get("JRPG_MODEL_TIMEOUT_SECONDS", "75"))),
+    )
+
+    # ---- Post-processing mode -------------------------------------------------
+    # "tt" (default): enforce Transcript/Translation and normalize headers
+    # "translation": return only the Translation block (no headings)
+    # "none": return raw model text (no headings, no normalization)
+    POSTPROC_MODE = (
+        os.environ.get("POSTPROC_MODE")
+        or os.environ.get("SHOT_POSTPROC")
+        or "tt"
+    ).strip().lower()
+
+    # ---- Provider selection ---------------------------------------------------
+    PROVIDER = os.environ.get("PROVIDER", "openai").strip().lower()
+
+    # ---- Screenshot pre-processing (SHOT_IMAGE_*, see image_prep.py) -----------
+    IMAGE_PREP = ImagePrepOptions.from_env()
+
+    # ---- Translation result cache (JRPG_TRANSLATION_CACHE*, see result_cache.py)
+    TRANSLATION_CACHE = None
+    if os.environ.get("JRPG_TRANSLATION_CACHE", "0").strip().lower() in {"1", "true", "yes", "on"}:
+        try:
+            cache_path = os.environ.get("JRPG_TRANSLATION_CACHE_PATH", "").strip() or os.path.join(
+                os.environ.get("SETTINGS_DIR", "").strip() or os.path.join(PROJECT_ROOT, "Settings"),
+                "translation_cache.sqlite3",
+            )
+            TRANSLATION_CACHE = TranslationCache(
+                cache_path,
+                max_entries=int(float(os.environ.get("JRPG_TRANSLATION_CACHE_MAX_ENTRIES", "") or 2000)),
+                max_age_days=float(os.environ.get("JRPG_TRANSLATION_CACHE_MAX_DAYS", "") or 30),
+            )
+        except Exception as exc:
+            print(f"(Cache) disabled: {exc}", file=sys.stderr)
+
+    # ---- Near-duplicate screenshots (SHOT_NEAR_DUPLICATE*, see image_hash.py) --
+    NEAR_DUPLICATE = NearDuplicateOptions.from_env()
+
+    # ---- Transcript pass before translating (SHOT_TWO_STAGE) -----------------
+    TWO_STAGE = os.environ.get("SHOT_TWO_STAGE", "0").strip().lower() in {"1", "true", "yes", "on"}
+
+    # ---- Partial output while the response streams (SHOT_STREAM) --------------
+    STREAM = os.environ.get("SHOT_STREAM", "0").strip().lower() in {"1", "true", "yes", "on"}
+    try:
+        STREAM_INTERVAL_SECONDS = max(
+            0.05, float(os.environ.get("SHOT_STREAM_INTERVAL_MS", "") or 150) / 1000.0
+        )
+    except ValueError:
+        STREAM_INTERVAL_SECONDS = 0.15
+
+    # ---- Hedged provider requests (SHOT_HEDGE*, see provider_hedge.py) --------
+    HEDGE = HedgeOptions.from_env()
+
+    # 1) If env vars are set, they win. If not, leave as None for profile resolution.
+    JP2EN_GLOSSARY_PATH = (os.environ.get("JP2EN_GLOSSARY_PATH", "").strip() or None)
+    EN2EN_GLOSSARY_PATH = (os.environ.get("EN2EN_GLOSSARY_PATH", "").strip() or None)
+    USE_TERMINOLOGY_OVERRIDES = (
+        os.environ.get("USE_TERMINOLOGY_OVERRIDES", "1").strip().lower()
+        not in {"0", "false", "no", "off"}
+    )
+
+    # 2) Always refresh the enable/disable policy from the Control Panel INI.
+    #    Glossary paths may be exported by an already-running overlay, but its
+    #    inherited environment cannot reflect a toggle changed after it launched.
+    try:
+        cfg_path = _find_settings_ini(SCRIPT_DIR)
+        prof_jp = prof_en = "default"
+
+        if cfg_path:
+            prof_jp, prof_en, USE_TERMINOLOGY_OVERRIDES = _read_profiles_from_ini(
+                cfg_path, USE_TERMINOLOGY_OVERRIDES
+            )
+
+        if JP2EN_GLOSSARY_PATH is None or EN2EN_GLOSSARY_PATH is None:
+            # Prefer Control Panel's exported SETTINGS_DIR if present; otherwise fall back
+            env_settings_dir = (os.environ.get("SETTINGS_DIR", "").strip() or None)
+            if env_settings_dir:
+                settings_dir = env_settings_dir
+            else:
+                settings_dir = os.path.dirname(cfg_path) if cfg_path else os.path.join(PROJECT_ROOT, "Settings")
+
+            gloss_base = os.path.join(settings_dir, "glossaries")
+
+            cand_jp = os.path.join(gloss_base, prof_jp, "jp2en.txt")
+            cand_en = os.path.join(gloss_base, prof_en, "en2en.txt")
+
+            if JP2EN_GLOSSARY_PATH is None:
+                JP2EN_GLOSSARY_PATH = cand_jp
+            if EN2EN_GLOSSARY_PATH is None:
+                EN2EN_GLOSSARY_PATH = cand_en
+    except Exception:
+        # Never break translation if INI/path handling fails
+        pass
+
+
+with PROFILE.span("settings"):
+    refresh_runtime_settings()
+
+
+# ---- Provider clients (created on demand, reused by a persistent worker) -----
+class ProviderSetupError(RuntimeError):
+    """The selected provider cannot be used; carries overlay and console text."""
+
+    def __init__(self, overlay_text: str, console_text: str):
+        super().__init__(console_text)
+        self.overlay_text = overlay_text
+        self.console_text = console_text
+
+
 _openai_client = None
-if PROVIDER == "openai":
+_gemini_client = None
+_provider_client_keys = {}
+
+
+def ensure_provider_client(provider: str = "") -> None:
+    """Create an SDK client, reusing a warm one when settings match.
+
+    ``provider`` defaults to PROVIDER; a hedged request may need the other one.
+    """
+    global _openai_client, _gemini_client
+
+    provider = provider or PROVIDER
+    if provider == "gemini":
+        try:
+            from google import genai
+            from google.genai import types
+        except Exception as e:
+            raise ProviderSetupError(
+                friendly_provider_error("Gemini", e),
+                "Missing google-genai package. Install with: python -m pip install -U google-genai\n"
+                f"Import error: {e}",
+            )
+
+        GEMINI_API_KEY = _get_key(
+            "GEMINI_API_KEY", "GOOGLE_API_KEY", "GEMINI_LOCAL_KEY", "GOOGLE_LOCAL_KEY",
+            file_var="GEMINI_API_KEY_FILE",
+        )
+        if not GEMINI_API_KEY:
+            raise ProviderSetupError(
+                "Gemini API key missing.\n\n"
+                "Add it in the API Keys tab, or set GEMINI_API_KEY (or "
+                "GOOGLE_API_KEY) in Windows Environment Variables and restart "
+                "JRPG Translator.",
+                "Missing GEMINI_API_KEY/GOOGLE_API_KEY (or *_LOCAL / _FILE).",
+            )
+
+        client_key = ("gemini", GEMINI_API_KEY, MODEL_TIMEOUT_SECONDS)
+        if _gemini_client is not None and _provider_client_keys.get("gemini") == client_key:
+            return
+        try:
+            _gemini_client = genai.Client(
+                api_key=GEMINI_API_KEY,
+                http_options=types.HttpOptions(timeout=int(MODEL_TIMEOUT_SECONDS * 1000)),
+            )
+        except TypeError:
+            # Compatibility fallback for an older google-genai package. The AHK
+            # process watchdog still enforces the overall request deadline.
+            _gemini_client = genai.Client(api_key=GEMINI_API_KEY)
+        _provider_client_keys["gemini"] = client_key
+        return
+
     try:
         from openai import OpenAI
     except Exception as e:
-        atomic_write_text(OCR_TXT, friendly_provider_error("OpenAI", e))
-        signal_ocr_completion()
-        print(f"OpenAI import failed: {e}", file=sys.stderr)
-        sys.exit(1)
+        raise ProviderSetupError(
+            friendly_provider_error("OpenAI", e),
+            f"OpenAI import failed: {e}",
+        )
 
     OPENAI_API_KEY = _get_key(
         "OPENAI_API_KEY", "OPENAI_LOCAL_KEY", "OPENAI_API_KEY_LOCAL", "OPENAI_KEY",
         file_var="OPENAI_API_KEY_FILE",
     )
     if not OPENAI_API_KEY:
-        atomic_write_text(
-            OCR_TXT,
+        raise ProviderSetupError(
             "OpenAI API key missing.\n\n"
             "Add it in the API Keys tab, or set OPENAI_API_KEY in Windows "
             "Environment Variables and restart JRPG Translator.",
+            "Missing OPENAI_API_KEY (or *_LOCAL / _FILE).",
         )
-        signal_ocr_completion()
-        print("Missing OPENAI_API_KEY (or *_LOCAL / _FILE).", file=sys.stderr)
-        sys.exit(1)
 
-    MODEL_NAME = os.environ.get("MODEL_NAME", "gpt-4o")
+    client_key = ("openai", OPENAI_API_KEY, MODEL_TIMEOUT_SECONDS)
+    if _openai_client is not None and _provider_client_keys.get("openai") == client_key:
+        return
     _openai_client = OpenAI(
         api_key=OPENAI_API_KEY,
         timeout=MODEL_TIMEOUT_SECONDS,
         max_retries=2,
     )
-
-# ---- Gemini (optional) --------------------------------------------------------
-_gemini_client = None
-if PROVIDER == "gemini":
-    try:
-        from google import genai
-        from google.genai import types
-    except Exception as e:
-        atomic_write_text(OCR_TXT, friendly_provider_error("Gemini", e))
-        signal_ocr_completion()
-        print("Missing google-genai package. Install with: python -m pip install -U google-genai", file=sys.stderr)
-        print(f"Import error: {e}", file=sys.stderr)
-        sys.exit(1)
-
-    GEMINI_API_KEY = _get_key(
-        "GEMINI_API_KEY", "GOOGLE_API_KEY", "GEMINI_LOCAL_KEY", "GOOGLE_LOCAL_KEY",
-        file_var="GEMINI_API_KEY_FILE",
-    )
-    if not GEMINI_API_KEY:
-        atomic_write_text(
-            OCR_TXT,
-            "Gemini API key missing.\n\n"
-            "Add it in the API Keys tab, or set GEMINI_API_KEY (or "
-            "GOOGLE_API_KEY) in Windows Environment Variables and restart "
-            "JRPG Translator.",
-        )
-        signal_ocr_completion()
-        print("Missing GEMINI_API_KEY/GOOGLE_API_KEY (or *_LOCAL / _FILE).", file=sys.stderr)
-        sys.exit(1)
-
-    GEMINI_MODEL_NAME = os.environ.get("GEMINI_MODEL_NAME", "gemini-2.5-flash").strip()
-    try:
-        _gemini_client = genai.Client(
-            api_key=GEMINI_API_KEY,
-            http_options=types.HttpOptions(timeout=int(MODEL_TIMEOUT_SECONDS * 1000)),
-        )
-    except TypeError:
-        # Compatibility fallback for an older google-genai package. The AHK
-        # process watchdog still enforces the overall request deadline.
-        _gemini_client = genai.Client(api_key=GEMINI_API_KEY)
-
-# ---- Common paths -------------------------------------------------------------
-SCRIPT_DIR = os.path.dirname(__file__)
-PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)  # one level up from /scripts
-
-# 1) If env vars are set, they win. If not, leave as None for profile resolution.
-JP2EN_GLOSSARY_PATH = (os.environ.get("JP2EN_GLOSSARY_PATH", "").strip() or None)
-EN2EN_GLOSSARY_PATH = (os.environ.get("EN2EN_GLOSSARY_PATH", "").strip() or None)
-USE_TERMINOLOGY_OVERRIDES = (
-    os.environ.get("USE_TERMINOLOGY_OVERRIDES", "1").strip().lower()
-    not in {"0", "false", "no", "off"}
-)
-
-# 2) Always refresh the enable/disable policy from the Control Panel INI.
-#    Glossary paths may be exported by an already-running overlay, but its
-#    inherited environment cannot reflect a toggle changed after it launched.
-try:
-    import configparser
-
-    def _find_settings_ini(base_dir: str):
-        env_settings_dir = os.environ.get("SETTINGS_DIR", "").strip()
-        cands = []
-        if env_settings_dir:
-            cands.extend([
-                os.path.join(env_settings_dir, "control.ini"),
-                os.path.join(env_settings_dir, "config.ini"),
-            ])
-        cands.extend([
-            os.path.join(base_dir, "Settings", "control.ini"),
-            os.path.join(os.path.dirname(base_dir), "Settings", "control.ini"),
-            os.path.join(base_dir, "Settings", "config.ini"),
-            os.path.join(os.path.dirname(base_dir), "Settings", "config.ini"),
-        ])
-        for p in cands:
-            if os.path.isfile(p):
-                return p
-        return None
-
-    cfg_path = _find_settings_ini(SCRIPT_DIR)
-    prof_jp = prof_en = "default"
-
-    def _read_profiles_from_ini(_path: str):
-        encs = ["utf-8", "utf-8-sig", "utf-16", "utf-16-le", "utf-16-be", "cp1252", "cp932"]
-        for enc in encs:
-            try:
-                cfg = configparser.ConfigParser()
-                with open(_path, "r", encoding=enc) as fh:
-                    cfg.read_file(fh)
-                jp = (cfg.get("cfg", "jp2enGlossaryProfile", fallback="default").strip() or "default")
-                en = (cfg.get("cfg", "en2enGlossaryProfile", fallback="default").strip() or "default")
-                enabled = cfg.getboolean(
-                    "cfg", "useTerminologyOverrides", fallback=True
-                )
-                return jp, en, enabled
-            except Exception:
-                continue
-        return "default", "default", USE_TERMINOLOGY_OVERRIDES
-
-    if cfg_path:
-        prof_jp, prof_en, USE_TERMINOLOGY_OVERRIDES = _read_profiles_from_ini(cfg_path)
-
-    if JP2EN_GLOSSARY_PATH is None or EN2EN_GLOSSARY_PATH is None:
-        # Prefer Control Panel's exported SETTINGS_DIR if present; otherwise fall back
-        env_settings_dir = (os.environ.get("SETTINGS_DIR", "").strip() or None)
-        if env_settings_dir:
-            settings_dir = env_settings_dir
-        else:
-            settings_dir = os.path.dirname(cfg_path) if cfg_path else os.path.join(PROJECT_ROOT, "Settings")
-
-        gloss_base = os.path.join(settings_dir, "glossaries")
-
-        cand_jp = os.path.join(gloss_base, prof_jp, "jp2en.txt")
-        cand_en = os.path.join(gloss_base, prof_en, "en2en.txt")
-
-        if JP2EN_GLOSSARY_PATH is None:
-            JP2EN_GLOSSARY_PATH = cand_jp
-        if EN2EN_GLOSSARY_PATH is None:
-            EN2EN_GLOSSARY_PATH = cand_en
-except Exception:
-    # Never break translation if INI/path handling fails
-    pass
+    _provider_client_keys["openai"] = client_key
 
 
 # ==============================================================================
 # Glossaries
 # ==============================================================================
 
-def load_glossary(path) -> List[Tuple[str, str]]:
-    """Load 'source -> target' pairs.
-       - Accept separators: '->', '→', tab, ':', '='
-       - Accept encodings: utf-8, utf-8-sig, utf-16, utf-16-le, utf-16-be, cp1252, cp932
-       - Ignore blanks and lines starting with '#'
-    """
-    entries: List[Tuple[str, str]] = []
-    if not path or not os.path.isfile(path):
-        return entries
-
-    encodings = ["utf-8", "utf-8-sig", "utf-16", "utf-16-le", "utf-16-be", "cp1252", "cp932"]
-    text = None
-    for enc in encodings:
-        try:
-            with open(path, "r", encoding=enc) as f:
-                text = f.read()
-            break
-        except Exception:
-            continue
-    if text is None:
-        return entries
-
-    seps = ["->", "→", "\t", ":", "="]
-    for raw in text.splitlines():
-        line = raw.replace("\ufeff", "").strip()
-        if not line or line.startswith("#"):
-            continue
-        src = dst = None
-        for sep in seps:
-            if sep in line:
-                s, d = line.split(sep, 1)
-                src, dst = s.strip(), d.strip()
-                break
-        if src and dst:
-            entries.append((src, dst))
-    return entries
-
-
-def _sentence_case(text: str) -> str:
-    lowered = text.lower()
-    for index, char in enumerate(lowered):
-        if char.isalpha():
-            return lowered[:index] + char.upper() + lowered[index + 1:]
-    return lowered
-
-
-def _adapt_glossary_case(src: str, dst: str, matched: str) -> str:
-    """Adapt a replacement's case unless the glossary source declares it canonical."""
-    source_first_letter = next((char for char in src if char.isalpha()), "")
-    if source_first_letter.isupper():
-        return dst
-
-    matched_letters = [char for char in matched if char.isalpha()]
-    if not matched_letters:
-        return dst
-    if all(char.isupper() for char in matched_letters):
-        return dst.upper()
-    if all(char.islower() for char in matched_letters):
-        return dst.lower()
-
-    if re.search(r"\s", src):
-        words = re.findall(r"[^\W\d_]+", matched, flags=re.UNICODE)
-        if words and all(word[0].isupper() and word[1:].islower() for word in words):
-            return dst.title()
-
-    if matched_letters[0].isupper() and all(
-        char.islower() for char in matched_letters[1:]
-    ):
-        return _sentence_case(dst)
-
-    return dst
-
-
 def apply_en_glossary(text: str, en2en: List[Tuple[str, str]]) -> str:
     """Apply case-insensitive EN→EN replacements.
 
     Capitalized glossary sources use the destination exactly as written. Lowercase
     sources adapt the destination to the matched lowercase, sentence-case,
     title-case, or uppercase text. Single-token plural/possessive suffixes are kept.
+    The compiled glossary is cached, so repeated calls scan the text once.
     """
-    out = text
-    for src, dst in en2en:
-        if re.search(r"\s", src):
-            pattern = re.compile(re.escape(src), flags=re.IGNORECASE)
-            out = pattern.sub(
-                lambda match: _adapt_glossary_case(src, dst, match.group(0)),
-                out,
-            )
-        else:
-            pattern = re.compile(
-                rf"\b(?P<core>{re.escape(src)})(?P<suf>s|'s|’s)?\b",
-                flags=re.IGNORECASE
-            )
-            out = pattern.sub(
-                lambda match: (
-                    _adapt_glossary_case(src, dst, match.group("core"))
-                    + (match.group("suf") or "")
-                ),
-                out,
-            )
-    return out
+    return apply_glossary(text, en2en)
 
 
 def _mark_guessed_pronouns(text: str) -> str:
@@ -646,7 +760,26 @@ Translation:
 <Fluent English translation of the Transcript block. If a speaker/tag line exists, output it on its own line inside corner brackets, e.g., 「Gus from Casta」. Apply the rule XのY → “Y from X”/“Y of X” only when it is a speaker identifier. Ignore everything outside the box. If no box text exists, output exactly: No Japanese text found.>
 """
 
+TRANSCRIPT_PROMPT = """Transcribe the Japanese text inside the dialogue, message, or menu box(es) of the screenshot(s). Return PLAIN TEXT ONLY: the Japanese text exactly as shown, with its line breaks and brackets. Do not translate, explain, or add headings. Ignore everything outside the box. If there is no Japanese text, return nothing.
+"""
+
 
+_PROMPT_FILE_CACHE = {}
+
+
+def _read_prompt_file(path: str) -> str:
+    """Read a UTF-8 prompt once per file version; a worker reuses it across jobs."""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    cached = _PROMPT_FILE_CACHE.get(key[0])
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with open(path, "r", encoding="utf-8") as fh:
+        text = fh.read()
+    _PROMPT_FILE_CACHE[key[0]] = (key, text)
+    return text
+
+
 def load_system_prompt() -> str:
     """
     Priority:
@@ -660,8 +793,7 @@ def load_system_prompt() -> str:
     if p:
         try:
             if os.path.isfile(p):
-                with open(p, "r", encoding="utf-8") as fh:
-                    return fh.read()
+                return _read_prompt_file(p)
         except Exception:
             pass
 
@@ -679,16 +811,14 @@ def load_system_prompt() -> str:
         ):
             try:
                 if os.path.isfile(candidate):
-                    with open(candidate, "r", encoding="utf-8") as fh:
-                        return fh.read()
+                    return _read_prompt_file(candidate)
             except Exception:
                 pass
 
     try_path = os.path.join(SCRIPT_DIR, "prompt.txt")
     try:
         if os.path.isfile(try_path):
-            with open(try_path, "r", encoding="utf-8") as fh:
-                return fh.read()
+            return _read_prompt_file(try_path)
     except Exception:
         pass
 
@@ -715,18 +845,46 @@ def build_jp2en_prompt(jp2en: List[Tuple[str, str]]) -> str:
     return "\n".join(lines)
 
 
+def upload_image(path: str) -> PreparedImage:
+    """Return the screenshot bytes to upload, pre-processed per SHOT_IMAGE_*."""
+    try:
+        return prepare_image_cached(path, IMAGE_PREP)
+    except Exception as exc:
+        # A capture Pillow cannot handle is still sent exactly as saved.
+        debug_log(f"image preparation failed for {path}: {exc}")
+        return prepare_image_cached(path, ImagePrepOptions())
+
+
+def report_image_preparation(paths: List[str]) -> None:
+    """Prepare a request's images once and report the upload size change."""
+    if not IMAGE_PREP.enabled:
+        return
+    before = after = 0
+    for p in paths:
+        if not os.path.isfile(p):
+            continue
+        prepared = upload_image(p)
+        before += prepared.original_bytes
+        after += len(prepared.data)
+    if before:
+        message = (
+            f"(Images) {before:,} -> {after:,} bytes per upload "
+            f"({100.0 * (before - after) / before:.0f}% smaller)"
+        )
+        print(message, file=sys.stderr)
+        debug_log(message)
+
+
 def file_to_data_url(path: str) -> str:
-    mime, _ = mimetypes.guess_type(path)
-    if not mime:
-        mime = "image/png"
-    with open(path, "rb") as f:
-        b64 = base64.b64encode(f.read()).decode("ascii")
-    return f"data:{mime};base64,{b64}"
+    prepared = upload_image(path)
+    b64 = base64.b64encode(prepared.data).decode("ascii")
+    return f"data:{prepared.mime};base64,{b64}"
 
 
-def make_messages_for_openai(image_paths: List[str], jp2en: List[Tuple[str, str]]) -> List[dict]:
+def make_messages_for_openai(image_paths: List[str], jp2en: List[Tuple[str, str]],
+                             system_prompt: str = "") -> List[dict]:
     glossary_block = build_jp2en_prompt(jp2en)
-    sys_prompt = load_system_prompt() + ("\n\n" + glossary_block if glossary_block else "")
+    sys_prompt = (system_prompt or load_system_prompt()) + ("\n\n" + glossary_block if glossary_block else "")
 
     content = []
     for p in image_paths:
@@ -757,11 +915,8 @@ def gemini_image_parts(paths: List[str]):
         abs_p = os.path.abspath(p)
         if not os.path.isfile(abs_p):
             continue
-        mime, _ = mimetypes.guess_type(abs_p)
-        if not mime:
-            mime = "image/png"
-        with open(abs_p, "rb") as f:
-            parts.append(types.Part.from_bytes(data=f.read(), mime_type=mime))
+        prepared = upload_image(abs_p)
+        parts.append(types.Part.from_bytes(data=prepared.data, mime_type=prepared.mime))
     return parts
 
 
@@ -776,19 +931,9 @@ CLOSE_CLASS = "[" + re.escape(CLOSE_BRACKETS) + "]"
 
 NAME_LINE_RE = re.compile(rf"^\s*{OPEN_CLASS}\s*(.+?)\s*{CLOSE_CLASS}\s*$")
 INLINE_HEADER_RE = re.compile(rf"^\s*{OPEN_CLASS}\s*(.+?)\s*{CLOSE_CLASS}\s*[:：]?\s*(.+)$")
-READING_ANNOTATION_RE = re.compile(r"(?<=[\u3400-\u9fff々〆ヶ])\([ぁ-ゖー]+\)")
 SPEAKER_HEADER_PUNCTUATION_RE = re.compile(r"[。.!！、,，；;：:…｡､]")
 
 
-def strip_generated_kanji_readings(text: str) -> str:
-    """Remove prompt-added readings such as 名前(なまえ) for exact source matching."""
-    return READING_ANNOTATION_RE.sub("", text or "")
-
-
-def jp_glossary_match_key(text: str) -> str:
-    return unicodedata.normalize("NFKC", strip_generated_kanji_readings(text)).strip()
-
-
 def target_glossary_match_key(text: str) -> str:
     return unicodedata.normalize("NFKC", text or "").strip().casefold()
 
@@ -840,13 +985,20 @@ def filter_jp2en_for_transcript(
     jp_block: str,
 ) -> List[Tuple[str, str]]:
     """Keep only entries whose exact Japanese source occurs in the transcript."""
-    transcript_key = jp_glossary_match_key(jp_block)
-    return [
-        (source, target)
-        for source, target in jp2en
-        if jp_glossary_match_key(source)
-        and jp_glossary_match_key(source) in transcript_key
-    ]
+    return select_glossary_for_transcript(jp2en, jp_block)
+
+
+def report_glossary_pruning(jp2en: List[Tuple[str, str]],
+                            sent_jp2en: List[Tuple[str, str]]) -> None:
+    """Report how much of the glossary prompt a transcript made unnecessary."""
+    full = estimate_tokens(build_jp2en_prompt(jp2en))
+    sent = estimate_tokens(build_jp2en_prompt(sent_jp2en))
+    message = (
+        f"(Glossary) {len(sent_jp2en)} of {len(jp2en)} entries sent, "
+        f"about {full - sent:,} of {full:,} glossary prompt tokens saved"
+    )
+    print(message, file=sys.stderr)
+    debug_log(message)
 
 
 def target_body_without_speaker_header(target_block: str) -> str:
@@ -993,20 +1145,31 @@ def extract_translation_output(s: str) -> str:
     return re.sub(r"(?i)^\s*Translation:\s*", "", text, count=1).strip()
 
 
-def cache_last_source_images(paths: List[str]) -> List[str]:
-    """Keep private source copies so Explain Last works without a visible transcript."""
+def stage_source_image(index: int, source_path: str) -> Tuple[str, str]:
+    """Copy one source image next to its final Explain Last name."""
+    os.makedirs(LAST_SRC_DIR, exist_ok=True)
+    extension = os.path.splitext(source_path)[1].lower() or ".png"
+    final_path = os.path.join(LAST_SRC_DIR, f"source_{index:02d}{extension}")
+    staged_path = final_path + ".tmp"
+    shutil.copy2(source_path, staged_path)
+    return staged_path, final_path
+
+
+def cache_last_source_images(paths: List[str], staged=None) -> List[str]:
+    """Keep private source copies so Explain Last works without a visible transcript.
+
+    ``staged`` holds copies already made by ``stage_source_image``.
+    """
     os.makedirs(LAST_SRC_DIR, exist_ok=True)
     cached_paths = []
-    staged = []
 
-    for index, source_path in enumerate(paths):
-        if not source_path or not os.path.isfile(source_path):
-            continue
-        extension = os.path.splitext(source_path)[1].lower() or ".png"
-        final_path = os.path.join(LAST_SRC_DIR, f"source_{index:02d}{extension}")
-        staged_path = final_path + ".tmp"
-        shutil.copy2(source_path, staged_path)
-        staged.append((staged_path, final_path))
+    if staged is None:
+        staged = [
+            stage_source_image(index, source_path)
+            if source_path and os.path.isfile(source_path) else None
+            for index, source_path in enumerate(paths)
+        ]
+    staged = [pair for pair in staged if pair]
 
     for name in os.listdir(LAST_SRC_DIR):
         if name.startswith("source_") and not name.endswith(".tmp"):
@@ -1127,15 +1290,24 @@ def openai_temperature_error(exc: Exception) -> bool:
     return "temperature" in msg and ("default" in msg or "unsupported" in msg or "not supported" in msg)
 
 
-def call_openai(image_paths: List[str], jp2en: List[Tuple[str, str]]) -> str:
-    messages = make_messages_for_openai(image_paths, jp2en)
-    model_name = os.environ.get("MODEL_NAME", "gpt-4o")
+def call_openai(image_paths: List[str], jp2en: List[Tuple[str, str]],
+                system_prompt: str = "", model_name: str = "",
+                on_text: Optional[Callable[[str], None]] = None) -> str:
+    """Return the completion text.
+
+    With ``on_text`` the response is streamed and ``on_text`` receives the
+    text accumulated so far after every chunk.
+    """
+    messages = make_messages_for_openai(image_paths, jp2en, system_prompt)
+    model_name = model_name or os.environ.get("MODEL_NAME", "gpt-4o")
     kwargs = {
         "model": model_name,
         "messages": messages,
     }
     if not openai_model_uses_default_temperature(model_name):
         kwargs["temperature"] = 0
+    if on_text is not None:
+        kwargs["stream"] = True
 
     try:
         resp = _openai_client.chat.completions.create(**kwargs)
@@ -1145,7 +1317,22 @@ def call_openai(image_paths: List[str], jp2en: List[Tuple[str, str]]) -> str:
             resp = _openai_client.chat.completions.create(**kwargs)
         else:
             raise
-    return resp.choices[0].message.content or ""
+    if on_text is None:
+        return resp.choices[0].message.content or ""
+
+    pieces = []
+    try:
+        for chunk in resp:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                pieces.append(delta)
+                on_text("".join(pieces))
+    finally:
+        # Drops the connection at once when on_text stops a cancelled request.
+        resp.close()
+    return "".join(pieces)
 
 
 def gemini_safety_settings(types):
@@ -1164,13 +1351,42 @@ def gemini_safety_settings(types):
     ]
 
 
-def call_gemini(image_paths: List[str], jp2en: List[Tuple[str, str]]) -> str:
+def gemini_response_text(resp) -> str:
+    """Return the text of a Gemini response or stream chunk, or ""."""
+    try:
+        text = getattr(resp, "text", None)
+        if text:
+            return text
+    except Exception:
+        pass
+
+    try:
+        candidates = getattr(resp, "candidates", None) or []
+        out_parts = []
+        for cand in candidates:
+            content = getattr(cand, "content", None)
+            if not content:
+                continue
+            parts = getattr(content, "parts", None) or []
+            for part in parts:
+                t = getattr(part, "text", None)
+                if t:
+                    out_parts.append(t)
+        return "".join(out_parts)
+    except Exception:
+        return ""
+
+
+def call_gemini(image_paths: List[str], jp2en: List[Tuple[str, str]],
+                system_prompt: str = "", model_name: str = "",
+                on_text: Optional[Callable[[str], None]] = None) -> str:
+    """Return the response text; ``on_text`` streams it as in call_openai."""
     from google.genai import types
 
     glossary_block = build_jp2en_prompt(jp2en)
-    sys_prompt = load_system_prompt() + ("\n\n" + glossary_block if glossary_block else "")
+    sys_prompt = (system_prompt or load_system_prompt()) + ("\n\n" + glossary_block if glossary_block else "")
 
-    model_name = (os.environ.get("GEMINI_MODEL_NAME", "gemini-2.5-flash") or "").strip()
+    model_name = (model_name or os.environ.get("GEMINI_MODEL_NAME", "gemini-2.5-flash") or "").strip()
     if model_name.startswith("models/"):
         model_name = model_name[len("models/"):]
 
@@ -1189,7 +1405,7 @@ def call_gemini(image_paths: List[str], jp2en: List[Tuple[str, str]]) -> str:
         )
     ]
 
-    resp = _gemini_client.models.generate_content(
+    request = dict(
         model=model_name,
         contents=contents,
         config=types.GenerateContentConfig(
@@ -1199,29 +1415,25 @@ def call_gemini(image_paths: List[str], jp2en: List[Tuple[str, str]]) -> str:
         ),
     )
 
-    try:
-        text = getattr(resp, "text", None)
-        if text:
-            return text
-    except Exception:
-        pass
-
-    try:
-        candidates = getattr(resp, "candidates", None) or []
-        out_parts = []
-        for cand in candidates:
-            content = getattr(cand, "content", None)
-            if not content:
-                continue
-            parts = getattr(content, "parts", None) or []
-            for part in parts:
-                t = getattr(part, "text", None)
-                if t:
-                    out_parts.append(t)
-        if out_parts:
-            return "".join(out_parts)
-    except Exception:
-        pass
+    if on_text is None:
+        resp = _gemini_client.models.generate_content(**request)
+        text = gemini_response_text(resp)
+    else:
+        resp, pieces = None, []
+        stream = _gemini_client.models.generate_content_stream(**request)
+        try:
+            for resp in stream:
+                piece = gemini_response_text(resp)
+                if piece:
+                    pieces.append(piece)
+                    on_text("".join(pieces))
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+        text = "".join(pieces)
+    if text:
+        return text
 
     try:
         prompt_feedback = getattr(resp, "prompt_feedback", None)
@@ -1236,30 +1448,322 @@ def call_gemini(image_paths: List[str], jp2en: List[Tuple[str, str]]) -> str:
 def call_translation_provider(
     image_paths: List[str],
     jp2en: List[Tuple[str, str]],
+    on_text: Optional[Callable[[str], None]] = None,
 ) -> str:
+    if HEDGE.enabled:
+        return call_hedged_translation(image_paths, jp2en, on_text)
     if PROVIDER == "gemini":
-        return call_gemini(image_paths, jp2en)
-    return call_openai(image_paths, jp2en)
+        return call_gemini(image_paths, jp2en, on_text=on_text)
+    return call_openai(image_paths, jp2en, on_text=on_text)
+
+
+def hedge_answer_is_valid(text: str) -> bool:
+    text = strip_code_fences(text or "")
+    if POSTPROC_MODE in ("none", "translation", "en-only", "en"):
+        return bool(text.strip())
+    return has_transcript_translation_sections(text)
+
+
+def call_hedged_translation(
+    image_paths: List[str],
+    jp2en: List[Tuple[str, str]],
+    on_text: Optional[Callable[[str], None]] = None,
+) -> str:
+    """Race the translation request against a delayed second request.
+
+    Both attempts stream, so the loser stops at its next chunk. With
+    SHOT_STREAM, whichever attempt produces text first feeds the overlay.
+    """
+    stats = HedgeStats(HEDGE_STATS)
+    delay = stats.delay(HEDGE)
+    hedge_provider = HEDGE.provider if HEDGE.provider in ("openai", "gemini") else PROVIDER
+    preview_lock = threading.Lock()
+    preview_owner = []
+
+    def attempt(provider: str, model_name: str):
+        def run(cancelled: threading.Event) -> str:
+            def forward(text: str) -> None:
+                if cancelled.is_set():
+                    raise HedgeCancelled()
+                if on_text is None:
+                    return
+                with preview_lock:
+                    if not preview_owner:
+                        preview_owner.append(run)
+                    owner = preview_owner[0] is run
+                if owner:
+                    on_text(text)
+
+            if provider != PROVIDER:
+                ensure_provider_client(provider)
+            call = call_gemini if provider == "gemini" else call_openai
+            return call(image_paths, jp2en, model_name=model_name, on_text=forward)
+        return run
+
+    outcome = hedged_call(
+        attempt(PROVIDER, ""),
+        attempt(hedge_provider, HEDGE.model),
+        delay,
+        hedge_answer_is_valid,
+    )
+    saved = stats.record(outcome)
+    if outcome.hedge_started is None:
+        detail = f"answered within the {delay:.1f} s hedge delay"
+    else:
+        detail = (
+            f"{hedge_provider} {HEDGE.model or '(default model)'} started after "
+            f"{outcome.hedge_started:.1f} s"
+        )
+    debug_log(
+        f"(Hedge) {outcome.winner or 'no valid answer'} after {outcome.seconds:.1f} s, "
+        f"{detail}" + (f", ~{saved:.1f} s saved" if saved else "") + f"; {stats.summary()}"
+    )
+    return outcome.text
+
+
+def call_transcript_provider(image_paths: List[str]) -> str:
+    """Ask only for the Japanese text, without glossary or translation."""
+    model_name = os.environ.get("SHOT_TRANSCRIPT_MODEL", "").strip()
+    if PROVIDER == "gemini":
+        return call_gemini(image_paths, [], TRANSCRIPT_PROMPT, model_name)
+    return call_openai(image_paths, [], TRANSCRIPT_PROMPT, model_name)
 
 
 # ==============================================================================
 # Main translation
 # ==============================================================================
 
+def translation_settings(jp2en: List[Tuple[str, str]],
+                         en2en: List[Tuple[str, str]]) -> dict:
+    """Everything besides the images that shapes a translation result."""
+    if PROVIDER == "gemini":
+        model_name = (os.environ.get("GEMINI_MODEL_NAME", "gemini-2.5-flash") or "").strip()
+    else:
+        model_name = os.environ.get("MODEL_NAME", "gpt-4o")
+    return {
+        "provider": PROVIDER,
+        "model": model_name,
+        "prompt": load_system_prompt(),
+        "postproc": POSTPROC_MODE,
+        "jp2en": jp2en,
+        "en2en": en2en,
+        "image_prep": IMAGE_PREP,
+        "two_stage": [TWO_STAGE, os.environ.get("SHOT_TRANSCRIPT_MODEL", "").strip()],
+        "markup": [
+            os.getenv("SHOT_GUESS_DELIM", "`"),
+            os.getenv("SHOT_ITALICIZE_GUESSED", "1"),
+            os.getenv("SHOT_COLOR_SPEAKER", "1"),
+        ],
+    }
+
+
+def start_image_batch(paths: List[str]) -> ImageBatch:
+    """Start reading, hashing, staging and re-encoding all images at once."""
+    steps = [("read", lambda index, path: read_image(path))]
+    if NEAR_DUPLICATE.enabled:
+        steps.append((
+            "perceptual hash",
+            lambda index, path: image_hash(path, NEAR_DUPLICATE.method, NEAR_DUPLICATE.crop),
+        ))
+    steps.append(("stage", stage_source_image))
+    if IMAGE_PREP.enabled:
+        steps.append(("re-encode", lambda index, path: upload_image(path)))
+    return ImageBatch(paths, steps)
+
+
+def near_duplicate_of_previous(hashes: List[int]):
+    """Return the previous translation if these captures look the same.
+
+    The caller decides whether the stored result still fits the current
+    settings; its transcript is useful either way.
+    """
+    try:
+        with open(LAST_TRANSLATION, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        if previous.get("hash_options") != json.loads(json.dumps(
+            [NEAR_DUPLICATE.method, NEAR_DUPLICATE.crop]
+        )):
+            return None
+        previous_hashes = [int(h, 16) for h in previous.get("hashes", [])]
+    except Exception:
+        return None
+    if not hashes or len(previous_hashes) != len(hashes):
+        return None
+    distance = max(hamming_distance(a, b) for a, b in zip(previous_hashes, hashes))
+    debug_log(f"(Near duplicate) distance {distance} of {NEAR_DUPLICATE.max_distance} allowed")
+    if distance > NEAR_DUPLICATE.max_distance:
+        return None
+    return previous
+
+
+def remember_translation(hashes: List[int], settings_key: str,
+                         result: str, transcript: str) -> None:
+    try:
+        atomic_write_text(LAST_TRANSLATION, json.dumps({
+            "settings": settings_key,
+            "hash_options": [NEAR_DUPLICATE.method, NEAR_DUPLICATE.crop],
+            "hashes": [format(h, "x") for h in hashes],
+            "result": result,
+            "transcript": transcript,
+        }, ensure_ascii=False))
+    except Exception:
+        pass
+
+
+def record_retry_stats(mode: str, retried: bool, transcript_call: bool = False,
+                       full_glossary_fallback: bool = False) -> None:
+    """Count glossary requests and corrective retries per mode.
+
+    translation_retry_stats.json keeps "single" and "two_stage" totals side by
+    side so the retry rate of both modes can be compared. A two-stage request
+    whose transcript pass failed or came back empty still counts as
+    "two_stage"; "full_glossary_fallbacks" says how many sent the full glossary.
+    """
+    try:
+        with open(RETRY_STATS, "r", encoding="utf-8") as f:
+            stats = json.load(f)
+    except Exception:
+        stats = {}
+    entry = stats.setdefault(mode, {"requests": 0, "retries": 0, "transcript_calls": 0})
+    entry.setdefault("full_glossary_fallbacks", 0)
+    entry["requests"] += 1
+    entry["retries"] += int(retried)
+    entry["transcript_calls"] += int(transcript_call)
+    entry["full_glossary_fallbacks"] += int(full_glossary_fallback)
+    try:
+        atomic_write_text(RETRY_STATS, json.dumps(stats, indent=2))
+    except Exception:
+        pass
+    debug_log(
+        f"(Retry) {mode}: {entry['retries']}/{entry['requests']} glossary requests "
+        f"needed a corrective retry ({100.0 * entry['retries'] / entry['requests']:.1f}%)"
+    )
+
+
+def publish_last_source(paths: List[str], transcript: str,
+                        batch: Optional[ImageBatch] = None) -> None:
+    """Keep Explain Last pointed at this request's transcript and images."""
+    staged = None
+    if batch is not None:
+        try:
+            staged = batch.results("stage")
+        except Exception as exc:  # cancelled or failed: copy the files here instead
+            debug_log(f"staged source images unavailable: {exc!r}")
+    try:
+        cache_last_source_images(paths, staged)
+    except Exception as exc:
+        debug_log(f"could not keep the source images for Explain Last: {exc}")
+    # The transcript must not depend on the image copies above.
+    try:
+        atomic_write_text(LAST_JP, transcript)
+    except Exception:
+        pass
+
+
 def translate_images(paths: List[str],
                      jp2en: List[Tuple[str, str]],
-                     en2en: List[Tuple[str, str]]) -> str:
+                     en2en: List[Tuple[str, str]],
+                     batch: Optional[ImageBatch] = None,
+                     publish_partial: Optional[Callable[[str], None]] = None) -> str:
+    """Translate one screenshot batch and return the post-processed text.
+
+    With SHOT_STREAM=1, ``publish_partial`` receives post-processed partial
+    text while the first translation response streams in.
+    """
+    if batch is None:
+        batch = start_image_batch(paths)
+    key = near_key = ""
+    near_hashes: List[int] = []
+    if TRANSLATION_CACHE is not None or NEAR_DUPLICATE.enabled:
+        settings = translation_settings(jp2en, en2en)
+
+    if TRANSLATION_CACHE is not None:
+        try:
+            key = cache_key([image.sha256 for image in batch.results("read") if image], settings)
+            with PROFILE.span("cache lookup"):
+                cached = TRANSLATION_CACHE.get(key)
+        except Exception as exc:
+            debug_log(f"translation cache lookup failed: {exc}")
+            cached = None
+        PROFILE.set(cache="hit" if cached is not None else "miss")
+        if cached is not None:
+            debug_log(f"(Cache) hit, stored {cached.age_seconds / 60:.0f} min ago")
+            # Staging is still needed for Explain Last; hashing and uploads are not.
+            batch.cancel("perceptual hash", "re-encode")
+            publish_last_source(paths, cached.transcript, batch)
+            return cached.result
+
+    previous = None
+    if NEAR_DUPLICATE.enabled:
+        try:
+            near_key = cache_key([], settings)
+            near_hashes = [h for h in batch.results("perceptual hash") if h is not None]
+            previous = near_duplicate_of_previous(near_hashes)
+        except Exception as exc:
+            debug_log(f"near-duplicate check failed: {exc}")
+            near_hashes, previous = [], None
+        if (
+            previous is not None
+            and NEAR_DUPLICATE.reuses_translation
+            and previous.get("settings") == near_key
+        ):
+            PROFILE.set(cache="near duplicate")
+            batch.cancel("re-encode")
+            publish_last_source(paths, previous.get("transcript", ""), batch)
+            return previous.get("result", "")
+
+    report_image_preparation(paths)
+
+    # Two-stage mode sends only the entries whose source is in the transcript,
+    # so glossary contamination is prevented instead of repaired by a retry.
+    # A near-identical previous capture already provides that transcript.
+    sent_jp2en = jp2en
+    transcript_call = False
+    full_glossary_fallback = False
+    if TWO_STAGE and jp2en:
+        hint = previous.get("transcript", "") if previous is not None else ""
+        if not hint:
+            # Counted even when it fails: the request was made either way.
+            transcript_call = True
+            try:
+                with PROFILE.span("transcript call"):
+                    hint = strip_code_fences(call_transcript_provider(paths))
+            except Exception as exc:
+                debug_log(f"transcript pass failed, sending the full glossary: {exc}")
+        if hint:
+            sent_jp2en = filter_jp2en_for_transcript(jp2en, hint)
+            report_glossary_pruning(jp2en, sent_jp2en)
+        else:
+            full_glossary_fallback = True
+
+    preview = None
+    if STREAM and publish_partial is not None:
+        preview = StreamPreview(
+            lambda text: postprocess_partial(text, jp2en, en2en),
+            publish_partial,
+            STREAM_INTERVAL_SECONDS,
+        )
+    if PROFILE.enabled:
+        PROFILE.set(upload_bytes=sum(len(upload_image(p).data) for p in paths if os.path.isfile(p)))
     try:
-        raw = call_translation_provider(paths, jp2en)
+        with PROFILE.span("provider call"):
+            raw = call_translation_provider(paths, sent_jp2en, preview.feed if preview else None)
     except Exception as e:
         provider_name = "Gemini" if PROVIDER == "gemini" else "OpenAI"
+        PROFILE.set(error=type(e).__name__)
         return friendly_provider_error(provider_name, e)
+    PROFILE.set(response_chars=len(raw))
+    if preview is not None:
+        debug_log(f"(Stream) {preview.summary()}")
 
     out = strip_code_fences(raw)
     corrective_retry_used = False
-    jp_conflict_name, target_conflict_name = find_speaker_glossary_conflict(out, jp2en)
+    retried = False
+    # Validate against the entries actually sent, as the retries below do.
+    jp_conflict_name, target_conflict_name = find_speaker_glossary_conflict(out, sent_jp2en)
     if jp_conflict_name and target_conflict_name:
         corrective_retry_used = True
+        retried = True
         first_out = out
         first_jp_block, _first_target_block = split_tt(
             enforce_transcript_translation(first_out)
@@ -1267,7 +1771,8 @@ def translate_images(paths: List[str],
         filtered_jp2en = filter_jp2en_for_transcript(jp2en, first_jp_block)
 
         try:
-            retry_raw = call_translation_provider(paths, filtered_jp2en)
+            with PROFILE.span("retry call"):
+                retry_raw = call_translation_provider(paths, filtered_jp2en)
             retry_out = strip_code_fences(retry_raw)
             retry_jp_name, retry_target_name = speaker_names_from_output(retry_out)
             # Validate against the entries actually sent on the retry. If a removed
@@ -1300,9 +1805,10 @@ def translate_images(paths: List[str],
     # The speaker check above cannot detect inline corruption such as Dロス, nor
     # an unrelated glossary target inserted into dialogue. Retry these strong
     # signals once with only entries whose exact source appears in the transcript.
-    if jp2en and not corrective_retry_used:
-        first_suspicion = glossary_output_suspicion_score(out, jp2en)
+    if sent_jp2en and not corrective_retry_used:
+        first_suspicion = glossary_output_suspicion_score(out, sent_jp2en)
         if first_suspicion:
+            retried = True
             first_out = out
             first_jp_block, _first_target_block = split_tt(
                 enforce_transcript_translation(first_out)
@@ -1311,7 +1817,8 @@ def translate_images(paths: List[str],
                 jp2en, first_jp_block
             )
             try:
-                retry_raw = call_translation_provider(paths, filtered_jp2en)
+                with PROFILE.span("retry call"):
+                    retry_raw = call_translation_provider(paths, filtered_jp2en)
                 retry_out = strip_code_fences(retry_raw)
                 retry_suspicion = glossary_output_suspicion_score(
                     retry_out, filtered_jp2en
@@ -1325,18 +1832,43 @@ def translate_images(paths: List[str],
                 # Keep the usable first response if the optional correction fails.
                 pass
 
+    PROFILE.set(retried=retried, transcript_call=transcript_call)
+    if jp2en:
+        record_retry_stats(
+            "two_stage" if TWO_STAGE else "single",
+            retried,
+            transcript_call,
+            full_glossary_fallback,
+        )
+
+    transcript = ""
     try:
-        cache_last_source_images(paths)
         if has_transcript_translation_sections(out):
             enforced = enforce_transcript_translation(out)
             _jp_block, _en_block = split_tt(enforced)
             _jp_block_norm, _ = normalize_jp_speaker_line(_jp_block)
-            atomic_write_text(LAST_JP, _jp_block_norm.strip())
-        else:
-            atomic_write_text(LAST_JP, "")
+            transcript = _jp_block_norm.strip()
     except Exception:
         pass
+    publish_last_source(paths, transcript, batch)
 
+    with PROFILE.span("postprocess"):
+        result = postprocess_translation(out, jp2en, en2en)
+    # Only a well-formed answer is worth replaying for the same screenshot.
+    if key and transcript:
+        try:
+            TRANSLATION_CACHE.put(key, result, transcript)
+        except Exception as exc:
+            debug_log(f"translation cache store failed: {exc}")
+    if near_hashes and transcript:
+        remember_translation(near_hashes, near_key, result, transcript)
+    return result
+
+
+def postprocess_translation(out: str,
+                            jp2en: List[Tuple[str, str]],
+                            en2en: List[Tuple[str, str]]) -> str:
+    """Apply POSTPROC_MODE and the overlay markup to a provider response."""
     if POSTPROC_MODE == "none":
         return out.replace("\r\n", "\n").strip()
 
@@ -1365,11 +1897,199 @@ def translate_images(paths: List[str],
     return final.replace("\r\n", "\n").strip()
 
 
+def postprocess_partial(out: str,
+                        jp2en: List[Tuple[str, str]],
+                        en2en: List[Tuple[str, str]]) -> str:
+    """Post-process the complete lines of a response that is still streaming.
+
+    The unfinished last line is held back, so glossary replacements and the
+    guessed-pronoun markup never see half a word or half a delimiter pair.
+    """
+    text = out.replace("\r\n", "\n")
+    text = text[:text.rfind("\n") + 1]
+    text = re.sub(r"^\s*(?:```|''')[^\n]*\n", "", text)
+    if not text.strip():
+        return ""
+    translation_only = POSTPROC_MODE in ("translation", "en-only", "en")
+    has_translation = re.search(r"(?mi)^Translation:\s*", text)
+    if translation_only and not has_translation and re.search(r"(?mi)^Transcript:\s*", text):
+        # The transcript comes first; wait for the translation itself.
+        return ""
+    if POSTPROC_MODE == "none" or translation_only or has_translation:
+        return postprocess_translation(text, jp2en, en2en)
+    # Until the Translation heading arrives everything is transcript. A blank
+    # line between two text boxes must not be taken for the section break.
+    jp_block = re.sub(r"(?i)^\s*Transcript:\s*", "", text, count=1)
+    jp_block, _jp_name = normalize_jp_speaker_line(jp_block)
+    if not jp_block.strip():
+        return ""
+    jp_block = _mark_transcript_name_line(jp_block)
+    return f"Transcript:\n{jp_block.strip()}"
+
+
 # ==============================================================================
 # CLI
 # ==============================================================================
 
+WORKER_NAME = "screenshot_translator"
+
+
+def worker_fingerprint() -> str:
+    return source_fingerprint([
+        os.path.abspath(__file__),
+        os.path.join(SCRIPT_DIR, "explain_prefetch.py"),
+        os.path.join(SCRIPT_DIR, "glossary_engine.py"),
+        os.path.join(SCRIPT_DIR, "image_hash.py"),
+        os.path.join(SCRIPT_DIR, "image_prep.py"),
+        os.path.join(SCRIPT_DIR, "local_worker.py"),
+        os.path.join(SCRIPT_DIR, "provider_hedge.py"),
+        os.path.join(SCRIPT_DIR, "result_cache.py"),
+        os.path.join(SCRIPT_DIR, "stage_profile.py"),
+        os.path.join(SCRIPT_DIR, "stream_preview.py"),
+    ])
+
+
+def run_translation_job(images: List[str], should_publish=lambda: True) -> int:
+    """Translate one screenshot batch and publish it through ocr.txt/ocr.done.
+
+    ``should_publish`` lets a persistent worker drop a late result after the
+    AutoHotkey watchdog has already abandoned the request.
+    """
+    # Image work runs on the pool while the provider client is set up.
+    batch = start_image_batch(images)
+    PROFILE.set(provider=PROVIDER, images=len(images), stream=STREAM, hedge=HEDGE.mode)
+    client_started = time.perf_counter()
+    try:
+        ensure_provider_client()
+    except ProviderSetupError as exc:
+        batch.cancel()
+        atomic_write_text(OCR_TXT, exc.overlay_text)
+        signal_ocr_completion()
+        print(exc.console_text, file=sys.stderr)
+        PROFILE.set(error=type(exc).__name__)
+        PROFILE.record(PROFILE_LOG)
+        return 1
+    client_seconds = time.perf_counter() - client_started
+    PROFILE.add("provider client", client_seconds)
+
+    with PROFILE.span("glossary load"):
+        jp2en = load_glossary_cached(JP2EN_GLOSSARY_PATH) if USE_TERMINOLOGY_OVERRIDES else []
+        en2en = load_glossary_cached(EN2EN_GLOSSARY_PATH) if USE_TERMINOLOGY_OVERRIDES else []
+
+    def publish_partial(text: str) -> None:
+        if should_publish():
+            with PROFILE.span("partial write"):
+                atomic_write_text(OCR_TXT, text)
+
+    try:
+        result = translate_images(images, jp2en, en2en, batch, publish_partial)
+        if should_publish():
+            with PROFILE.span("write"):
+                atomic_write_text(OCR_TXT, result)
+    except Exception as exc:
+        provider_name = "Gemini" if PROVIDER == "gemini" else "OpenAI"
+        if should_publish():
+            atomic_write_text(OCR_TXT, friendly_provider_error(provider_name, exc))
+        print(f"Translation process failed: {exc}", file=sys.stderr)
+        PROFILE.set(error=type(exc).__name__)
+        raise
+    finally:
+        if should_publish():
+            signal_ocr_completion()
+        record_profile(batch)
+    debug_log(
+        f"(Images) {batch.summary()}; provider client setup took "
+        f"{client_seconds * 1000:.0f} ms alongside"
+    )
+    if env_enabled("EXPLAIN_PREFETCH") and should_publish():
+        schedule_explanation_prefetch()
+    return 0
+
+
+def schedule_explanation_prefetch() -> None:
+    """Queue an explanation of the line Explain would now use (EXPLAIN_PREFETCH=1)."""
+    try:
+        with open(LAST_JP, "r", encoding="utf-8") as f:
+            transcript = f.read()
+    except OSError:
+        return
+    from explain_prefetch import schedule
+
+    schedule(transcript)
+
+
+def record_profile(batch: ImageBatch) -> None:
+    """Add the image phases and append the request to profile_log.jsonl."""
+    if not PROFILE.enabled:
+        return
+    batch.summary()  # waits for the image steps still running
+    for name, seconds in batch.phase_seconds.items():
+        PROFILE.add(f"image {name}", seconds)
+    try:
+        PROFILE.set(image_bytes=sum(image.original_bytes for image in batch.results("read") if image))
+    except Exception:
+        pass
+    PROFILE.record(PROFILE_LOG)
+
+
+def handle_worker_job(job: dict, client_waiting) -> dict:
+    """Run one job submitted by a short-lived client inside the warm worker."""
+    # Adopt the client's environment wholesale: the control panel exports the
+    # provider, model, prompt, and request ID immediately before each launch.
+    os.environ.clear()
+    os.environ.update(job.get("env") or {})
+    try:
+        os.chdir(job.get("cwd") or SCRIPT_DIR)
+    except OSError:
+        pass
+    global PROFILE
+    PROFILE = StageProfile("screenshot", profiling_enabled())
+    with PROFILE.span("settings"):
+        refresh_runtime_settings()
+    PROFILE.set(worker=True)
+    try:
+        return {"status": "done", "exit_code": run_translation_job(job["images"], client_waiting)}
+    except Exception as exc:
+        return {"status": "done", "exit_code": 1, "error": str(exc)}
+
+
+def serve_worker() -> None:
+    serve(
+        WORKER_NAME,
+        handle_worker_job,
+        fingerprint=worker_fingerprint(),
+        idle_timeout=idle_seconds("JRPG_TRANSLATOR_WORKER_IDLE_SECONDS"),
+    )
+
+
+def submit_to_worker(images: List[str]) -> int:
+    """Hand the job to a warm worker, starting one for next time if needed."""
+    try:
+        reply = submit(
+            WORKER_NAME,
+            {
+                "images": [os.path.abspath(p) for p in images],
+                "env": dict(os.environ),
+                "cwd": os.getcwd(),
+            },
+            fingerprint=worker_fingerprint(),
+        )
+    except WorkerUnavailable as exc:
+        print(f"(Worker) {exc} Translating in this process.", file=sys.stderr)
+        spawn([os.path.abspath(__file__), "--serve"])
+        return -1
+    if not isinstance(reply, dict) or reply.get("status") != "done":
+        return -1
+    if reply.get("error"):
+        print(f"Translation process failed: {reply['error']}", file=sys.stderr)
+    return int(reply.get("exit_code", 0))
+
+
 def main() -> None:
+    if sys.argv[1:] == ["--serve"]:
+        serve_worker()
+        return
+
     if len(sys.argv) < 2:
         message = (
             "Translation could not start.\n\n"
@@ -1384,19 +2104,14 @@ def main() -> None:
         sys.exit(2)
 
     images = sys.argv[1:]
-    jp2en = load_glossary(JP2EN_GLOSSARY_PATH) if USE_TERMINOLOGY_OVERRIDES else []
-    en2en = load_glossary(EN2EN_GLOSSARY_PATH) if USE_TERMINOLOGY_OVERRIDES else []
-
-    try:
-        result = translate_images(images, jp2en, en2en)
-        atomic_write_text(OCR_TXT, result)
-    except Exception as exc:
-        provider_name = "Gemini" if PROVIDER == "gemini" else "OpenAI"
-        atomic_write_text(OCR_TXT, friendly_provider_error(provider_name, exc))
-        print(f"Translation process failed: {exc}", file=sys.stderr)
-        raise
-    finally:
-        signal_ocr_completion()
+    if env_enabled("JRPG_TRANSLATOR_WORKER"):
+        exit_code = submit_to_worker(images)
+        if exit_code >= 0:
+            sys.exit(exit_code)
+
+    exit_code = run_translation_job(images)
+    if exit_code:
+        sys.exit(exit_code)
 
 
 if __name__ == "__main__":
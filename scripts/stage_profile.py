@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Per-stage timing profile of one translation or explanation request.
+
+With JRPG_PROFILE=1, screenshot_translator.py and explainer.py time each
+stage of a request: interpreter start, imports, .env and INI resolution,
+glossary load, image work, provider calls, post-processing and file writes.
+At the end they append one JSON line to
+``%TEMP%\\JRPG_Overlay\\profile_log.jsonl``. The line holds the stage
+durations in milliseconds, how often each stage ran, and fields such as byte
+counts and retry flags. The log is rotated to ``profile_log.jsonl.1`` at 2 MB.
+
+Stages measured on worker threads (image steps) add up the time of every
+thread, so they can exceed the wall-clock total.
+
+Usage (summary of percentiles across a session):
+  python stage_profile.py [--log PATH] [--since MINUTES] [--kind screenshot|explain]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+DEFAULT_LOG = os.path.join(
+    os.environ.get("TEMP") or tempfile.gettempdir(), "JRPG_Overlay", "profile_log.jsonl"
+)
+MAX_LOG_BYTES = 2_000_000
+
+
+def profiling_enabled() -> bool:
+    return os.environ.get("JRPG_PROFILE", "0").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def process_start_time() -> Optional[float]:
+    """Return when this process was created (epoch seconds), if the OS says."""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            times = [wintypes.FILETIME() for _ in range(4)]
+            kernel32 = ctypes.windll.kernel32
+            if not kernel32.GetProcessTimes(
+                kernel32.GetCurrentProcess(), *(ctypes.byref(t) for t in times)
+            ):
+                return None
+            created = (times[0].dwHighDateTime << 32) | times[0].dwLowDateTime
+            return created / 10_000_000 - 11_644_473_600
+        with open("/proc/self/stat", "r") as f:
+            # The command name may contain spaces; fields resume after ")".
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat", "r") as f:
+            boot = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return boot + start_ticks / os.sysconf("SC_CLK_TCK")
+    except Exception:
+        return None
+
+
+class StageProfile:
+    """Collect stage durations for one request.
+
+    Collecting costs next to nothing, so it always happens; ``record`` only
+    writes when ``enabled``. A script that loads .env after creating its
+    profile can therefore still switch it on.
+    """
+
+    def __init__(self, kind: str, enabled: bool = True,
+                 started: Optional[float] = None, started_wall: Optional[float] = None):
+        self.kind = kind
+        self.enabled = enabled
+        self.started = started if started is not None else time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.fields: Dict[str, object] = {}
+        self.started_wall = started_wall
+        self._last_lap = self.started
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + max(0.0, seconds)
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def lap(self, name: str) -> None:
+        """Record the time since the previous lap (or the start) as ``name``."""
+        now = time.perf_counter()
+        self.add(name, now - self._last_lap)
+        self._last_lap = now
+
+    def set(self, **fields) -> None:
+        self.fields.update(fields)
+
+    def as_record(self) -> Dict[str, object]:
+        stages = dict(self.stages)
+        if self.started_wall is not None:
+            created = process_start_time()
+            if created is not None and 0 <= self.started_wall - created < 600:
+                stages = {"interpreter": self.started_wall - created, **stages}
+        total = time.perf_counter() - self.started + stages.get("interpreter", 0.0)
+        record: Dict[str, object] = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "kind": self.kind,
+            "total_ms": round(total * 1000, 1),
+            "stages_ms": {name: round(seconds * 1000, 1) for name, seconds in stages.items()},
+        }
+        repeated = {name: count for name, count in self.counts.items() if count > 1}
+        if repeated:
+            record["counts"] = repeated
+        record.update(self.fields)
+        return record
+
+    def record(self, path: str = DEFAULT_LOG) -> None:
+        """Append this request to the profile log; never raises."""
+        if not self.enabled:
+            return
+        try:
+            line = json.dumps(self.as_record(), ensure_ascii=False, default=str)
+            try:
+                if os.path.getsize(path) > MAX_LOG_BYTES:
+                    os.replace(path, path + ".1")
+            except OSError:
+                pass
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except Exception:
+            pass
+
+
+# ---- Session summary ---------------------------------------------------------
+
+def read_records(path: str) -> List[Dict[str, object]]:
+    records = []
+    for candidate in (path + ".1", path):
+        try:
+            with open(candidate, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            continue
+    return records
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(records: Iterable[Dict[str, object]]) -> List[str]:
+    records = list(records)
+    lines = []
+    for kind in sorted({str(record.get("kind", "")) for record in records}):
+        group = [record for record in records if record.get("kind") == kind]
+        stages: Dict[str, List[float]] = {"total": []}
+        for record in group:
+            stages["total"].append(float(record.get("total_ms", 0.0)))
+            for name, ms in (record.get("stages_ms") or {}).items():
+                stages.setdefault(name, []).append(float(ms))
+        lines.append(f"{kind}: {len(group)} request(s)")
+        lines.append(f"  {'stage':24s} {'n':>5s} {'p50':>8s} {'p90':>8s} {'p99':>8s} {'max':>8s}  ms")
+        ordered = sorted(
+            (name for name in stages if name != "total"),
+            key=lambda name: -sum(stages[name]),
+        )
+        for name in ordered + ["total"]:
+            values = stages[name]
+            lines.append(
+                f"  {name:24s} {len(values):5d} "
+                + " ".join(f"{percentile(values, q):8.0f}" for q in (0.5, 0.9, 0.99))
+                + f" {max(values):8.0f}"
+            )
+        for flag in ("retried", "cache", "hedge", "error"):
+            seen = [
+                record.get(flag) for record in group
+                if record.get(flag) not in (None, "", False, "off")
+            ]
+            if seen:
+                counts: Dict[str, int] = {}
+                for value in seen:
+                    counts[str(value)] = counts.get(str(value), 0) + 1
+                detail = ", ".join(f"{value} {count}" for value, count in sorted(counts.items()))
+                lines.append(f"  {flag}: {detail} of {len(group)}")
+        for field in ("image_bytes", "upload_bytes", "response_chars"):
+            values = [float(record[field]) for record in group if isinstance(record.get(field), (int, float))]
+            if values:
+                lines.append(f"  {field}: median {percentile(values, 0.5):,.0f}, max {max(values):,.0f}")
+        lines.append("")
+    return lines
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Summarize JRPG_PROFILE=1 stage timings.")
+    parser.add_argument("--log", default=DEFAULT_LOG)
+    parser.add_argument("--since", type=float, default=0.0,
+                        help="only requests from the last MINUTES (default: whole log)")
+    parser.add_argument("--kind", default="", help='"screenshot" or "explain"')
+    args = parser.parse_args(argv)
+
+    records = read_records(args.log)
+    if args.since > 0:
+        cutoff = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(time.time() - args.since * 60))
+        records = [record for record in records if str(record.get("time", "")) >= cutoff]
+    if args.kind:
+        records = [record for record in records if record.get("kind") == args.kind]
+    if not records:
+        print(f"No profiled requests in {args.log}. Set JRPG_PROFILE=1 and translate something.")
+        return 1
+    print("\n".join(summarize(records)).rstrip())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Throttled partial output while a provider response is still streaming.
+
+The overlay polls its text file about ten times a second, so rewriting the file
+for every token only costs disk writes and re-renders. A ``StreamPreview``
+receives the accumulated response after each chunk, renders it with the
+caller's post-processing, and publishes the result only when the rendered
+text changed and at least ``interval`` seconds passed since the last write.
+The first non-empty text is always published immediately.
+
+The final, fully post-processed result is written by the caller as before
+and replaces the last partial text.
+
+``CompletedLines`` is a render function for long responses: it post-processes
+each complete line once, as it arrives, instead of the whole response on
+every update.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Callable, List, Optional
+
+
+class StreamPreview:
+    def __init__(self, render: Callable[[str], str], publish: Callable[[str], None],
+                 interval: float = 0.15):
+        self.render = render
+        self.publish = publish
+        self.interval = max(0.0, float(interval))
+        self.started = time.perf_counter()
+        self.first_text_seconds: Optional[float] = None
+        self.updates = 0
+        self.chunks = 0
+        self._pending = ""
+        self._published = ""
+        self._last_publish = 0.0
+
+    def feed(self, text: str) -> None:
+        """Receive the response text accumulated so far."""
+        self.chunks += 1
+        self._pending = text
+        now = time.perf_counter()
+        if self.updates and now - self._last_publish < self.interval:
+            return
+        self._flush(now)
+
+    def flush(self) -> None:
+        """Publish any text held back by the throttle."""
+        self._flush(time.perf_counter())
+
+    def _flush(self, now: float) -> None:
+        try:
+            rendered = self.render(self._pending)
+        except Exception:
+            # Partial text may not parse yet; the next chunk will be tried again.
+            return
+        if not rendered.strip() or rendered == self._published:
+            return
+        try:
+            self.publish(rendered)
+        except Exception:
+            return
+        if self.first_text_seconds is None:
+            self.first_text_seconds = now - self.started
+        self._published = rendered
+        self._last_publish = now
+        self.updates += 1
+
+    def summary(self) -> str:
+        if self.first_text_seconds is None:
+            return f"no partial text in {self.chunks} chunk(s)"
+        return (
+            f"first text after {self.first_text_seconds * 1000:.0f} ms, "
+            f"{self.updates} update(s) from {self.chunks} chunk(s)"
+        )
+
+
+class CompletedLines:
+    """Render the complete lines of a growing response, each line only once.
+
+    ``render_block`` receives one or more new complete lines (with their line
+    breaks) and must not depend on the text around them. The unfinished last
+    line is held back.
+    """
+
+    def __init__(self, render_block: Callable[[str], str]):
+        self.render_block = render_block
+        self._consumed = 0
+        self._rendered: List[str] = []
+
+    def __call__(self, text: str) -> str:
+        if len(text) < self._consumed:
+            # Not a continuation of the text seen so far; start over.
+            self._consumed = 0
+            self._rendered = []
+        end = text.rfind("\n") + 1
+        if end > self._consumed:
+            self._rendered.append(self.render_block(text[self._consumed:end]))
+            self._consumed = end
+        return "".join(self._rendered)
@@ -11,11 +11,10 @@ import sys
 from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from openpyxl import Workbook
-from openpyxl.styles import Alignment, Font, PatternFill
-from openpyxl.utils import get_column_letter
+if TYPE_CHECKING:
+    from openpyxl import Workbook
 
 # The bundled embeddable Python uses an explicit ``._pth`` file, so it does
 # not automatically add a launched script's directory to ``sys.path``.
@@ -35,10 +34,12 @@ from anki_candidates import (
 )
 
 
-HEADER_FILL = PatternFill("solid", fgColor="1F4E78")
-HEADER_FONT = Font(color="FFFFFF", bold=True)
-ALT_FILL = PatternFill("solid", fgColor="EAF2F8")
-RECOMMENDED_FILL = PatternFill("solid", fgColor="E2F0D9")
+# openpyxl (with numpy behind it) takes a few hundred milliseconds to import,
+# so it is only loaded once the rows have been read and a workbook is built.
+HEADER_FILL_COLOR = "1F4E78"
+HEADER_FONT_COLOR = "FFFFFF"
+ALT_FILL_COLOR = "EAF2F8"
+RECOMMENDED_FILL_COLOR = "E2F0D9"
 MAX_COLUMN_WIDTH = 65
 ILLEGAL_XML_CHARACTERS = re.compile(
     "[\x00-\x08\x0B\x0C\x0E-\x1F]"
@@ -475,11 +476,18 @@ def add_sheet(
     rows: list[list[Any]],
     recommended_column: int | None = None,
 ) -> None:
+    from openpyxl.styles import Alignment, Font, PatternFill
+    from openpyxl.utils import get_column_letter
+
+    header_fill = PatternFill("solid", fgColor=HEADER_FILL_COLOR)
+    header_font = Font(color=HEADER_FONT_COLOR, bold=True)
+    alt_fill = PatternFill("solid", fgColor=ALT_FILL_COLOR)
+    recommended_fill = PatternFill("solid", fgColor=RECOMMENDED_FILL_COLOR)
     sheet = workbook.create_sheet(title)
     sheet.append(headers)
     for cell in sheet[1]:
-        cell.fill = HEADER_FILL
-        cell.font = HEADER_FONT
+        cell.fill = header_fill
+        cell.font = header_font
         cell.alignment = Alignment(horizontal="center", vertical="center")
     sheet.row_dimensions[1].height = 24
 
@@ -488,9 +496,9 @@ def add_sheet(
             spreadsheet_value(headers[column_index], value)
             for column_index, value in enumerate(values)
         ])
-        fill = ALT_FILL if row_index % 2 == 0 else None
+        fill = alt_fill if row_index % 2 == 0 else None
         if recommended_column is not None and values[recommended_column - 1] == "Recommended":
-            fill = RECOMMENDED_FILL
+            fill = recommended_fill
         for column_index, cell in enumerate(sheet[row_index]):
             cell.alignment = Alignment(vertical="top", wrap_text=True)
             if (
@@ -537,6 +545,8 @@ def export_workbook(arguments: argparse.Namespace) -> tuple[int, int, int]:
     finally:
         connection.close()
 
+    from openpyxl import Workbook
+
     workbook = Workbook()
     workbook.remove(workbook.active)
     workbook.properties.title = "JRPG Translator Study Library export"
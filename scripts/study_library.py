@@ -6,12 +6,11 @@ from __future__ import annotations
 
 import argparse
 import os
-import shutil
 import sqlite3
 import sys
 from datetime import datetime, timedelta
+from collections.abc import Iterable
 from pathlib import Path
-from typing import Iterable
 
 # The bundled portable Python uses python312._pth isolation, which deliberately
 # omits the launched script's directory from sys.path. Add this trusted local
@@ -28,6 +27,28 @@ from study_library_sections import (
     replace_group_tags,
 )
 
+COMMANDS = (
+    "ensure", "snapshot", "detail", "set-metadata", "bulk-metadata",
+    "set-anki", "save-edit", "revert-edit", "remove-version", "storage",
+)
+# Per-command inputs the UI passes through the environment. The bridge server
+# receives them with each request instead.
+BRIDGE_ENVIRONMENT = (
+    "STUDY_LIBRARY_QUERY",
+    "STUDY_LIBRARY_PROFILE_MODE", "STUDY_LIBRARY_PROFILE_FILTER",
+    "STUDY_LIBRARY_CHAPTER_MODE", "STUDY_LIBRARY_CHAPTER_FILTER",
+    "STUDY_LIBRARY_SPEAKER_MODE", "STUDY_LIBRARY_SPEAKER_FILTER",
+    "STUDY_LIBRARY_TAG_MODE", "STUDY_LIBRARY_TAG_FILTER",
+    "STUDY_LIBRARY_ANKI_MODE", "STUDY_LIBRARY_DATE_MODE",
+    "STUDY_LIBRARY_DATE_FROM", "STUDY_LIBRARY_DATE_TO",
+    "STUDY_LIBRARY_CHAPTER", "STUDY_LIBRARY_SPEAKER", "STUDY_LIBRARY_TAGS",
+    "STUDY_LIBRARY_ADDED_TO_ANKI", "STUDY_LIBRARY_GROUP_IDS",
+    "STUDY_LIBRARY_BULK_CHAPTER_MODE", "STUDY_LIBRARY_BULK_CHAPTER",
+    "STUDY_LIBRARY_BULK_SPEAKER_MODE", "STUDY_LIBRARY_BULK_SPEAKER",
+    "STUDY_LIBRARY_BULK_TAGS_MODE", "STUDY_LIBRARY_BULK_TAGS",
+    "STUDY_LIBRARY_BULK_ANKI_MODE",
+)
+
 
 def encode_field(value: object) -> str:
     """Hex-encode UTF-8 so tabs/newlines can never corrupt bridge rows."""
@@ -70,12 +91,9 @@ def ensure_database(database: Path, output_dir: Path) -> int:
     if not database.is_file():
         write_rows(output_dir / "ensure.tsv", ((0, 0),))
         return 0
-    connection = sqlite3.connect(database, timeout=10)
+    connection = connect_upgrade(database)
     try:
-        connection.execute("PRAGMA foreign_keys = ON")
-        connection.execute("PRAGMA busy_timeout = 10000")
-        ensure_section_schema(connection)
-        connection.commit()
+        ensure_schema(connection)
         connection.execute("BEGIN IMMEDIATE")
         explanations, sections = backfill_missing_sections(connection)
         connection.commit()
@@ -88,9 +106,72 @@ def ensure_database(database: Path, output_dir: Path) -> int:
         connection.close()
 
 
-def connect_read_only(database: Path) -> sqlite3.Connection:
+class PooledConnection(sqlite3.Connection):
+    """A connection the bridge server keeps open between commands.
+
+    Commands close their connection when done, as in the one-shot bridge. For
+    a pooled connection that only ends an unfinished transaction; ``release``
+    really closes it.
+    """
+
+    identity: tuple[int, int] | None = None
+    upgraded_schema_version: int | None = None
+
+    def close(self) -> None:
+        if self.in_transaction:
+            self.rollback()
+
+    def release(self) -> None:
+        super().close()
+
+
+class ConnectionPool:
+    """Open connections per database file and kind, reused across commands.
+
+    SQLite keeps the prepared statements of each connection, so repeated
+    queries are not parsed again. A connection whose file was replaced (for
+    example by restoring an archived library) is reopened.
+    """
+
+    def __init__(self) -> None:
+        self.connections: dict[tuple[str, str], PooledConnection] = {}
+
+    def get(self, database: Path, kind: str, opener) -> sqlite3.Connection:
+        key = (os.path.normcase(str(database.resolve())), kind)
+        try:
+            stat = database.stat()
+            identity = (stat.st_dev, stat.st_ino)
+        except OSError:
+            identity = None
+        connection = self.connections.get(key)
+        if connection is not None and connection.identity != identity:
+            del self.connections[key]
+            connection.release()
+            connection = None
+        if connection is None:
+            connection = opener(database, PooledConnection)
+            connection.identity = identity
+            self.connections[key] = connection
+        return connection
+
+    def release(self) -> None:
+        """Close every connection so the library folder can be moved."""
+        connections, self.connections = list(self.connections.values()), {}
+        for connection in connections:
+            try:
+                connection.release()
+            except sqlite3.Error:
+                pass
+
+
+# Installed by the bridge server; the one-shot bridge opens fresh connections.
+POOL: ConnectionPool | None = None
+
+
+def _open_read_only(database: Path, factory=sqlite3.Connection) -> sqlite3.Connection:
     connection = sqlite3.connect(
-        f"file:{database.resolve().as_posix()}?mode=ro", uri=True, timeout=10
+        f"file:{database.resolve().as_posix()}?mode=ro", uri=True, timeout=10,
+        factory=factory, check_same_thread=False,
     )
     connection.row_factory = sqlite3.Row
     connection.execute("PRAGMA query_only = ON")
@@ -98,14 +179,62 @@ def connect_read_only(database: Path) -> sqlite3.Connection:
     return connection
 
 
-def connect_write(database: Path) -> sqlite3.Connection:
-    connection = sqlite3.connect(database, timeout=10)
+def _open_write(database: Path, factory=sqlite3.Connection) -> sqlite3.Connection:
+    connection = sqlite3.connect(
+        database, timeout=10, factory=factory, check_same_thread=False
+    )
     connection.row_factory = sqlite3.Row
     connection.execute("PRAGMA foreign_keys = ON")
     connection.execute("PRAGMA busy_timeout = 10000")
     return connection
 
 
+def _open_upgrade(database: Path, factory=sqlite3.Connection) -> sqlite3.Connection:
+    connection = sqlite3.connect(
+        database, timeout=10, factory=factory, check_same_thread=False
+    )
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.execute("PRAGMA busy_timeout = 10000")
+    return connection
+
+
+def connect_read_only(database: Path) -> sqlite3.Connection:
+    if POOL is not None:
+        return POOL.get(database, "read", _open_read_only)
+    return _open_read_only(database)
+
+
+def connect_write(database: Path) -> sqlite3.Connection:
+    if POOL is not None:
+        return POOL.get(database, "write", _open_write)
+    return _open_write(database)
+
+
+def connect_upgrade(database: Path) -> sqlite3.Connection:
+    """Connection with plain tuple rows for the schema upgrade and backfill."""
+    if POOL is not None:
+        return POOL.get(database, "upgrade", _open_upgrade)
+    return _open_upgrade(database)
+
+
+def ensure_schema(connection: sqlite3.Connection) -> None:
+    """Run the section schema upgrade unless this pooled connection already has.
+
+    ``PRAGMA schema_version`` changes whenever any process alters the schema,
+    so a pooled connection skips the upgrade while the version it recorded
+    after its last upgrade is current.
+    """
+    version = connection.execute("PRAGMA schema_version").fetchone()[0]
+    if getattr(connection, "upgraded_schema_version", None) == version:
+        return
+    ensure_section_schema(connection)
+    connection.commit()
+    if isinstance(connection, PooledConnection):
+        connection.upgraded_schema_version = connection.execute(
+            "PRAGMA schema_version"
+        ).fetchone()[0]
+
+
 def directory_usage(path: Path) -> tuple[int, int]:
     """Return file count and byte size without following directory links."""
     if not path.exists():
@@ -138,6 +267,10 @@ def directory_usage(path: Path) -> tuple[int, int]:
 
 def storage_snapshot(database: Path, output_dir: Path) -> int:
     """Report active-library disk usage without modifying library contents."""
+    # shutil is only needed here and in remove_version; the snapshot and
+    # detail commands that the UI waits on do not pay for its import.
+    import shutil
+
     clear_outputs(output_dir, ("storage.tsv",))
     study_dir = database.parent
     study_dir.mkdir(parents=True, exist_ok=True)
@@ -881,8 +1014,7 @@ def save_manual_edit(
 
     connection = connect_write(database)
     try:
-        ensure_section_schema(connection)
-        connection.commit()
+        ensure_schema(connection)
         connection.execute("BEGIN IMMEDIATE")
         selected = connection.execute(
             "SELECT id, raw_text, manual_original_text FROM explanations "
@@ -923,8 +1055,7 @@ def revert_manual_edit(
     clear_outputs(output_dir, ("mutation.tsv",))
     connection = connect_write(database)
     try:
-        ensure_section_schema(connection)
-        connection.commit()
+        ensure_schema(connection)
         connection.execute("BEGIN IMMEDIATE")
         selected = connection.execute(
             "SELECT id, manual_original_text FROM explanations "
@@ -975,6 +1106,8 @@ def remove_version(
     database: Path, output_dir: Path, group_id: int, version: int
 ) -> int:
     """Remove one version after making a recoverable database/media backup."""
+    import shutil
+
     clear_outputs(output_dir, ("mutation.tsv",))
     connection = connect_write(database)
     moved_media: list[tuple[Path, Path]] = []
@@ -1061,24 +1194,18 @@ def remove_version(
         connection.close()
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="JRPG Translator Study Library bridge")
-    parser.add_argument(
-        "command",
-        choices=(
-            "ensure", "snapshot", "detail", "set-metadata", "bulk-metadata",
-            "set-anki", "save-edit", "revert-edit", "remove-version", "storage",
-        ),
-    )
+    parser.add_argument("command", choices=COMMANDS)
     parser.add_argument("--db", required=True)
     parser.add_argument("--output-dir", required=True)
     parser.add_argument("--group-id", type=int, default=0)
     parser.add_argument("--version", type=int, default=0)
-    return parser.parse_args()
+    return parser.parse_args(argv)
 
 
-def main() -> int:
-    args = parse_args()
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
     database = Path(args.db)
     output_dir = Path(args.output_dir)
     if args.command == "ensure":
@@ -1110,9 +1237,14 @@ def main() -> int:
     return detail(database, output_dir, args.group_id, args.version)
 
 
-if __name__ == "__main__":
+def run(argv: list[str] | None = None) -> int:
+    """Run one bridge command and report failures the way the UI expects."""
     try:
-        raise SystemExit(main())
+        return main(argv)
     except Exception as exc:
         print(f"Study Library bridge error: {exc}", file=sys.stderr)
-        raise SystemExit(1)
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
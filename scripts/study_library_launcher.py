@@ -0,0 +1,21 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Start the Study Library bridge from cached bytecode.
+
+Python compiles the script it is started with on every run, but imported
+modules are loaded from ``__pycache__``. Compiling study_library.py takes
+about 15 ms, and the Study Library UI waits on every bridge command, so it
+starts this file instead. Arguments, outputs and exit codes are those of
+study_library.py.
+"""
+
+import os
+import sys
+
+# The bundled portable Python's ._pth file leaves this directory off sys.path.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import study_library  # noqa: E402
+
+if __name__ == "__main__":
+    raise SystemExit(study_library.run())
@@ -8,15 +8,13 @@ import json
 import re
 import sqlite3
 import unicodedata
-from dataclasses import dataclass
-from typing import Iterable
+from collections import namedtuple
+from collections.abc import Iterable
 
 
-@dataclass(frozen=True)
-class ExplanationSection:
-    key: str
-    heading: str
-    content: str
+# A plain namedtuple keeps dataclasses (and inspect) and typing out of the
+# Study Library bridge, whose startup the UI waits on for every command.
+ExplanationSection = namedtuple("ExplanationSection", ("key", "heading", "content"))
 
 
 _SPEAKER_HEADER_RE = re.compile(r"^\s*「([^「」\r\n]{1,80})」\s*$")
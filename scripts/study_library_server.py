@@ -0,0 +1,330 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Persistent Study Library bridge for the AutoHotkey UI.
+
+Without it, every filter change, row selection and edit in the Study Library
+starts ``study_library.py`` once: interpreter start, imports, opening SQLite
+and the PRAGMA setup, plus the section schema check for ``ensure``. The
+server runs the same commands in one long-lived process. It keeps a
+connection per database open (with SQLite's prepared statements), skips the
+schema check while the schema is unchanged, and writes the same TSV outputs
+to the same ``--output-dir``.
+
+The UI talks to it directly through a named pipe (a Unix socket elsewhere,
+for development), so an action costs one round trip instead of a process
+start. When no server answers, the UI runs the one-shot bridge as before and
+starts a server for the next action.
+
+Endpoint: ``%TEMP%\\JRPG_Overlay\\study_library.server`` holds one line,
+``address<TAB>key<TAB>pid<TAB>NAME,NAME,...``. The names are the environment
+variables the commands read; the UI sends their current values.
+
+Request (one UTF-8 line; hex fields are UTF-8 encoded like the TSV outputs):
+  key<TAB>command<TAB>hex(db)<TAB>hex(output dir)<TAB>group id<TAB>version
+  [<TAB>NAME=hex(value)]...
+Reply (one line):
+  status<TAB>exit code<TAB>hex(message)
+  status is "ok", "stale" (the scripts changed; the server exits, run the
+  one-shot bridge) or "denied" (wrong key). "ping" and "release" (close all
+  connections so a library folder can be moved) take no database.
+
+Options (environment):
+  STUDY_LIBRARY_SERVER_IDLE_SECONDS  exit after this idle time (default 600)
+
+Usage:
+  python study_library_server.py
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+if str(SCRIPT_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPT_DIR))
+
+import study_library  # noqa: E402
+from local_worker import OVERLAY_DIR, idle_seconds, source_fingerprint  # noqa: E402
+
+ENDPOINT = os.path.join(OVERLAY_DIR, "study_library.server")
+# Connections are closed after this long without a command, so Windows does
+# not keep the database files of a closed Study Library window open.
+RELEASE_SECONDS = 30.0
+PIPE_BUFFER = 65536
+PIPE_REJECT_REMOTE_CLIENTS = 0x00000008
+FILE_FLAG_FIRST_PIPE_INSTANCE = 0x00080000
+
+
+def fingerprint() -> str:
+    return source_fingerprint([
+        os.path.abspath(__file__),
+        os.path.join(SCRIPT_DIR, "local_worker.py"),
+        os.path.join(SCRIPT_DIR, "study_library.py"),
+        os.path.join(SCRIPT_DIR, "study_library_sections.py"),
+    ])
+
+
+def read_endpoint() -> tuple[str, str] | None:
+    try:
+        with open(ENDPOINT, "r", encoding="utf-8") as endpoint_file:
+            fields = endpoint_file.readline().rstrip("\r\n").split("\t")
+    except OSError:
+        return None
+    if len(fields) < 2 or not fields[0]:
+        return None
+    return fields[0], fields[1]
+
+
+def encode_reply(status: str, exit_code: int = 0, message: str = "") -> bytes:
+    return f"{status}\t{exit_code}\t{study_library.encode_field(message)}\n".encode("utf-8")
+
+
+def decode_field(value: str) -> str:
+    return bytes.fromhex(value).decode("utf-8") if value else ""
+
+
+class BridgeServer:
+    def __init__(self, key: str, idle_timeout: float):
+        self.key = key
+        self.fingerprint = fingerprint()
+        self.idle_timeout = idle_timeout
+        self.pool = study_library.ConnectionPool()
+        self.lock = threading.Lock()
+        self.last_activity = time.monotonic()
+        self.address = ""
+        study_library.POOL = self.pool
+
+    def handle(self, line: bytes) -> tuple[bytes, bool]:
+        """Run one request; return the reply and whether to exit afterwards."""
+        fields = line.decode("utf-8", "replace").rstrip("\r\n").split("\t")
+        if len(fields) < 6 or fields[0] != self.key:
+            return encode_reply("denied", 1, "Invalid request."), False
+        command = fields[1]
+        if command == "ping":
+            return encode_reply("ok"), False
+        if command == "release":
+            self.pool.release()
+            return encode_reply("ok"), False
+        if fingerprint() != self.fingerprint:
+            return encode_reply("stale", 1, "The Study Library scripts changed."), True
+
+        for name in study_library.BRIDGE_ENVIRONMENT:
+            os.environ.pop(name, None)
+        for field in fields[6:]:
+            name, _, value = field.partition("=")
+            if name in study_library.BRIDGE_ENVIRONMENT:
+                os.environ[name] = decode_field(value)
+        argv = [
+            command,
+            "--db", decode_field(fields[2]),
+            "--output-dir", decode_field(fields[3]),
+            "--group-id", fields[4] or "0",
+            "--version", fields[5] or "0",
+        ]
+        try:
+            exit_code = study_library.main(argv)
+        except SystemExit as exc:  # argparse rejected the arguments
+            return encode_reply("ok", exc.code if isinstance(exc.code, int) else 2,
+                                "Invalid bridge arguments."), False
+        except Exception as exc:
+            print(f"Study Library bridge error: {exc}", file=sys.stderr)
+            return encode_reply("ok", 1, str(exc)), False
+        return encode_reply("ok", int(exit_code or 0)), False
+
+    def serve_request(self, line: bytes) -> tuple[bytes, bool]:
+        with self.lock:
+            try:
+                return self.handle(line)
+            finally:
+                self.last_activity = time.monotonic()
+
+    def publish(self) -> None:
+        fields = (
+            self.address, self.key, str(os.getpid()),
+            ",".join(study_library.BRIDGE_ENVIRONMENT),
+        )
+        temporary = f"{ENDPOINT}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as endpoint_file:
+            endpoint_file.write("\t".join(fields) + "\n")
+        os.replace(temporary, ENDPOINT)
+
+    def exit(self) -> None:
+        with self.lock:
+            self.pool.release()
+            endpoint = read_endpoint()
+            if endpoint and endpoint[0] == self.address:
+                try:
+                    os.remove(ENDPOINT)
+                except OSError:
+                    pass
+            if sys.platform != "win32":
+                try:
+                    os.remove(self.address)
+                except OSError:
+                    pass
+            # The accept/connect call cannot be interrupted portably.
+            os._exit(0)
+
+    def watchdog(self) -> None:
+        while True:
+            time.sleep(1.0)
+            with self.lock:
+                idle = time.monotonic() - self.last_activity
+                if idle >= RELEASE_SECONDS and self.pool.connections:
+                    self.pool.release()
+            if idle >= self.idle_timeout:
+                self.exit()
+
+    def serve_forever(self) -> None:
+        os.makedirs(OVERLAY_DIR, exist_ok=True)
+        if sys.platform == "win32":
+            self.address = rf"\\.\pipe\JRPG_StudyLibrary_{os.getpid()}_{os.urandom(8).hex()}"
+            serve = self._serve_pipe
+        else:
+            self.address = os.path.join(OVERLAY_DIR, f"study_library.{os.getpid()}.sock")
+            serve = self._serve_socket
+        threading.Thread(target=self.watchdog, name="study-library-idle", daemon=True).start()
+        serve()
+
+    def _serve_pipe(self) -> None:
+        import _winapi
+
+        def create(first: bool = False) -> int:
+            return _winapi.CreateNamedPipe(
+                self.address,
+                _winapi.PIPE_ACCESS_DUPLEX | (FILE_FLAG_FIRST_PIPE_INSTANCE if first else 0),
+                _winapi.PIPE_TYPE_MESSAGE | _winapi.PIPE_READMODE_MESSAGE
+                | _winapi.PIPE_WAIT | PIPE_REJECT_REMOTE_CLIENTS,
+                _winapi.PIPE_UNLIMITED_INSTANCES, PIPE_BUFFER, PIPE_BUFFER,
+                _winapi.NMPWAIT_WAIT_FOREVER, _winapi.NULL,
+            )
+
+        pipe = create(first=True)
+        self.publish()
+        while True:
+            try:
+                _winapi.ConnectNamedPipe(pipe, False)
+            except OSError as exc:
+                if exc.winerror != _winapi.ERROR_PIPE_CONNECTED:
+                    _winapi.CloseHandle(pipe)
+                    pipe = create()
+                    continue
+            # A second instance keeps the name open while this client is served.
+            waiting = create()
+            stop = False
+            try:
+                request = b""
+                while True:
+                    chunk, error = _winapi.ReadFile(pipe, PIPE_BUFFER)
+                    request += chunk
+                    if error != _winapi.ERROR_MORE_DATA:
+                        break
+                reply, stop = self.serve_request(request)
+                _winapi.WriteFile(pipe, reply)
+                # Wait until the client has read the reply and closed its end;
+                # closing first could discard the reply.
+                try:
+                    while True:
+                        _winapi.ReadFile(pipe, 1)
+                except OSError:
+                    pass
+            except OSError:
+                pass
+            finally:
+                _winapi.CloseHandle(pipe)
+            if stop:
+                self.exit()
+            pipe = waiting
+
+    def _serve_socket(self) -> None:
+        import socket
+
+        try:
+            os.remove(self.address)
+        except OSError:
+            pass
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.address)
+        os.chmod(self.address, 0o600)
+        listener.listen(4)
+        self.publish()
+        try:
+            while True:
+                connection, _ = listener.accept()
+                stop = False
+                with connection:
+                    try:
+                        with connection.makefile("rb") as reader:
+                            request = reader.readline()
+                        reply, stop = self.serve_request(request)
+                        connection.sendall(reply)
+                    except OSError:
+                        pass
+                if stop:
+                    self.exit()
+        finally:
+            listener.close()
+            try:
+                os.remove(self.address)
+            except OSError:
+                pass
+
+
+def request(command: str, database: str = "", output_dir: str = "",
+            group_id: int = 0, version: int = 0,
+            environment: dict[str, str] | None = None,
+            timeout: float = 30.0) -> tuple[str, int, str]:
+    """Send one request to the running server; raises OSError when none answers.
+
+    The UI speaks the protocol itself. This client is for tests and benchmarks.
+    """
+    endpoint = read_endpoint()
+    if endpoint is None:
+        raise OSError("No Study Library server is running.")
+    address, key = endpoint
+    fields = [
+        key, command, study_library.encode_field(database),
+        study_library.encode_field(output_dir), str(group_id), str(version),
+    ]
+    fields += [
+        f"{name}={study_library.encode_field(value)}"
+        for name, value in (environment or {}).items()
+    ]
+    line = ("\t".join(fields) + "\n").encode("utf-8")
+    if sys.platform == "win32":
+        with open(address, "r+b", buffering=0) as pipe:
+            pipe.write(line)
+            reply = pipe.readline()
+    else:
+        import socket
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.settimeout(timeout)
+            connection.connect(address)
+            connection.sendall(line)
+            with connection.makefile("rb") as reader:
+                reply = reader.readline()
+    status, exit_code, message = (reply.decode("utf-8").rstrip("\r\n").split("\t") + ["", "", ""])[:3]
+    return status, int(exit_code or 1), decode_field(message)
+
+
+def main() -> int:
+    try:
+        if request("ping")[0] == "ok":
+            return 0  # another server already answers
+    except (OSError, ValueError):
+        pass
+    server = BridgeServer(os.urandom(16).hex(), idle_seconds("STUDY_LIBRARY_SERVER_IDLE_SECONDS"))
+    try:
+        server.serve_forever()
+    finally:
+        server.pool.release()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
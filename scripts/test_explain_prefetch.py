@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""Focused regression tests for replaying prefetched explanations."""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+
+def main() -> None:
+    quiet = io.StringIO()
+    with tempfile.TemporaryDirectory(prefix="explain_prefetch_") as folder, \
+            contextlib.redirect_stdout(quiet), contextlib.redirect_stderr(quiet):
+        os.environ["TEMP"] = os.environ["TMP"] = folder
+        sys.path.insert(0, str(Path(__file__).resolve().parent))
+        import explain_prefetch
+        from explainer import ExplainerEngine, ExplainOptions, ExplainSettings
+        from PIL import Image
+
+        screenshot = os.path.join(folder, "shot.png")
+        Image.new("RGB", (1920, 1080)).save(screenshot)
+        settings = ExplainSettings(
+            prompt_template="Explain: {jp}",
+            cache_path=os.path.join(folder, "explanation_cache.sqlite3"),
+        )
+        line = "橋は去年の冬に落ちた。"
+        requests = []
+
+        def provider(answer):
+            def call(prompt, source_paths, stream_preview=None, profile=None):
+                requests.append((answer, list(source_paths)))
+                return answer, None
+            return call
+
+        # The prefetch explains the text alone while the button press waits.
+        prefetch_engine = ExplainerEngine(settings)
+        prefetch_engine.call_provider = provider("prefetched")
+        waited = []
+
+        def wait_for_prefetch(source, lookup, timeout=30.0):
+            waited.append(source)
+            prefetch_engine.explain(line, (), ExplainOptions(update_overlay=False, cache=True))
+            return lookup()
+
+        explain_prefetch.wait_for_prefetch = wait_for_prefetch
+        press = ExplainOptions(update_overlay=False, cache=True, wait_for_prefetch=True)
+
+        # Explain usually has the translated screenshots attached as well.
+        engine = ExplainerEngine(settings)
+        engine.call_provider = provider("second request")
+        result = engine.explain(line, [screenshot], press)
+        assert waited == [line]
+        assert result.cached and result.text == "prefetched" and result.tokens == 0
+        assert requests == [("prefetched", [])]
+
+        # Screenshots without text are not prefetched, so nothing is awaited;
+        # their upload is counted when the provider reports no usage.
+        result = engine.explain("", [screenshot], press)
+        assert waited == [line] and not result.cached
+        assert requests[-1] == ("second request", [screenshot])
+        assert result.tokens > 1000
+
+
+if __name__ == "__main__":
+    main()
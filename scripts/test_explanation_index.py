@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""Focused regression tests for explanation archive versions and their index."""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import explainer
+from explainer import (
+    EXPLANATION_BODY_HEADER,
+    EXPLANATION_SOURCE_HEADER,
+    archive_plain_text,
+    read_explanation_index,
+)
+
+
+def archive(folder: str, jp: str, source_paths=()) -> str:
+    with contextlib.redirect_stdout(io.StringIO()):
+        path = archive_plain_text(folder, jp, list(source_paths), "explanation")
+    assert path, "the archive was not written"
+    return os.path.basename(path)
+
+
+def outside_edit() -> None:
+    # File times advance in clock ticks; let the next change land in a new one.
+    time.sleep(0.05)
+
+
+def write_outside_archive(folder: str, name: str, jp: str) -> None:
+    with open(os.path.join(folder, name), "w", encoding="utf-8", newline="\r\n") as f:
+        f.write(f"{EXPLANATION_SOURCE_HEADER}\n{jp}\n\n{EXPLANATION_BODY_HEADER}\nmanual\n")
+
+
+def check_archive_versions(folder: str) -> None:
+    # Consecutive repeats are versioned; spacing and line breaks do not count.
+    first = archive(folder, "勇者が来た。")
+    assert first.endswith("_explain.txt")
+    base = first[:-len("_explain.txt")]
+    assert archive(folder, "勇者が\n来た。") == f"{base}_explain_v02.txt"
+    assert archive(folder, "勇者が来た。") == f"{base}_explain_v03.txt"
+
+    # A different source starts a new timestamp, even within the same second,
+    # and going back to an earlier line is not a repeat.
+    other = archive(folder, "魔王が笑った。")
+    assert other.endswith("_explain.txt") and other > first
+    again = archive(folder, "勇者が来た。")
+    assert again.endswith("_explain.txt") and again > other
+
+    # Screenshot sources compare by their paths.
+    shot = archive(folder, "", ["/tmp/shot-a.png"])
+    assert archive(folder, "", ["/tmp/shot-a.png"]) == shot.replace(".txt", "_v02.txt")
+    assert archive(folder, "", ["/tmp/shot-b.png"]).endswith("_explain.txt")
+
+    # An untouched folder is answered from the index without listing it.
+    outside_edit()
+    last = archive(folder, "宿屋に泊まる。")
+    assert read_explanation_index(folder)["newest"]["name"] == last
+    rebuild = explainer.rebuild_explanation_index
+    explainer.rebuild_explanation_index = None  # any call would fail
+    try:
+        assert archive(folder, "宿屋に泊まる。") == last.replace(".txt", "_v02.txt")
+    finally:
+        explainer.rebuild_explanation_index = rebuild
+
+    # An archive added from outside becomes the newest one.
+    outside_edit()
+    write_outside_archive(folder, "20991231-235959_explain.txt", "城門が開いた。")
+    assert read_explanation_index(folder) is None
+    assert archive(folder, "城門が開いた。") == "20991231-235959_explain_v02.txt"
+
+    # Removing the newest archives falls back to the one before them.
+    outside_edit()
+    os.remove(os.path.join(folder, "20991231-235959_explain_v02.txt"))
+    os.remove(os.path.join(folder, "20991231-235959_explain.txt"))
+    assert read_explanation_index(folder) is None
+    assert archive(folder, "宿屋に泊まる。") == last.replace(".txt", "_v03.txt")
+
+    # Renaming the newest archive away, or any other file, is noticed too.
+    outside_edit()
+    os.rename(
+        os.path.join(folder, last.replace(".txt", "_v03.txt")),
+        os.path.join(folder, "kept.txt"),
+    )
+    assert read_explanation_index(folder) is None
+    assert archive(folder, "宿屋に泊まる。") == last.replace(".txt", "_v03.txt")
+    outside_edit()
+    os.rename(os.path.join(folder, first), os.path.join(folder, "first.txt"))
+    assert read_explanation_index(folder) is None
+
+    # Rewriting the newest archive in place changes its source.
+    outside_edit()
+    newest = last.replace(".txt", "_v03.txt")
+    write_outside_archive(folder, newest, "宝箱を開けた。")
+    assert read_explanation_index(folder) is None
+    assert archive(folder, "宝箱を開けた。") == last.replace(".txt", "_v04.txt")
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory(prefix="explain_index_") as folder:
+        check_archive_versions(folder)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""Focused regression tests for the compiled terminology glossary."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from glossary_engine import (
+    apply_glossary,
+    compile_glossary,
+    glossary_source_index,
+    select_glossary_for_transcript,
+)
+
+
+def main() -> None:
+    glossary = [
+        ("potion", "tonic"),
+        ("Phoenix Down", "Phoenix Feather"),
+        ("dark knight", "shadow paladin"),
+        ("Dain", "Dyne"),
+    ]
+
+    # Case adaptation and plural/possessive suffixes on single tokens.
+    assert apply_glossary("A potion. POTIONS! Potion's cap.", glossary) == (
+        "A tonic. TONICS! Tonic's cap."
+    )
+    # Whole words only.
+    assert apply_glossary("Potionmaker", glossary) == "Potionmaker"
+    # Capitalized sources keep the target exactly as written.
+    assert apply_glossary("phoenix down and DAIN", glossary) == (
+        "Phoenix Feather and Dyne"
+    )
+    # Lowercase multi-word sources follow title case and sentence case.
+    assert apply_glossary("The Dark Knight. Dark knight.", glossary) == (
+        "The Shadow Paladin. Shadow paladin."
+    )
+
+    # The longest overlapping source wins, and replacements are not rescanned.
+    chained = [("sword", "blade"), ("blade", "knife"), ("sword arm", "arm")]
+    assert apply_glossary("sword, blade, sword arm", chained) == (
+        "blade, knife, arm"
+    )
+
+    # Original Japanese quoted in an explanation is protected.
+    protected = apply_glossary(
+        "Original: Dain\nMeaning: Dain", [("Dain", "Dyne")],
+        protected_text="Original: Dain",
+    )
+    assert protected == "Original: Dain\nMeaning: Dyne"
+
+    # Equal entries reuse one compilation; an empty glossary is a no-op.
+    assert compile_glossary(list(glossary)) is compile_glossary(tuple(glossary))
+    assert apply_glossary("potion", []) == "potion"
+    assert not compile_glossary([])
+
+    # The source index keeps, in glossary order, the JP entries that occur in
+    # a transcript after NFKC folding and removal of generated kanji readings.
+    jp2en = [
+        ("ダイン", "Dain"),
+        ("エルフの村", "Elf Village"),
+        ("村", "village"),
+        ("ＨＰ", "HP"),
+        ("", "ignored"),
+        ("ダイン", "Dyne"),
+        ("ロス", "Ross"),
+    ]
+    assert select_glossary_for_transcript(
+        jp2en, "「ダイン」\nエルフの村(むら)へ行こう。HPが少ない。"
+    ) == [
+        ("ダイン", "Dain"),
+        ("エルフの村", "Elf Village"),
+        ("村", "village"),
+        ("ＨＰ", "HP"),
+        ("ダイン", "Dyne"),
+    ]
+    assert select_glossary_for_transcript(jp2en, "") == []
+    assert select_glossary_for_transcript([], "ダイン") == []
+    assert glossary_source_index(list(jp2en)) is glossary_source_index(tuple(jp2en))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""Focused regression tests for hedged provider requests."""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from provider_hedge import HedgeCancelled, hedged_call
+
+
+def is_valid(text: str) -> bool:
+    return text.startswith("ok")
+
+
+def answer(text: str, after: float = 0.0, calls: list | None = None):
+    def attempt(cancel: threading.Event) -> str:
+        if calls is not None:
+            calls.append(time.perf_counter())
+        time.sleep(after)
+        return text
+    return attempt
+
+
+def fail(exc: BaseException, calls: list | None = None):
+    def attempt(cancel: threading.Event) -> str:
+        if calls is not None:
+            calls.append(time.perf_counter())
+        raise exc
+    return attempt
+
+
+def stall(cancelled: threading.Event):
+    """An attempt that only ends when it loses the race."""
+    def attempt(cancel: threading.Event) -> str:
+        if cancel.wait(5.0):
+            cancelled.set()
+            raise HedgeCancelled()
+        return "ok too late"
+    return attempt
+
+
+def main() -> None:
+    # The primary answers before the delay: no hedge is started.
+    hedge_calls: list = []
+    outcome = hedged_call(answer("ok primary", 0.01), answer("ok hedge", calls=hedge_calls),
+                          1.0, is_valid)
+    assert (outcome.text, outcome.winner) == ("ok primary", "primary")
+    assert outcome.hedge_started is None and outcome.primary_seconds is not None
+    assert not outcome.primary_failed and not hedge_calls
+
+    # A slow primary loses to the hedge and is told to stop.
+    cancelled = threading.Event()
+    outcome = hedged_call(stall(cancelled), answer("ok hedge"), 0.05, is_valid)
+    assert (outcome.text, outcome.winner) == ("ok hedge", "hedge")
+    assert 0.05 <= outcome.hedge_started < 1.0
+    assert outcome.primary_seconds is None and not outcome.primary_failed
+    assert cancelled.wait(1.0)
+
+    # An invalid primary starts the hedge at once instead of after the delay.
+    started = time.perf_counter()
+    outcome = hedged_call(answer("garbled"), answer("ok hedge"), 10.0, is_valid)
+    assert (outcome.text, outcome.winner) == ("ok hedge", "hedge")
+    assert outcome.primary_failed and outcome.hedge_started < 1.0
+    assert time.perf_counter() - started < 1.0
+
+    # So does a failed primary.
+    outcome = hedged_call(fail(ConnectionError("primary")), answer("ok hedge"), 10.0, is_valid)
+    assert outcome.winner == "hedge" and outcome.primary_failed
+
+    # Nothing valid: the primary's text is preferred, then the hedge's.
+    outcome = hedged_call(answer("garbled primary"), answer("garbled hedge"), 0.0, is_valid)
+    assert (outcome.text, outcome.winner) == ("garbled primary", "")
+    outcome = hedged_call(fail(ConnectionError("primary")), answer("garbled hedge"), 0.0, is_valid)
+    assert (outcome.text, outcome.winner) == ("garbled hedge", "")
+
+    # Both fail without text: the primary's exception is re-raised.
+    try:
+        hedged_call(fail(ConnectionError("primary")), fail(TimeoutError("hedge")), 0.0, is_valid)
+    except ConnectionError as exc:
+        assert str(exc) == "primary"
+    else:
+        raise AssertionError("expected the primary's exception")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""Focused regression tests for Explain Last after a translation cache hit."""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+
+def read(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory(prefix="translation_cache_hit_") as folder:
+        os.environ.update({
+            "TEMP": folder,
+            "TMP": folder,
+            "JRPG_TRANSLATION_CACHE": "1",
+            "JRPG_TRANSLATION_CACHE_PATH": os.path.join(folder, "cache.sqlite3"),
+            "SHOT_NEAR_DUPLICATE": "phash",
+        })
+        sys.path.insert(0, str(Path(__file__).resolve().parent))
+        import screenshot_translator as st
+        from image_prep import IMAGE_WORKERS, image_executor, read_image
+        from PIL import Image
+        from result_cache import cache_key
+
+        paths = []
+        for index in range(IMAGE_WORKERS + 3):
+            path = os.path.join(folder, f"capture_{index}.png")
+            Image.new("RGB", (320, 180), (index * 20, 0, 0)).save(path)
+            paths.append(path)
+        settings = st.translation_settings([], [])
+        key = cache_key([read_image(path).sha256 for path in paths], settings)
+        st.TRANSLATION_CACHE.put(key, "cached result", "cached transcript")
+        os.makedirs(st.OVERLAY_DIR, exist_ok=True)
+        st.atomic_write_text(st.LAST_JP, "previous line")
+
+        # Hold the first staging copies, so the rest are still queued when the
+        # cache answers.
+        release = threading.Event()
+        stage = st.stage_source_image
+
+        def slow_stage(index, path):
+            release.wait(5.0)
+            return stage(index, path)
+
+        st.stage_source_image = slow_stage
+        try:
+            batch = st.start_image_batch(paths)
+            threading.Timer(0.3, release.set).start()
+            assert st.translate_images(paths, [], [], batch) == "cached result"
+        finally:
+            st.stage_source_image = stage
+        assert read(st.LAST_JP) == "cached transcript"
+        kept = read(st.LAST_SRC).split()
+        assert len(kept) == len(paths) and all(os.path.isfile(path) for path in kept)
+
+        # Cancelled staging falls back to copying the files directly.
+        blockers = [threading.Event() for _ in range(IMAGE_WORKERS)]
+        executor = image_executor()
+        for blocker in blockers:
+            executor.submit(blocker.wait, 5.0)
+        batch = st.start_image_batch(paths[:2])
+        batch.cancel()
+        for blocker in blockers:
+            blocker.set()
+        st.publish_last_source(paths[:2], "second transcript", batch)
+        assert read(st.LAST_JP) == "second transcript"
+        assert len(read(st.LAST_SRC).split()) == 2
+
+
+if __name__ == "__main__":
+    main()